@@ -21,7 +21,7 @@ class InputDataEditor(Worker):
 
         current_job: Job = self.get_last_pending_job(state)
         feed_status(state, f"Changing the input data description as per user request...")
-        response = edit_section_query(
+        response = await edit_section_query(
             state=state,
             prompt_path=(Path(__file__).parent / "input_data_description_prompt.ptxt").as_posix(),
             config_path=(Path(__file__).parent / "input_data_description_config.json").as_posix(),
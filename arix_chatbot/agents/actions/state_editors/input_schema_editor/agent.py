@@ -18,7 +18,7 @@ class InputSchemaEditor(Worker):
 
         current_job: Job = self.get_last_pending_job(state)
         feed_status(state, f"Changing the input data schema as per user request...")
-        response = edit_section_query(
+        response = await edit_section_query(
             state=state,
             prompt_path=(Path(__file__).parent / "input_schema_prompt.ptxt").as_posix(),
             config_path=(Path(__file__).parent / "input_schema_config.json").as_posix(),
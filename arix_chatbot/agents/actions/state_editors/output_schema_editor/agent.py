@@ -23,7 +23,7 @@ class OutputSchemaEditor(Worker):
 
         current_job: Job = self.get_last_pending_job(state)
         feed_status(state, f"Changing the output data schema as per user request...")
-        response = edit_section_query(
+        response = await edit_section_query(
             state=state,
             prompt_path=(Path(__file__).parent / "output_schema_prompt.ptxt").as_posix(),
             config_path=(Path(__file__).parent / "output_schema_config.json").as_posix(),
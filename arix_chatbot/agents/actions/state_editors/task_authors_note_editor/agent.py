@@ -17,7 +17,7 @@ class TaskAuthorNotesEditor(Worker):
     async def process_task(self, state: SessionState) -> Tuple[SessionState, WorkerStatus]:
         current_job: Job = self.get_last_pending_job(state)
         feed_status(state, f"Changing task goal based on user request ...")
-        response = edit_section_query(
+        response = await edit_section_query(
             state=state,
             prompt_path=(Path(__file__).parent / "author_notes_prompt.ptxt").as_posix(),
             config_path=(Path(__file__).parent / "author_notes_config.json").as_posix(),
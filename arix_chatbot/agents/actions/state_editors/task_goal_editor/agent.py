@@ -21,7 +21,7 @@ class TaskGoalEditor(Worker):
 
         current_job: Job = self.get_last_pending_job(state)
         feed_status(state, f"Changing task goal based on user request ...")
-        response = edit_section_query(
+        response = await edit_section_query(
             state=state,
             prompt_path=(Path(__file__).parent / "edit_task_goal_prompt.ptxt").as_posix(),
             config_path=(Path(__file__).parent / "edit_task_goal_config.json").as_posix(),
@@ -19,7 +19,7 @@ class TaskGlobalGuidelinesEditor(Worker):
 
         current_job: Job = self.get_last_pending_job(state)
         feed_status(state, f"Changing task global guidelines based on user request ...")
-        response = edit_section_query(
+        response = await edit_section_query(
             state=state,
             prompt_path=(Path(__file__).parent / "global_guidelines_prompt.ptxt").as_posix(),
             config_path=(Path(__file__).parent / "global_guidelines_config.json").as_posix(),
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from pathlib import Path
 
@@ -6,7 +7,7 @@ from arix_chatbot.llm_query.chat_contextual_query.query import ChatContextualQue
 from arix_chatbot.state_manager.state_store import SessionState
 
 
-def edit_section_query(state: SessionState, prompt_path: str, config_path: str, edit_job: Job) -> dict | None:
+async def edit_section_query(state: SessionState, prompt_path: str, config_path: str, edit_job: Job) -> dict | None:
     job_content = edit_job.content
     if not job_content:
         return None
@@ -25,5 +26,6 @@ def edit_section_query(state: SessionState, prompt_path: str, config_path: str,
         output_data_schema="output_data_schema" in required_context,
         llm='deepseek-chat',
     )
-    response = chat.query(state, user_intent=job_content)
+    # the LLM call blocks: run it in a thread so that concurrent editors overlap
+    response = await asyncio.to_thread(chat.query, state, user_intent=job_content)
     return response
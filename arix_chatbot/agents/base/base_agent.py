@@ -31,11 +31,10 @@ class BaseAgent(ABC):
         :param role:
         :return:
         """
-        open_jobs = state.get_open_jobs()
         if role == "managed":
-            todos = [job for job in open_jobs if job.report_to == self.agent_id]
+            todos = state.get_open_jobs(report_to=self.agent_id)
         elif role == "execute":
-            todos = [job for job in open_jobs if job.worker_id == self.agent_id]
+            todos = state.get_open_jobs(worker_id=self.agent_id)
         else:
             raise ValueError(f"Invalid role '{role}' for get_jobs")
         return todos
@@ -12,20 +12,22 @@ class MainChatOrchestrator(Navigator):
     """Navigator agent that manages the workflow of other agents."""
     agent_id: str = aid.MAIN
 
-    def __init__(self, managed_agents: List[str] = None):
+    def __init__(self, managed_agents: List[str] = None, parallel_editors: bool = False):
+        # Let independent editor jobs of a workflow run concurrently (state.fan_out)
+        self.parallel_editors = parallel_editors
         self._plan_workflow_step = "plan_workflow"
         self._launch_workflow_step = "launch_workflow"
         self._update_history_step = "update_history"
         self._work_mapper = {
             "generate_response": {"agent_id": aid.OUTPUT_HANDLER, "job": Job},
             "compose_full_task_and_config": {"agent_id": aid.LLM_TASK_INITIALIZER, "job": Job},
-            "edit_input_data_description": {"agent_id": aid.INPUT_DATA_EDITOR, "job": Job},
-            "edit_main_goal": {"agent_id": aid.TASK_GOAL_EDITOR, "job": Job},
-            "edit_detailed_task_instructions": {"agent_id": aid.TASK_DETAILED_INSTRUCTIONS_EDITOR, "job": Job},
-            "edit_global_guidelines": {"agent_id": aid.TASK_GLOBAL_GUIDELINES_EDITOR, "job": Job},
-            "edit_author_note": {"agent_id": aid.TASK_AUTHOR_NOTES_EDITOR, "job": Job},
-            "edit_input_schema": {"agent_id": aid.INPUT_SCHEMA_EDITOR, "job": Job},
-            "edit_output_schema": {"agent_id": aid.OUTPUT_SCHEMA_EDITOR, "job": Job},
+            "edit_input_data_description": {"agent_id": aid.INPUT_DATA_EDITOR, "job": Job, "writes": ["input_data_description"]},
+            "edit_main_goal": {"agent_id": aid.TASK_GOAL_EDITOR, "job": Job, "writes": ["task_goal"]},
+            "edit_detailed_task_instructions": {"agent_id": aid.TASK_DETAILED_INSTRUCTIONS_EDITOR, "job": Job, "writes": ["task_detailed_instructions"]},
+            "edit_global_guidelines": {"agent_id": aid.TASK_GLOBAL_GUIDELINES_EDITOR, "job": Job, "writes": ["task_global_guidelines"]},
+            "edit_author_note": {"agent_id": aid.TASK_AUTHOR_NOTES_EDITOR, "job": Job, "writes": ["task_author_notes"]},
+            "edit_input_schema": {"agent_id": aid.INPUT_SCHEMA_EDITOR, "job": Job, "writes": ["input_data_schema"]},
+            "edit_output_schema": {"agent_id": aid.OUTPUT_SCHEMA_EDITOR, "job": Job, "writes": ["output_data_schema"]},
         }
 
         self._pipeline_stages = [
@@ -121,11 +123,32 @@ class MainChatOrchestrator(Navigator):
 
         # Any workflow must end with response generation
         next_agents.append(aid.OUTPUT_HANDLER)
+        if self.parallel_editors:
+            state.fan_out = self.independent_workers(assigned_jobs)
 
         checklist.set_done(self._launch_workflow_step)
         self.update_context(state, context, checklist=checklist.todict())
         return state, next_agents
 
+    def independent_workers(self, jobs: List[Job]) -> List[str]:
+        """
+        Workers of `jobs` that can run concurrently: each has its own worker,
+        writes known state fields no other of them writes, and reads none of
+        the fields the others write.
+        """
+        writes_of = {components["agent_id"]: set(components["writes"])
+                     for components in self._work_mapper.values() if "writes" in components}
+        workers, written, read = [], set(), set()
+        for job in jobs:
+            writes = writes_of.get(job.worker_id)
+            reads = set(job.required_context or [])
+            if not writes or job.worker_id in workers or writes & (written | read) or reads & written:
+                continue
+            workers.append(job.worker_id)
+            written |= writes
+            read |= reads
+        return workers if len(workers) > 1 else []
+
     def respond_to_user(self, state: SessionState) -> SessionState:
         # send system response to user
         system_response = state.next_response
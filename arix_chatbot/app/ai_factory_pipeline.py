@@ -1,128 +1,137 @@
 from arix_chatbot.agents.agent_ids import AgentID
-from arix_chatbot.state_manager.state_store import StateStore, SessionState, SessionStatus
+from arix_chatbot.state_manager.state_store import StateStore, SessionState, SessionStatus, StateConflictError
 from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+from arix_chatbot.state_manager.sharded_state_store import ShardedSqlStateStore
+from arix_chatbot.state_manager.session_cache import CachedStateStore
+from arix_chatbot.state_manager.run_lease import RunLease
+from arix_chatbot.state_manager.change_tracking import track_changes, changes_of
 from arix_chatbot.app.agent_registry import AgentRegistry
-from typing import Optional, Dict, Any
+from arix_chatbot.app.hop_scheduler import HopScheduler, FanOutHopScheduler
+from arix_chatbot.app.turn_locks import TurnLocks
+from typing import Optional, Dict, Any, List
+from collections import OrderedDict
 from datetime import datetime
+import logging
 import textwrap
 import uuid
 
 
+logger = logging.getLogger(__name__)
+
+
 SQLITE_DB_URL = "/Users/omernagar/Documents/sqlite"
 
+STATE_STORES = ("sql", "sharded")
+
+
+def build_state_store(kind: str = "sql", *, db_url: Optional[str] = None, shards_dir: Optional[str] = None,
+                      shards: int = 8, cache: bool = True) -> StateStore:
+    """
+    State store of a pipeline: "sql" (SqlStateStore on `db_url`) or "sharded"
+    (ShardedSqlStateStore: runs spread over `shards` SQLite files in
+    `shards_dir`), behind a CachedStateStore unless `cache` is False.
+    Unset locations fall back to the stores' defaults.
+    """
+    if kind == "sql":
+        store = SqlStateStore(db_url) if db_url else SqlStateStore()
+    elif kind == "sharded":
+        store = ShardedSqlStateStore(shards_dir, shards=shards) if shards_dir else ShardedSqlStateStore(shards=shards)
+    else:
+        raise ValueError(f"Unknown state store {kind!r}, expected one of {', '.join(STATE_STORES)}")
+    return CachedStateStore(store) if cache else store
+
 
 class AiFactoryPipeline:
-    def __init__(self, agents_store: AgentRegistry = None, state_store: StateStore = None, root_agent: str = None) -> object:
+    def __init__(self, agents_store: AgentRegistry = None, state_store: StateStore = None, root_agent: str = None,
+                 conflict_retries: int = 2, run_lease: Optional[RunLease] = None,
+                 track_changes: bool = False, max_change_reports: int = 1024,
+                 scheduler: Optional[HopScheduler] = None, max_hops: int = 100) -> object:
         self.agent_registry = agents_store or AgentRegistry()
         # self.state_store = state_store or LangGraphStore(f"{SQLITE_DB_URL}/ai_factory_runs.db")
-        self.state_store = state_store or SqlStateStore()
+        self.state_store = state_store or build_state_store()
         self.active_runs = {}
         self._root_agent = root_agent
+        self.conflict_retries = conflict_retries
+        # turns of the same run are serialized; pass a RunLease to extend this across processes
+        self.turn_locks = TurnLocks(lease=run_lease)
+        # runs the agent hops of a turn (max-hops guard, loop detection, per-hop timing), and
+        # concurrently the agents a navigator fanned out (e.g. MainChatOrchestrator(parallel_editors=True))
+        self.scheduler = scheduler or FanOutHopScheduler(self.agent_registry, max_hops=max_hops)
+        # opt-in field change tracking: stores write only what a turn dirtied,
+        # and the fields each agent changed are kept per run (latest turn)
+        self.track_changes = track_changes
+        self.max_change_reports = max_change_reports
+        self.change_reports: "OrderedDict[str, Dict[str, List[str]]]" = OrderedDict()
 
     async def start_run(self, user_input: str = '', initial_agent: str = None, run_id=None) -> SessionState:
         """Start a new run with an initial agent."""
         self._root_agent = initial_agent or self._root_agent
 
         if run_id:
-            state = self.state_store.get_state(run_id)
-            assert state is not None, f"Run ID {run_id} does not exist."
-        else:
-            run_id = str(uuid.uuid4())
-            state = SessionState(
-                run_id=run_id,
-                pipeline=[self._root_agent],
-                owner_agent_id=self._root_agent,
-                agents_inbox={
-                    self._root_agent: {
-                        "user": [{
-                            "type": "chat",
-                            "msg": user_input}]}
-                },
-                timeline=[{
-                    "timestamp": datetime.now().isoformat(),
-                    "event": "started",
-                    "agent_id": self._root_agent}]
-            )
+            async with self.turn_locks.hold(run_id):
+                state = await self._load(run_id)
+                assert state is not None, f"Run ID {run_id} does not exist."
+                self._begin_tracking(state)
+                state = await self.process_run(run_id, state)
+                self._record_changes(run_id, state)
+                await self._persist(run_id, state)
+                return state
+
+        run_id = str(uuid.uuid4())
+        state = SessionState(
+            run_id=run_id,
+            pipeline=[self._root_agent],
+            owner_agent_id=self._root_agent,
+            agents_inbox={
+                self._root_agent: {
+                    "user": [{
+                        "type": "chat",
+                        "msg": user_input}]}
+            },
+            timeline=[{
+                "timestamp": datetime.now().isoformat(),
+                "event": "started",
+                "agent_id": self._root_agent}]
+        )
 
         # Process with initial agent
+        self._begin_tracking(state)
         state = await self.process_run(run_id, state)
-        self.state_store.store_state(run_id, state)
+        self._record_changes(run_id, state)
+        await self._persist(run_id, state)
         return state
 
     async def process_run(self, run_id: str, state) -> SessionState:
-        """Process a run with the current owner agent."""
-
-        # state.user_outbox = []
+        """Run agent hops on `state`, starting with its current owner, until the turn ends."""
         if not state:
             raise ValueError(f"Run {run_id} not found")
-
-        # print(f"Running - \nRun ID: {run_id} \nAgent ID: {state.owner_agent_id}")
-        # print("====")
-
-        owner_agent_id = state.owner_agent_id
-
-        if not owner_agent_id:
-            state.owner_agent_id = self._root_agent
-            state.pipeline.append(self._root_agent)
-            owner_agent_id = self._root_agent
-
-        agent = self.agent_registry.get_agent(owner_agent_id)
-
-        # Let agent handle the state
-        state = await agent.handle(state)
-
-        # Process agent response
-        new_state = await self.process_agent_response(run_id, state)
-        return new_state
-
-    async def process_agent_response(self, run_id: str, state):
-        """Process the response from an agent."""
-        prev_owner = state.owner_agent_id
-
-        # print(f"Processing response")
-        if state.status == SessionStatus.HANDOFF:
-            # print(f"HANDOFF to: {state.owner_agent_id}\n===")
-            state.timeline.append({
-                "timestamp": datetime.now().isoformat(),
-                "event": "handoff",
-                "from_agent": prev_owner,  # <- now correctly logs previous owner
-                "to_agent": state.owner_agent_id,
-            })
-
-            # Continue processing with the new owner agent
-            return await self.process_run(run_id, state)
-
-        elif state.status == SessionStatus.WAIT_HUMAN:
-            # print(f"WAIT_HUMAN\n===")
-            state.timeline.append({
-                "timestamp": datetime.now().isoformat(),
-                "event": "ask_human",
-                "agent_id": state.owner_agent_id
-            })
-
-        elif state.status == SessionStatus.COMPLETED:
-            # print(f"COMPLETED\n===")
-            state.timeline.append({
-                "timestamp": datetime.now().isoformat(),
-                "event": "completed",
-                "agent_id": state.owner_agent_id
-            })
-
-        elif state.status == SessionStatus.ERROR:
-            # print(f"ERROR\n===")
-            state.error = state.error
-            state.timeline.append({
-                "timestamp": datetime.now().isoformat(),
-                "event": "error",
-                "agent_id": state.owner_agent_id,
-                "error": state.error
-            })
-
-        return state
+        return await self.scheduler.run(run_id, state, self._root_agent)
 
     async def inject_human_input(self, run_id: str, user_input: str) -> SessionState:
-        """Inject human input into a waiting run."""
-        state = self.state_store.get_state(run_id)
+        """
+        Inject human input into a waiting run.
+        Turns of the same run are serialized by `turn_locks`, so a second message
+        waits for the first turn to be persisted instead of racing it.
+        If another writer committed to the run in the meantime (StateConflictError),
+        the turn is replayed on the fresh state up to `conflict_retries` times.
+        """
+        async with self.turn_locks.hold(run_id):
+            for attempt in range(self.conflict_retries + 1):
+                state = await self._load(run_id)
+                if state is None:
+                    raise ValueError(f"Run {run_id} not found")
+                self._begin_tracking(state)
+                state = await self.run_turn(run_id, state, user_input)
+                self._record_changes(run_id, state)
+                try:
+                    await self._persist(run_id, state)
+                    return state
+                except StateConflictError:
+                    if attempt == self.conflict_retries:
+                        raise
+
+    async def run_turn(self, run_id: str, state: SessionState, user_input: str) -> SessionState:
+        """Apply one human turn to `state` and process it (without persisting)."""
         state.turn_index += 1
         state.clear_before_turn()
 
@@ -135,25 +144,71 @@ class AiFactoryPipeline:
             state.pipeline.append(self._root_agent)
             owner_agent_id = self._root_agent
 
-        # send user input to the owner agent's inbox
+        # send user input to the owner agent's inbox (next to messages received between turns)
         if owner_agent_id not in state.agents_inbox:
             state.agents_inbox[owner_agent_id] = {}
 
-        state.agents_inbox[owner_agent_id] = {
-            AgentID.user: [{
-                "type": "chat",
-                "msg": user_input
-            }]}
+        state.agents_inbox[owner_agent_id].setdefault(AgentID.user, []).append({
+            "type": "chat",
+            "msg": user_input
+        })
 
         # Resume processing
         state.status = SessionStatus.HANDOFF
-        state = await self.process_run(run_id, state)
-        self.state_store.store_state(run_id, state)
-        return state
+        return await self.process_run(run_id, state)
+
+    async def _load(self, run_id: str) -> Optional[SessionState]:
+        """
+        State a turn starts from. Under a RunLease other processes write the
+        run between our turns, so a cached copy is dropped rather than trusted.
+        """
+        if self.turn_locks.lease is not None:
+            invalidate = getattr(self.state_store, "invalidate", None)
+            if callable(invalidate):
+                await invalidate(run_id)
+        return await self.state_store.get_state(run_id)
+
+    async def _persist(self, run_id: str, state: SessionState) -> None:
+        """
+        Store the state of a finished turn, inside its turn lock. A write-behind
+        store (CachedStateStore) writes it through, so the next holder of the
+        lock (or lease) reads it, and a StateConflictError is raised here, where
+        the turn can still be replayed, instead of in its background flusher.
+        """
+        await self.state_store.store_state(run_id, state)
+        flush = getattr(self.state_store, "flush", None)
+        if callable(flush):
+            await flush(run_id, raise_errors=True)
+
+    def _begin_tracking(self, state: SessionState) -> None:
+        if self.track_changes:
+            track_changes(state).reset_report()
+
+    def _record_changes(self, run_id: str, state: SessionState) -> None:
+        """Keep (and log) which agents changed which fields during the turn."""
+        tracker = changes_of(state)
+        if tracker is None:
+            return
+        report = tracker.report()
+        logger.debug(f"Run {run_id} turn {state.turn_index} changed {report}")
+        self.change_reports[run_id] = report
+        self.change_reports.move_to_end(run_id)
+        while len(self.change_reports) > self.max_change_reports:
+            self.change_reports.popitem(last=False)
+
+    def turn_changes(self, run_id: str) -> Optional[Dict[str, List[str]]]:
+        """Fields changed per agent in the latest turn of `run_id` (None if not tracked)."""
+        return self.change_reports.get(run_id)
 
     async def get_run_state(self, run_id: str) -> Optional[Dict[str, Any]]:
-        """Get the current state of a run."""
-        return self.state_store.get_state(run_id)
+        """Get the current state of a run, including its full chat history and timeline."""
+        return await self.state_store.get_state(run_id, materialize_logs=True)
+
+    async def close(self) -> None:
+        """Flush cached state and release state store resources (pooled connections etc.)."""
+        dispose = getattr(self.state_store, "dispose", None)
+        if callable(dispose):
+            await dispose()
 
 
 def print_wrapped(text: str, width: int = 140, *, break_long_words: bool = False) -> None:
@@ -1,14 +1,19 @@
-from arix_chatbot.app.ai_factory_pipeline import AiFactoryPipeline
-from arix_chatbot.state_manager.state_store import SessionStatus
+from arix_chatbot.app.ai_factory_pipeline import AiFactoryPipeline, STATE_STORES, build_state_store
+from arix_chatbot.state_manager.state_store import SessionStatus, StateStore
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+from arix_chatbot.state_manager.sharded_state_store import ShardedSqlStateStore
+from arix_chatbot.state_manager.checkpoint_retention import CheckpointCompactor, RetentionPolicy
 from arix_chatbot.app.agent_registry import AgentRegistry
-from fastapi import FastAPI, HTTPException
-from typing import Optional, Dict, Any
+from fastapi import FastAPI, HTTPException, Query
+from typing import Optional, Dict, Any, List
+from datetime import datetime
 from arix_chatbot.agents.agents_pool import AGENTS
 from pydantic import BaseModel
 from pathlib import Path
 import argparse
 import uvicorn
 import logging
+import os
 import sys
 
 
@@ -16,14 +21,47 @@ import sys
 sys.path.append(Path(__file__).parent.parent.as_posix())
 logger = logging.getLogger(__name__)
 
+CHECKPOINT_COMPACTION_INTERVAL_SECONDS = 60 * 60
+
+
+def set_state_store() -> StateStore:
+    """
+    State store picked by the environment (main() sets it from its flags, as
+    uvicorn imports this module anew): ARIX_STATE_STORE ("sql" or "sharded"),
+    ARIX_DB_URL, ARIX_SHARDS_DIR and ARIX_SHARDS.
+    """
+    return build_state_store(
+        os.environ.get("ARIX_STATE_STORE", "sql"),
+        db_url=os.environ.get("ARIX_DB_URL"),
+        shards_dir=os.environ.get("ARIX_SHARDS_DIR"),
+        shards=int(os.environ.get("ARIX_SHARDS", "8")),
+    )
+
 
 def set_pipeline():
     agents_store_ = AgentRegistry(agents=AGENTS)
-    ai_factory_pipeline = AiFactoryPipeline(agents_store=agents_store_, root_agent=AGENTS[0].agent_id)
+    ai_factory_pipeline = AiFactoryPipeline(agents_store=agents_store_, state_store=set_state_store(),
+                                            root_agent=AGENTS[0].agent_id)
     return ai_factory_pipeline
 
 
+def set_compactors(ai_factory_pipeline: AiFactoryPipeline) -> List[CheckpointCompactor]:
+    # unwrap the session cache, compaction works on the durable store(s)
+    store = getattr(ai_factory_pipeline.state_store, "backend", ai_factory_pipeline.state_store)
+    stores = store.shards if isinstance(store, ShardedSqlStateStore) else [store]
+    return [
+        CheckpointCompactor(
+            shard,
+            RetentionPolicy(),
+            interval_seconds=CHECKPOINT_COMPACTION_INTERVAL_SECONDS,
+        )
+        for shard in stores
+        if isinstance(shard, SqlStateStore)
+    ]
+
+
 pipeline = set_pipeline()
+compactors = set_compactors(pipeline)
 app = FastAPI(title="Arix-AI-Factory")
 
 
@@ -52,13 +90,38 @@ async def start_run():
         raise HTTPException(500, "Internal server error")
 
 
+@app.get("/v1/runs")
+async def list_runs(status: Optional[str] = None, owner: Optional[str] = None,
+                    updated_since: Optional[datetime] = None, cursor: Optional[str] = None,
+                    limit: int = Query(50, ge=1, le=500)):
+    """List runs, most recently updated first; follow `next_cursor` for the next page."""
+    if not hasattr(pipeline.state_store, "list_sessions"):
+        raise HTTPException(501, "State store does not support listing")
+    try:
+        page = await pipeline.state_store.list_sessions(
+            status=status, owner_agent_id=owner, updated_since=updated_since, cursor=cursor, limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return page.todict()
+
+
 @app.get("/v1/{run_id}")
 async def get_run(run_id: str):
     """Get run state."""
     state = await pipeline.get_run_state(run_id)
     if not state:
         raise HTTPException(404, "Run not found")
-    return state
+    return state.todict()
+
+
+@app.get("/v1/{run_id}/changes")
+async def get_run_changes(run_id: str):
+    """Fields each agent changed in the run's latest turn (needs a pipeline with track_changes)."""
+    report = pipeline.turn_changes(run_id)
+    if report is None:
+        raise HTTPException(404, "No change report for this run")
+    return {"run_id": run_id, "changes": report}
 
 
 @app.post("/v1/{run_id}/chat")
@@ -73,6 +136,31 @@ async def inject_user_input(run_id: str, request: HumanInputRequest):
         raise HTTPException(400, e)
 
 
+@app.on_event("startup")
+async def startup():
+    """Start background maintenance jobs."""
+    for compactor in compactors:
+        compactor.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background jobs and release state store connections."""
+    for compactor in compactors:
+        await compactor.stop()
+    await pipeline.close()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Turn queue and state cache counters."""
+    stats = getattr(pipeline.state_store, "stats", None)
+    return {
+        "turns": pipeline.turn_locks.snapshot(),
+        "state_cache": stats.todict() if stats is not None else None,
+    }
+
+
 @app.get("/health")
 async def health():
     """Health check."""
@@ -86,8 +174,16 @@ def main():
     parser.add_argument("--port", type=int, default=5000, help="Port to bind to")
     parser.add_argument("--reload", action="store_true", help="Enable auto-reload")
     parser.add_argument("--log-level", default="info", help="Log level")
+    parser.add_argument("--store", choices=STATE_STORES, help="State store (default: sql)")
+    parser.add_argument("--db-url", help="Database URL of the sql store")
+    parser.add_argument("--shards-dir", help="Directory of the sharded store")
+    parser.add_argument("--shards", type=int, help="Shard count of the sharded store (default: 8)")
 
     args = parser.parse_args()
+    for name, value in (("ARIX_STATE_STORE", args.store), ("ARIX_DB_URL", args.db_url),
+                        ("ARIX_SHARDS_DIR", args.shards_dir), ("ARIX_SHARDS", args.shards)):
+        if value is not None:
+            os.environ[name] = str(value)
 
     print(f"Starting Agent Pipeline API Server")
     print(f"Host: {args.host}:{args.port}")
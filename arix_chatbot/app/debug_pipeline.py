@@ -13,7 +13,7 @@ def load_checkpoint(checkpoint: str = Union[None, str], pipeline: AiFactoryPipel
 
     checkpoint_state = pickle.load(open(checkpoint, "rb"))
     checkpoint_state.status = SessionStatus.HANDOFF
-    pipeline.state_store.store_state(checkpoint_state.run_id, checkpoint_state)
+    asyncio.run(pipeline.state_store.store_state(checkpoint_state.run_id, checkpoint_state, force=True))
     return checkpoint_state.run_id
 
 
@@ -57,6 +57,8 @@ def main(checkpoint_to_load: str = None, checkpoint_save_path: str = None):
         state = asyncio.run(pipeline.get_run_state(run_id))
     state = run_human_feedback_loop(state, pipeline)
 
+    asyncio.run(pipeline.close())
+
     if checkpoint_save_path is not None:
         save_checkpoint(state, path=checkpoint_save_path)
 
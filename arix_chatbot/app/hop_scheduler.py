@@ -0,0 +1,243 @@
+"""
+Agent-hop scheduler of AiFactoryPipeline.
+
+A turn is a sequence of hops: the owner agent handles the state and either
+hands off (status HANDOFF, with a new owner_agent_id) or ends the turn
+(WAIT_HUMAN, COMPLETED or ERROR). HopScheduler runs the hops in a loop
+instead of recursing once per handoff, and:
+
+- ends the turn with ERROR after `max_hops` hops;
+- detects handoff loops: a hop starting from the same owner, pending_handoff
+  stack, agent contexts, inboxes and job statuses as an earlier hop of the
+  turn can only repeat itself, so the turn ends with ERROR. Cycles that keep
+  growing pending_handoff never repeat exactly and are stopped by max_hops;
+- records every hop's wall and CPU time on the hop's timeline event
+  ("handoff", "ask_human", "completed" or "error"). CPU time is that of the
+  event loop thread, so it includes other tasks interleaved with the hop.
+
+Extension point: `plan` picks the agents of the next hop (the owner alone by
+default) and `run_hop` runs them, by default one after another, each only if
+the one before handed off to it. A subclass may run them concurrently; it
+then owns merging their changes into one state. FanOutHopScheduler does so
+for the agents a navigator put in `state.fan_out`.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Set
+
+from arix_chatbot.app.agent_registry import AgentRegistry
+from arix_chatbot.state_manager.state_store import SessionState, SessionStatus
+from arix_chatbot.state_manager.change_tracking import attributed_to
+from arix_chatbot.state_manager.state_merge import FieldMerge, MergeConflictError, isolated_view
+from arix_chatbot.state_manager import state_codec
+
+
+logger = logging.getLogger(__name__)
+
+
+class HopScheduler:
+    def __init__(self, agent_registry: AgentRegistry, *, max_hops: int = 100, detect_loops: bool = True):
+        if max_hops < 1:
+            raise ValueError("max_hops must be >= 1")
+        self.agent_registry = agent_registry
+        self.max_hops = max_hops
+        self.detect_loops = detect_loops
+
+    async def run(self, run_id: str, state: SessionState, root_agent: str) -> SessionState:
+        """Run hops until the turn ends (any status but HANDOFF)."""
+        seen: Set[bytes] = set()
+        path: List[str] = []
+        hop = 0
+        while True:
+            if not state.owner_agent_id:
+                state.owner_agent_id = root_agent
+                state.pipeline.append(root_agent)
+            if hop == self.max_hops:
+                return self._stop(state, hop, f"Run {run_id} exceeded {self.max_hops} agent hops in one turn "
+                                             f"(last hops: {' -> '.join(path[-10:])})")
+            if self.detect_loops:
+                fingerprint = self.fingerprint(state)
+                if fingerprint in seen:
+                    return self._stop(state, hop, f"Handoff loop detected in run {run_id}: {state.owner_agent_id} "
+                                                 f"would repeat an earlier hop (hops: {' -> '.join(path)})")
+                seen.add(fingerprint)
+
+            agent_ids = self.plan(state)
+            hop += 1
+            path.append("+".join(agent_ids))
+            wall, cpu = time.perf_counter(), time.thread_time()
+            state = await self.run_hop(run_id, state, agent_ids)
+            timing = {
+                "hop": hop,
+                "wall_ms": round((time.perf_counter() - wall) * 1000, 3),
+                "cpu_ms": round((time.thread_time() - cpu) * 1000, 3),
+            }
+            if len(agent_ids) > 1:
+                timing["agents"] = agent_ids
+            self.record_hop(state, agent_ids[0], timing)
+            if state.status != SessionStatus.HANDOFF:
+                return state
+
+    def plan(self, state: SessionState) -> List[str]:
+        """Agents of the next hop; the first is the owner. The default runs the owner alone."""
+        return [state.owner_agent_id]
+
+    async def run_hop(self, run_id: str, state: SessionState, agent_ids: List[str]) -> SessionState:
+        """
+        Run the agents of one hop in order. An agent runs only if the one
+        before handed off to it; otherwise the hop ends there and the next
+        one starts from whatever the state says.
+        """
+        for i, agent_id in enumerate(agent_ids):
+            if i and (state.status != SessionStatus.HANDOFF or state.owner_agent_id != agent_id):
+                break
+            state = await self.run_agent(state, agent_id)
+        return state
+
+    async def run_agent(self, state: SessionState, agent_id: str) -> SessionState:
+        agent = self.agent_registry.get_agent(agent_id)
+        if agent is None:
+            state.status = SessionStatus.ERROR
+            state.error = f"Unknown agent {agent_id!r}"
+            return state
+        with attributed_to(state, agent_id):
+            return await agent.handle(state)
+
+    @staticmethod
+    def fingerprint(state: SessionState) -> bytes:
+        """What decides the next hop: owner, handoff stack, and the progress agents keep in the state."""
+        return state_codec.dumps([state.owner_agent_id, state.pending_handoff, state.agents_context,
+                                  state.agents_inbox, state.job_status])
+
+    @staticmethod
+    def record_hop(state: SessionState, from_agent: str, timing: Dict[str, Any]) -> None:
+        """Append the timeline event of a finished hop."""
+        timestamp = datetime.now().isoformat()
+        if state.status == SessionStatus.HANDOFF:
+            event = {"timestamp": timestamp, "event": "handoff", "from_agent": from_agent,
+                     "to_agent": state.owner_agent_id}
+        elif state.status == SessionStatus.WAIT_HUMAN:
+            event = {"timestamp": timestamp, "event": "ask_human", "agent_id": state.owner_agent_id}
+        elif state.status == SessionStatus.COMPLETED:
+            event = {"timestamp": timestamp, "event": "completed", "agent_id": state.owner_agent_id}
+        elif state.status == SessionStatus.ERROR:
+            event = {"timestamp": timestamp, "event": "error", "agent_id": state.owner_agent_id,
+                     "error": state.error}
+        else:
+            event = None
+        if event is not None:
+            state.timeline.append({**event, **timing})
+
+    def _stop(self, state: SessionState, hop: int, error: str) -> SessionState:
+        state.status = SessionStatus.ERROR
+        state.error = error
+        self.record_hop(state, state.owner_agent_id, {"hop": hop})
+        return state
+
+
+class FanOutHopScheduler(HopScheduler):
+    """
+    Runs independent agents in one hop. When the owner is in `state.fan_out`,
+    so are the consecutive agents on top of pending_handoff that are there
+    too (each at most once): they would run next, one after another, and the
+    navigator declared them independent of each other.
+
+    Each agent of such a hop runs concurrently on an isolated view of the
+    state; their field changes are then merged back in handoff order (see
+    state_merge). An agent whose changes conflict with an earlier one is run
+    again, alone, on the merged state - what the sequential path would have
+    done - and so is an agent after it that ends the turn.
+
+    Each agent sees the handoff stack it would have seen sequentially (the
+    agents after it on top); one that just handed off to the next agent
+    leaves the handoff fields to the last. Once an agent ends the turn
+    (status other than HANDOFF), the changes of the agents after it are
+    dropped, as they would not have run yet: they stay on its stack.
+    """
+
+    def plan(self, state: SessionState) -> List[str]:
+        group = [state.owner_agent_id]
+        if state.owner_agent_id in state.fan_out:
+            for agent_id in reversed(state.pending_handoff):
+                if agent_id not in state.fan_out or agent_id in group:
+                    break
+                group.append(agent_id)
+        return group
+
+    async def run_hop(self, run_id: str, state: SessionState, agent_ids: List[str]) -> SessionState:
+        # A fanned-out agent runs once: a later handoff to it is an ordinary one
+        if any(agent_id in state.fan_out for agent_id in agent_ids):
+            state.fan_out = [agent_id for agent_id in state.fan_out if agent_id not in agent_ids]
+        if len(agent_ids) == 1:
+            return await super().run_hop(run_id, state, agent_ids)
+
+        # Every agent starts as the owner, with the stack it would have in sequence
+        stack = state.pending_handoff[:len(state.pending_handoff) - (len(agent_ids) - 1)]
+        state.pending_handoff = stack
+        merge = FieldMerge(state)
+        views = [self._view(state, agent_id, self._handoffs(stack, agent_ids[i + 1:]))
+                 for i, agent_id in enumerate(agent_ids)]
+        results = await asyncio.gather(*(self.run_agent(view, agent_id) for view, agent_id in zip(views, agent_ids)),
+                                       return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        rerun = []
+        for i, (agent_id, view) in enumerate(zip(agent_ids, results)):
+            if rerun and view.status != SessionStatus.HANDOFF:
+                # it ends the turn, which happens only after the agents to run again before it
+                rerun += agent_ids[i:]
+                break
+            if self._passed_on(view, stack, agent_ids[i + 1:]):
+                view.owner_agent_id, view.pending_handoff = state.owner_agent_id, list(state.pending_handoff)
+            try:
+                changes = merge.fold(view)
+            except MergeConflictError as e:
+                logger.warning(f"Run {run_id}: {agent_id} conflicts with a concurrent agent on {e.fields}; "
+                               f"running it again after them")
+                state.timeline.append({"timestamp": datetime.now().isoformat(), "event": "merge_conflict",
+                                       "agent_id": agent_id, "fields": e.fields})
+                rerun.append(agent_id)
+                continue
+            self._apply(state, agent_id, changes)
+            if state.status != SessionStatus.HANDOFF:
+                return state
+
+        # Re-runs see the merged state, and run one after another
+        for i, agent_id in enumerate(rerun):
+            merge = FieldMerge(state)
+            view = await self.run_agent(self._view(state, agent_id, self._handoffs(stack, rerun[i + 1:])), agent_id)
+            if self._passed_on(view, stack, rerun[i + 1:]):
+                view.owner_agent_id, view.pending_handoff = state.owner_agent_id, list(state.pending_handoff)
+            self._apply(state, agent_id, merge.fold(view))
+            if state.status != SessionStatus.HANDOFF:
+                break
+        return state
+
+    @staticmethod
+    def _handoffs(stack: List[str], later: List[str]) -> List[str]:
+        """pending_handoff of an agent of a group with `later` agents still to run after it."""
+        return stack + list(reversed(later))
+
+    @classmethod
+    def _passed_on(cls, view: SessionState, stack: List[str], later: List[str]) -> bool:
+        """Whether the agent of `view` handed off to the next agent of its group, like in sequence."""
+        return (bool(later) and view.status == SessionStatus.HANDOFF and view.owner_agent_id == later[0]
+                and view.pending_handoff == cls._handoffs(stack, later[1:]))
+
+    @staticmethod
+    def _view(state: SessionState, agent_id: str, pending_handoff: List[str]) -> SessionState:
+        view = isolated_view(state)
+        view.owner_agent_id = agent_id
+        view.pending_handoff = list(pending_handoff)
+        return view
+
+    @staticmethod
+    def _apply(state: SessionState, agent_id: str, changes: Dict[str, Any]) -> None:
+        with attributed_to(state, agent_id):
+            for name, value in changes.items():
+                setattr(state, name, value)
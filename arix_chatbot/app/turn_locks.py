@@ -0,0 +1,91 @@
+from __future__ import annotations
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Any
+
+from arix_chatbot.state_manager.run_lease import RunLease
+
+
+@dataclass
+class TurnQueueMetrics:
+    turns: int = 0
+    queued_turns: int = 0          # turns that had to wait behind another turn of the same run
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    max_queue_depth: int = 0
+
+    def todict(self) -> Dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "queued_turns": self.queued_turns,
+            "avg_wait_seconds": self.total_wait_seconds / self.turns if self.turns else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+@dataclass
+class _RunSlot:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    depth: int = 0  # running + waiting turns
+
+
+class TurnLocks:
+    """
+    Serializes turns per run: turns of one run execute strictly in arrival
+    order (asyncio.Lock is FIFO), turns of different runs never wait on each
+    other. With a RunLease, the in-process lock is followed by a cross-process
+    lease so several workers sharing a store also serialize.
+
+    A turn must be durable in the store before `hold()` exits (a write-behind
+    cache has to be flushed inside it): the next holder, possibly in another
+    process, reads the run from the store.
+    """
+
+    def __init__(self, lease: Optional[RunLease] = None):
+        self.lease = lease
+        self.metrics = TurnQueueMetrics()
+        self._slots: Dict[str, _RunSlot] = {}
+
+    def queue_depth(self, run_id: str) -> int:
+        slot = self._slots.get(run_id)
+        return slot.depth if slot else 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.metrics.todict(),
+            "active_runs": len(self._slots),
+            "queue_depth": sum(slot.depth for slot in self._slots.values()),
+        }
+
+    @asynccontextmanager
+    async def hold(self, run_id: str):
+        slot = self._slots.get(run_id)
+        if slot is None:
+            slot = self._slots[run_id] = _RunSlot()
+        slot.depth += 1
+        queued = slot.depth > 1
+        self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, slot.depth)
+        t0 = time.monotonic()
+        try:
+            async with slot.lock:
+                if self.lease is not None:
+                    async with self.lease.hold(run_id):
+                        self._record_wait(time.monotonic() - t0, queued)
+                        yield
+                else:
+                    self._record_wait(time.monotonic() - t0, queued)
+                    yield
+        finally:
+            slot.depth -= 1
+            if slot.depth == 0 and self._slots.get(run_id) is slot:
+                del self._slots[run_id]
+
+    def _record_wait(self, waited: float, queued: bool) -> None:
+        self.metrics.turns += 1
+        if queued:
+            self.metrics.queued_turns += 1
+        self.metrics.total_wait_seconds += waited
+        self.metrics.max_wait_seconds = max(self.metrics.max_wait_seconds, waited)
@@ -1,78 +1,31 @@
-from pathlib import Path
-from glob import glob
-import importlib
 import inspect
-import os
 from types import new_class
-from typing import Literal, TypedDict, List, Union
+from typing import Literal, TypedDict, List, Union, Dict
 
+from arix_chatbot.jobs.job_codec import JobCodec
+from arix_chatbot.jobs.job_manifest import JOB_MANIFEST
+from arix_chatbot.jobs.registry import JobRegistry
 
-JOB_REGISTRY = {}
+
+# job_type -> job class, imported on first lookup (see jobs.registry)
+JOB_REGISTRY = JobRegistry(JOB_MANIFEST)
+# codecs of the job classes, compiled when they are registered
+JOB_CODECS: Dict[type, JobCodec] = JOB_REGISTRY.codecs
 # TYPED_DICTS = {}
-EXCLUDE_TASKS = ["__init__.py", "job_ids.py"]
-BASE_PATH = Path(__file__).parent
 
 
 def snake_to_camel(snake):
     return ''.join(word.capitalize() for word in snake.split('_'))
 
 
-def load_task_classes():
-    for filepath in glob((BASE_PATH / "*.py").as_posix()):
-        filename = os.path.basename(filepath)
-        if filename in EXCLUDE_TASKS:
-            continue
+def register_job(cls) -> None:
+    """Register a job class under its job_type and compile its codec."""
+    JOB_REGISTRY.register(cls)
 
-        module_name = filename[:-3]  # strip .py
-        full_module = f"{__package__}.{module_name}"
 
-        try:
-            module = importlib.import_module(full_module)
-        except ImportError as e:
-            print(f"Could not import module {full_module}: {e}")
-            continue
-
-        # Iterate over all classes defined in this module
-        for name, cls in inspect.getmembers(module, inspect.isclass):
-            # Only classes *defined in this module* (not imported from elsewhere)
-            if cls.__module__ != module.__name__:
-                continue
-
-            # Only subclasses of Job, and not the base Job itself
-            # if not issubclass(cls, Job) or cls is Job:
-            #     continue
-
-            # Register by job_type (assuming each subclass defines job_type)
-            try:
-                job_type = cls.job_type
-            except AttributeError:
-                print(f"Class {cls.__name__} in {full_module} has no 'job_type'; skipping")
-                continue
-
-            if job_type in JOB_REGISTRY:
-                print(f"Duplicate job_type {job_type!r} (existing: {JOB_REGISTRY[job_type]}, new: {cls}); skipping new one")
-                continue
-
-            if inspect.isclass(cls):
-                JOB_REGISTRY[cls.job_type] = cls
-
-# def load_task_classes():
-#     for filepath in glob((BASE_PATH / "*.py").as_posix()):
-#         filename = os.path.basename(filepath)
-#         if filename in EXCLUDE_TASKS:
-#             continue
-#
-#         module_name = filename[:-3]
-#         class_name = snake_to_camel(module_name)
-#         full_module = f"{__package__}.{module_name}"  # <---- FIXED
-#
-#         try:
-#             module = importlib.import_module(full_module)
-#             cls = getattr(module, class_name)
-#             if inspect.isclass(cls):
-#                 JOB_REGISTRY[cls.job_type] = cls
-#         except (ImportError, AttributeError) as e:
-#             print(f"Could not import {class_name} from {full_module}: {e}")
+def job_codec(cls) -> JobCodec:
+    """Codec of a job class (compiled on first use for classes never registered)."""
+    return JOB_REGISTRY.codec(cls)
 
 
 def get_class_init_args(cls):
@@ -126,7 +79,3 @@ def create_typed_dict_class(class_name: str, task_type: str, kwargs_fields: dict
     outer_class = new_class(class_name, (TypedDict,), exec_body=outer_body)
     return outer_class
 
-
-# Load tasks and generate TypedDicts
-load_task_classes()
-pass
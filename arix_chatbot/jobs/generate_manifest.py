@@ -0,0 +1,71 @@
+"""
+Generate (or check) arix_chatbot/jobs/job_manifest.py, the declared job
+types JOB_REGISTRY resolves lazily (see jobs.registry), from the job classes
+defined in the package's modules:
+
+    python -m arix_chatbot.jobs.generate_manifest --write
+    python -m arix_chatbot.jobs.generate_manifest --check   # exit 1 if out of date
+"""
+from __future__ import annotations
+import argparse
+import importlib
+import inspect
+import pkgutil
+import sys
+from pathlib import Path
+from typing import Dict, Mapping
+
+
+MANIFEST_PATH = Path(__file__).with_name("job_manifest.py")
+
+
+def scan_job_classes(package: str = "arix_chatbot.jobs") -> Dict[str, str]:
+    """job_type -> "module:ClassName" of the job classes defined in `package` (imports its modules)."""
+    from arix_chatbot.jobs.job import Job
+
+    found: Dict[str, str] = {}
+    for module_info in pkgutil.iter_modules(importlib.import_module(package).__path__):
+        module = importlib.import_module(f"{package}.{module_info.name}")
+        for name, cls in inspect.getmembers(module, inspect.isclass):
+            # Only Job classes *defined in this module* (not imported from elsewhere)
+            if cls.__module__ != module.__name__ or not issubclass(cls, Job):
+                continue
+            if cls.job_type in found:
+                raise ValueError(f"Duplicate job_type {cls.job_type!r}: {found[cls.job_type]} and {module.__name__}:{name}")
+            found[cls.job_type] = f"{module.__name__}:{name}"
+    return dict(sorted(found.items()))
+
+
+def render_manifest(manifest: Mapping[str, str]) -> str:
+    lines = ['"""',
+             "Job types of arix_chatbot.jobs -> \"module:ClassName\" (see jobs.registry).",
+             "",
+             "Generated by `python -m arix_chatbot.jobs.generate_manifest --write`; do not edit.",
+             '"""',
+             "JOB_MANIFEST = {"]
+    lines += [f"    {job_type!r}: {target!r}," for job_type, target in manifest.items()]
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate or check the job manifest.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--write", action="store_true", help=f"rewrite {MANIFEST_PATH.name}")
+    mode.add_argument("--check", action="store_true", help="exit 1 if the manifest is out of date")
+    args = parser.parse_args()
+
+    rendered = render_manifest(scan_job_classes())
+    current = MANIFEST_PATH.read_text() if MANIFEST_PATH.exists() else None
+    if args.check:
+        if rendered != current:
+            print(f"{MANIFEST_PATH} is out of date; run python -m arix_chatbot.jobs.generate_manifest --write")
+            sys.exit(1)
+        print(f"{MANIFEST_PATH} is up to date")
+    elif rendered != current:
+        MANIFEST_PATH.write_text(rendered)
+        print(f"wrote {MANIFEST_PATH}")
+
+
+if __name__ == "__main__":
+    main()
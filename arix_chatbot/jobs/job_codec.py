@@ -0,0 +1,53 @@
+"""
+Per-class Job codecs, compiled once when a job class is registered.
+
+`compile_codec(cls)` generates a `decode(data) -> cls` constructor and an
+`encode(job) -> dict` serializer with the class' field names written into
+their source (the way dataclasses builds __init__), so Job.from_dict and
+Job.to_dict no longer walk `fields()` on every call.
+"""
+from __future__ import annotations
+from dataclasses import fields, MISSING
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Type
+
+
+class JobCodec(NamedTuple):
+    decode: Callable[[Mapping[str, Any]], Any]
+    encode: Callable[[Any], Dict[str, Any]]
+
+
+def compile_codec(cls: Type) -> JobCodec:
+    """Build the decode / encode pair for the Job dataclass `cls`."""
+    namespace: Dict[str, Any] = {"cls": cls, "job_type": cls.job_type}
+    required, arguments, members = [], [], []
+    for f in fields(cls):
+        members.append(f"{f.name!r}: job.{f.name}")
+        if not f.init:
+            continue
+        if f.default is not MISSING:
+            namespace[f"_default_{f.name}"] = f.default
+            arguments.append(f"{f.name}=data.get({f.name!r}, _default_{f.name})")
+        elif f.default_factory is not MISSING:
+            namespace[f"_factory_{f.name}"] = f.default_factory
+            arguments.append(f"{f.name}=data[{f.name!r}] if {f.name!r} in data else _factory_{f.name}()")
+        else:
+            required.append(f.name)
+            arguments.append(f"{f.name}=data[{f.name!r}]")
+    namespace["required"] = frozenset(required)
+    members.append("'job_type': job_type")
+
+    source = (
+        "def decode(data):\n"
+        "    try:\n"
+        f"        return cls({', '.join(arguments)})\n"
+        "    except KeyError:\n"
+        "        missing = required - data.keys()\n"
+        "        if not missing:\n"
+        "            raise\n"
+        "        raise ValueError(f'Missing required field(s) {missing} for {cls.__name__}') from None\n"
+        "\n"
+        "def encode(job):\n"
+        f"    return {{{', '.join(members)}}}\n"
+    )
+    exec(compile(source, f"<job codec {cls.__qualname__}>", "exec"), namespace)
+    return JobCodec(namespace["decode"], namespace["encode"])
@@ -0,0 +1,11 @@
+"""
+Job types of arix_chatbot.jobs -> "module:ClassName" (see jobs.registry).
+
+Generated by `python -m arix_chatbot.jobs.generate_manifest --write`; do not edit.
+"""
+JOB_MANIFEST = {
+    'BASE': 'arix_chatbot.jobs.job:Job',
+    'CREATE_RESPONSE': 'arix_chatbot.jobs.user_interactions:CreateResponseJob',
+    'PLAN_A_WORKFLOW': 'arix_chatbot.jobs.user_interactions:PlanWorkflowJob',
+    'TASK_EDITOR': 'arix_chatbot.jobs.llm_task_editors:TaskEditorJob',
+}
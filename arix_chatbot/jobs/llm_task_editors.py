@@ -5,7 +5,7 @@ from dataclasses import dataclass
 from arix_chatbot.jobs.job import Job, JOB_REGISTRY
 
 
-@dataclass
+@dataclass(slots=True)
 class TaskEditorJob(Job):
     """
     Job representing the output handler step:
@@ -0,0 +1,118 @@
+"""
+Lazy, declarative registry of job classes.
+
+Job types are declared, not discovered: `job_manifest.JOB_MANIFEST` maps
+every job_type of this package to "module:ClassName", and other
+distributions can add job types through the `arix_chatbot.jobs` entry point
+group. Nothing is imported up front - a job class is imported (and its codec
+compiled) on the first lookup of its job_type - so importing the package is
+cheap and does not depend on scanning a directory (which fails in zipped or
+frozen deployments).
+
+The manifest is generated from the package's modules; after adding or
+renaming a job class regenerate it with
+
+    python -m arix_chatbot.jobs.generate_manifest --write
+
+(`--check` exits non-zero when it is out of date).
+"""
+from __future__ import annotations
+import importlib
+from typing import Optional, Dict, Iterator, Mapping
+
+from arix_chatbot.jobs.job_codec import JobCodec, compile_codec
+
+ENTRY_POINT_GROUP = "arix_chatbot.jobs"
+
+
+def _load(target: str) -> type:
+    module_name, _, class_name = target.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class JobRegistry(Mapping):
+    """
+    job_type -> job class, resolved on first lookup from the manifest (then
+    the entry points). Also holds the codec of every registered class.
+    """
+
+    def __init__(self, manifest: Mapping[str, str], entry_point_group: Optional[str] = ENTRY_POINT_GROUP):
+        self.manifest = dict(manifest)
+        self.entry_point_group = entry_point_group
+        self.codecs: Dict[type, JobCodec] = {}
+        self._classes: Dict[str, type] = {}
+        self._entry_points: Optional[Dict[str, str]] = None
+
+    def register(self, cls: type) -> type:
+        """Register `cls` under its job_type and compile its codec (usable as a class decorator)."""
+        existing = self._classes.get(cls.job_type)
+        if existing is not None and existing is not cls:
+            # logging is imported here only: this module is on every cold start path
+            import logging
+            logging.getLogger(__name__).warning(f"Duplicate job_type {cls.job_type!r} (existing: {existing}, new: {cls}); skipping new one")
+            return cls
+        self._classes[cls.job_type] = cls
+        self.codecs[cls] = compile_codec(cls)
+        return cls
+
+    def codec(self, cls: type) -> JobCodec:
+        """Codec of a job class (compiled on first use for classes never registered)."""
+        codec = self.codecs.get(cls)
+        if codec is None:
+            codec = self.codecs[cls] = compile_codec(cls)
+        return codec
+
+    def _declared(self) -> Dict[str, str]:
+        """Manifest entries, plus entry points (read once, and only when needed)."""
+        if self._entry_points is None:
+            self._entry_points = {}
+            if self.entry_point_group:
+                from importlib.metadata import entry_points
+                for ep in entry_points(group=self.entry_point_group):
+                    self._entry_points.setdefault(ep.name, ep.value)
+        return {**self._entry_points, **self.manifest}
+
+    def _resolve(self, job_type: str) -> Optional[type]:
+        target = self.manifest.get(job_type)
+        if target is None:
+            target = self._declared().get(job_type)
+        if target is None:
+            return None
+        cls = _load(target)
+        if getattr(cls, "job_type", None) != job_type:
+            raise TypeError(f"{target} is declared for job_type {job_type!r} but has job_type "
+                            f"{getattr(cls, 'job_type', None)!r}; regenerate the job manifest")
+        return self.register(cls)
+
+    def __getitem__(self, job_type: str) -> type:
+        cls = self._classes.get(job_type)
+        if cls is None:
+            cls = self._resolve(job_type)
+            if cls is None:
+                raise KeyError(job_type)
+        return cls
+
+    def get(self, job_type: str, default=None):
+        # cheaper than Mapping.get's try / except KeyError on the hot path
+        cls = self._classes.get(job_type)
+        if cls is not None:
+            return cls
+        if job_type is None:
+            return default
+        cls = self._resolve(job_type)
+        return default if cls is None else cls
+
+    def __contains__(self, job_type) -> bool:
+        return self.get(job_type) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        # Iterating the registry resolves every declared job type
+        for job_type in self._declared():
+            self[job_type]
+        return iter(list(self._classes))
+
+    def __len__(self) -> int:
+        return len(set(self._declared()) | set(self._classes))
+
+    def __repr__(self) -> str:
+        return f"JobRegistry(loaded={sorted(self._classes)}, declared={sorted(self.manifest)})"
@@ -5,7 +5,7 @@ from dataclasses import dataclass
 from arix_chatbot.jobs.job import Job
 
 
-@dataclass
+@dataclass(slots=True)
 class PlanWorkflowJob(Job):
     """
     Job representing the output handler step:
@@ -17,7 +17,7 @@ class PlanWorkflowJob(Job):
     workflow: Optional[List] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class CreateResponseJob(Job):
     """
     Job representing the output handler step:
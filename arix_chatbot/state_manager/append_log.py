@@ -0,0 +1,84 @@
+from typing import Any, Iterable, List
+
+
+# SessionState fields persisted as append-only log rows instead of inside the state document
+LOG_FIELDS = ("chat_full_history", "timeline")
+
+
+class LogNotLoadedError(RuntimeError):
+    """Raised when reading an AppendLog whose stored entries were not loaded."""
+
+
+class AppendLog(list):
+    """
+    A list that knows which of its entries are already persisted.
+
+    Stores hand out logs that are not loaded: they only hold entries appended
+    since the read (`offset` stored entries are left in the database), so
+    appending is free and only the new tail is written back. Reading a log
+    that is not loaded raises LogNotLoadedError - load it first through the
+    store (e.g. `get_state(..., materialize_logs=True)` or `load_logs`).
+    """
+    __slots__ = ("persisted", "offset")
+
+    def __init__(self, items: Iterable[Any] = (), *, persisted: int = 0, offset: int = 0):
+        super().__init__(items)
+        self.persisted = persisted  # entries already written to the log table
+        self.offset = offset        # leading entries not held in memory (0 once loaded)
+
+    @property
+    def loaded(self) -> bool:
+        return self.offset == 0
+
+    def _check_loaded(self) -> None:
+        if self.offset:
+            raise LogNotLoadedError(
+                f"log has {self.offset} stored entries that were not loaded; "
+                f"load it through the state store before reading"
+            )
+
+    def pending(self) -> List[Any]:
+        """Entries appended since the log was last persisted."""
+        return list.__getitem__(self, slice(self.persisted - self.offset, None))
+
+    def mark_persisted(self, upto: int) -> None:
+        """The first `upto` entries are written (entries appended since the write began are not)."""
+        self.persisted = max(self.persisted, upto)
+
+    def attach(self, stored: List[Any]) -> None:
+        """Prepend the `offset` stored entries, making the log fully loaded."""
+        if len(stored) != self.offset:
+            raise ValueError(f"expected {self.offset} stored entries, got {len(stored)}")
+        list.__setitem__(self, slice(0, 0), stored)
+        self.offset = 0
+
+    def __len__(self) -> int:
+        return self.offset + list.__len__(self)
+
+    def __iter__(self):
+        self._check_loaded()
+        return list.__iter__(self)
+
+    def __reversed__(self):
+        self._check_loaded()
+        return list.__reversed__(self)
+
+    def __getitem__(self, item):
+        self._check_loaded()
+        return list.__getitem__(self, item)
+
+    def __contains__(self, item) -> bool:
+        self._check_loaded()
+        return list.__contains__(self, item)
+
+    def __eq__(self, other) -> bool:
+        self._check_loaded()
+        return list.__eq__(self, other)
+
+    def __ne__(self, other) -> bool:
+        return not self == other
+
+    def __repr__(self) -> str:
+        if self.offset:
+            return f"AppendLog(<{self.offset} not loaded> + {list.__repr__(self)})"
+        return list.__repr__(self)
@@ -0,0 +1,294 @@
+"""
+Opt-in change tracking for SessionState.
+
+`track_changes(state)` attaches a ChangeTracker to a state: from then on
+assigning a field, or mutating a dict / list held (at any depth) in a field,
+marks that top-level field dirty. Stores use the tracker to re-encode only
+dirty fields (clean ones reuse the encoding from the last write) and, where
+the backend allows it, to write only those fields.
+
+Tracking converts the dicts / lists put into the state into tracked
+subclasses; the state owns them afterwards, so keep mutating them through
+the state rather than through references kept from before. Other mutable
+objects are not observed - reassign the field after changing them.
+Log fields (chat_full_history, timeline) are append-only logs persisted on
+their own and are not tracked.
+
+Mutations are attributed to the agent set with `tracker.agent(agent_id)`
+(the pipeline wraps each agent's turn in it) and summarised by `report()`.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Optional, Any, Dict, List, Set, Iterator
+
+from arix_chatbot.state_manager.append_log import LOG_FIELDS
+from arix_chatbot.state_manager.state_store import SessionState, SESSION_STATE_FIELDS
+from arix_chatbot.state_manager import state_codec
+
+
+# Fields whose changes are tracked: everything in the stored document
+TRACKED_FIELDS = frozenset(SESSION_STATE_FIELDS) - set(LOG_FIELDS) - {"version"}
+
+# Report key of changes made outside any agent (e.g. by the pipeline itself)
+UNATTRIBUTED = "pipeline"
+
+
+class TrackedDict(dict):
+    """dict marking its owning state field dirty on every mutation."""
+    __slots__ = ("_tracker", "_field")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tracker: Optional[ChangeTracker] = None
+        self._field: Optional[str] = None
+
+    def _changed(self) -> None:
+        if self._tracker is not None:
+            self._tracker.mark(self._field)
+
+    def _own(self, value: Any) -> Any:
+        return _wrap(value, self._tracker, self._field) if self._tracker is not None else value
+
+    def __setitem__(self, key, value) -> None:
+        self._changed()
+        super().__setitem__(key, self._own(value))
+
+    def __delitem__(self, key) -> None:
+        self._changed()
+        super().__delitem__(key)
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self._changed()
+        value = self._own(default)
+        super().__setitem__(key, value)
+        return value
+
+    def update(self, *args, **kwargs) -> None:
+        self._changed()
+        for key, value in dict(*args, **kwargs).items():
+            super().__setitem__(key, self._own(value))
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def pop(self, *args):
+        self._changed()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._changed()
+        return super().popitem()
+
+    def clear(self) -> None:
+        self._changed()
+        super().clear()
+
+
+class TrackedList(list):
+    """list marking its owning state field dirty on every mutation."""
+    __slots__ = ("_tracker", "_field")
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._tracker: Optional[ChangeTracker] = None
+        self._field: Optional[str] = None
+
+    def _changed(self) -> None:
+        if self._tracker is not None:
+            self._tracker.mark(self._field)
+
+    def _own(self, value: Any) -> Any:
+        return _wrap(value, self._tracker, self._field) if self._tracker is not None else value
+
+    def __setitem__(self, index, value) -> None:
+        self._changed()
+        if isinstance(index, slice):
+            value = [self._own(v) for v in value]
+        else:
+            value = self._own(value)
+        super().__setitem__(index, value)
+
+    def __delitem__(self, index) -> None:
+        self._changed()
+        super().__delitem__(index)
+
+    def append(self, value) -> None:
+        self._changed()
+        super().append(self._own(value))
+
+    def extend(self, values) -> None:
+        self._changed()
+        super().extend(self._own(v) for v in values)
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def __imul__(self, n):
+        self._changed()
+        return super().__imul__(n)
+
+    def insert(self, index, value) -> None:
+        self._changed()
+        super().insert(index, self._own(value))
+
+    def pop(self, *args):
+        self._changed()
+        return super().pop(*args)
+
+    def remove(self, value) -> None:
+        self._changed()
+        super().remove(value)
+
+    def clear(self) -> None:
+        self._changed()
+        super().clear()
+
+    def sort(self, *args, **kwargs) -> None:
+        self._changed()
+        super().sort(*args, **kwargs)
+
+    def reverse(self) -> None:
+        self._changed()
+        super().reverse()
+
+
+def _wrap(value: Any, tracker: "ChangeTracker", name: str) -> Any:
+    """`value` with every dict / list in it owned by `tracker` under field `name`."""
+    if isinstance(value, (TrackedDict, TrackedList)) and value._tracker is tracker and value._field == name:
+        return value
+    if type(value) in (dict, TrackedDict):
+        wrapped = TrackedDict()
+        for key, item in value.items():
+            dict.__setitem__(wrapped, key, _wrap(item, tracker, name))
+    elif type(value) in (list, TrackedList):
+        wrapped = TrackedList(_wrap(item, tracker, name) for item in value)
+    else:
+        return value
+    wrapped._tracker, wrapped._field = tracker, name
+    return wrapped
+
+
+class ChangeTracker:
+    """
+    Dirty fields of one SessionState since its last successful write, with
+    the encodings of the clean ones and per-agent attribution.
+    """
+
+    def __init__(self):
+        # field -> generation of its last change; generations tell a write
+        # which of the fields it encoded were changed again meanwhile
+        self.dirty: Dict[str, int] = {}
+        self.encoded: Dict[str, bytes] = {}
+        # store version the clean fields are known to match (None: unknown)
+        self.version: Optional[int] = None
+        self.current_agent: Optional[str] = None
+        self.by_agent: Dict[str, Set[str]] = {}
+        self._generation = 0
+
+    # ---- Recording ----------------------------------------------------------
+
+    def mark(self, name: str) -> None:
+        self._generation += 1
+        self.dirty[name] = self._generation
+        self.encoded.pop(name, None)
+        self.by_agent.setdefault(self.current_agent or UNATTRIBUTED, set()).add(name)
+
+    def assign(self, name: str, value: Any) -> Any:
+        """Called by SessionState.__setattr__: mark `name` and take ownership of `value`."""
+        if name not in TRACKED_FIELDS:
+            return value
+        self.mark(name)
+        return _wrap(value, self, name)
+
+    @contextmanager
+    def agent(self, agent_id: str) -> Iterator["ChangeTracker"]:
+        """Attribute changes made inside the block to `agent_id`."""
+        previous, self.current_agent = self.current_agent, agent_id
+        try:
+            yield self
+        finally:
+            self.current_agent = previous
+
+    def report(self) -> Dict[str, List[str]]:
+        """Fields changed per agent since the last `reset_report`."""
+        return {agent_id: sorted(names) for agent_id, names in self.by_agent.items()}
+
+    def reset_report(self) -> None:
+        self.by_agent = {}
+
+    # ---- Writes -------------------------------------------------------------
+
+    def encode_fields(self, doc: Dict[str, Any]) -> Dict[str, bytes]:
+        """Encoded `doc` fields, reusing the last written encoding of clean tracked fields."""
+        encoded = self.encoded
+        return {
+            name: encoded[name] if name in encoded and name not in self.dirty else state_codec.dumps(value)
+            for name, value in doc.items()
+        }
+
+    def begin_write(self) -> Dict[str, int]:
+        """Snapshot of the dirty fields, to pass to `written` once the write committed."""
+        return dict(self.dirty)
+
+    def written(self, snapshot: Dict[str, int], version: int, encoded_fields: Dict[str, bytes]) -> None:
+        """
+        The fields in `encoded_fields` were stored at `version`: fields not
+        changed again since `begin_write` are clean now.
+        """
+        for name, generation in snapshot.items():
+            if self.dirty.get(name) == generation:
+                del self.dirty[name]
+        for name, data in encoded_fields.items():
+            if name in TRACKED_FIELDS and name not in self.dirty:
+                self.encoded[name] = data
+        self.version = version
+
+    def forget(self) -> None:
+        """The stored document is unknown (e.g. after a conflict): next write must be a full one."""
+        self.version = None
+
+
+def track_changes(state: SessionState) -> ChangeTracker:
+    """Start tracking `state` (no-op if it already is); returns its tracker."""
+    tracker = changes_of(state)
+    if tracker is not None:
+        return tracker
+    tracker = ChangeTracker()
+    for name in TRACKED_FIELDS:
+        object.__setattr__(state, name, _wrap(getattr(state, name), tracker, name))
+    object.__setattr__(state, "_changes", tracker)
+    return tracker
+
+
+def track_copy(copy: SessionState, tracker: ChangeTracker) -> ChangeTracker:
+    """
+    Track `copy`, a field-for-field copy of the state `tracker` tracks: its
+    dirty fields, the encodings of the clean ones and the store version they
+    match carry over (the change report starts empty).
+    """
+    copied = track_changes(copy)
+    copied.dirty = dict(tracker.dirty)
+    copied.encoded = dict(tracker.encoded)
+    copied.version = tracker.version
+    copied._generation = tracker._generation
+    return copied
+
+
+def changes_of(state: SessionState) -> Optional[ChangeTracker]:
+    """Tracker of `state`, None if it is not tracked."""
+    return state.__dict__.get("_changes")
+
+
+@contextmanager
+def attributed_to(state: SessionState, agent_id: str) -> Iterator[Optional[ChangeTracker]]:
+    """`tracker.agent(agent_id)` for a tracked state, a no-op otherwise."""
+    tracker = changes_of(state)
+    if tracker is None:
+        yield None
+        return
+    with tracker.agent(agent_id):
+        yield tracker
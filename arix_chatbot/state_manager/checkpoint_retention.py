@@ -0,0 +1,273 @@
+from __future__ import annotations
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional, List, Set, Tuple
+
+from sqlalchemy import select, update, delete
+
+from arix_chatbot.state_manager.state_store import SessionStatus
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore, CheckpointKind
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Which checkpoints survive compaction:
+      - the newest `keep_last` checkpoints of every run are always kept
+      - older ones are thinned to the last checkpoint of each calendar day
+        (`keep_daily`), optionally only for `daily_max_age_days` days
+      - COMPLETED runs idle for `completed_ttl_days` are dropped entirely
+    `vacuum` runs VACUUM / ANALYZE after a pass that deleted something. A
+    SQLite VACUUM rewrites the whole file under an exclusive lock, so it is
+    off by default: freed pages are reused by later writes anyway.
+    """
+    keep_last: int = 50
+    keep_daily: bool = True
+    daily_max_age_days: Optional[int] = None
+    completed_ttl_days: Optional[float] = 30
+    batch_size: int = 500
+    vacuum: bool = False
+
+    def __post_init__(self):
+        if self.keep_last < 1:
+            raise ValueError("keep_last must be >= 1 (the latest checkpoint anchors new deltas)")
+        if self.batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+
+    def select_keep(self, checkpoints: List[Tuple[int, datetime]], now: datetime) -> Set[int]:
+        """Return the seqs to keep out of (seq, ts) pairs of a single run."""
+        ordered = sorted(checkpoints, key=lambda c: c[0], reverse=True)
+        recent = ordered[:self.keep_last]
+        keep = {seq for seq, _ in recent}
+        if not self.keep_daily:
+            return keep
+
+        cutoff = now - timedelta(days=self.daily_max_age_days) if self.daily_max_age_days is not None else None
+        seen_days = {ts.date() for _, ts in recent}
+        # newest first -> the first checkpoint seen for a day is that day's last one
+        for seq, ts in ordered[self.keep_last:]:
+            if cutoff is not None and ts < cutoff:
+                continue
+            if ts.date() not in seen_days:
+                seen_days.add(ts.date())
+                keep.add(seq)
+        return keep
+
+
+@dataclass
+class CompactionReport:
+    runs_scanned: int = 0
+    runs_dropped: int = 0
+    checkpoints_deleted: int = 0
+    checkpoints_rebased: int = 0
+    bytes_before: Optional[int] = None
+    bytes_after: Optional[int] = None
+    started_at: datetime = field(default_factory=datetime.utcnow)
+
+    @property
+    def bytes_reclaimed(self) -> Optional[int]:
+        if self.bytes_before is None or self.bytes_after is None:
+            return None
+        return self.bytes_before - self.bytes_after
+
+
+class CheckpointCompactor:
+    """
+    Background compaction of SqlStateStore's append-only checkpoints table.
+
+    Kept delta checkpoints whose predecessor is being deleted are first
+    rewritten as base snapshots, then the rest is deleted in batches, each
+    step in its own short transaction, so the table stays replayable even if
+    compaction is interrupted.
+    """
+
+    def __init__(self, store: SqlStateStore, policy: RetentionPolicy = None, interval_seconds: float = 3600.0):
+        self.store = store
+        self.policy = policy or RetentionPolicy()
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    # ---- Background loop ------------------------------------------------
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                report = await self.run_once()
+                logger.info(
+                    f"Checkpoint compaction: {report.checkpoints_deleted} deleted, "
+                    f"{report.checkpoints_rebased} rebased, {report.runs_dropped} runs dropped, "
+                    f"{report.bytes_reclaimed} bytes reclaimed"
+                )
+            except Exception as e:
+                logger.error(f"Checkpoint compaction failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    # ---- Compaction -----------------------------------------------------
+
+    async def run_once(self, now: datetime = None) -> CompactionReport:
+        now = now or datetime.utcnow()
+        await self.store._ensure_ready()
+        report = CompactionReport(bytes_before=await self._db_size())
+
+        if self.policy.completed_ttl_days is not None:
+            cutoff = now - timedelta(days=self.policy.completed_ttl_days)
+            for ns, run_id in await self._expired_runs(cutoff):
+                deleted = await self._drop_run(ns, run_id, cutoff)
+                if deleted is not None:
+                    report.checkpoints_deleted += deleted
+                    report.runs_dropped += 1
+
+        cp = self.store.checkpoints.c
+        async with self.store.engine.connect() as conn:
+            runs = (await conn.execute(select(cp.ns, cp.run_id).distinct())).fetchall()
+        for ns, run_id in runs:
+            report.runs_scanned += 1
+            await self._compact_run(ns, run_id, now, report)
+
+        if self.policy.vacuum and (report.checkpoints_deleted or report.runs_dropped):
+            await self._vacuum_analyze()
+        report.bytes_after = await self._db_size()
+        return report
+
+    async def _expired_runs(self, cutoff: datetime) -> List[Tuple[str, str]]:
+        sc = self.store.sessions.c
+        async with self.store.engine.connect() as conn:
+            rows = (await conn.execute(
+                select(sc.ns, sc.run_id)
+                .where((sc.status == SessionStatus.COMPLETED) & (sc.updated_at < cutoff))
+            )).fetchall()
+        return [(ns, run_id) for ns, run_id in rows]
+
+    async def _drop_run(self, ns: str, run_id: str, cutoff: datetime) -> Optional[int]:
+        """
+        Delete an expired run with everything keyed by it, in one transaction
+        that re-checks the expiry: a run written since `_expired_runs` saw it
+        is left alone (returns None), otherwise returns the checkpoints deleted.
+        """
+        store, sc = self.store, self.store.sessions.c
+
+        async def _delete():
+            async with store._tx() as conn:
+                result = await conn.execute(
+                    delete(store.sessions).where(
+                        (sc.ns == ns) & (sc.run_id == run_id)
+                        & (sc.status == SessionStatus.COMPLETED) & (sc.updated_at < cutoff)
+                    )
+                )
+                if result.rowcount == 0:
+                    return None
+                deleted = 0
+                for table in (store.checkpoints, store.session_logs, store.session_events, store.run_leases):
+                    result = await conn.execute(
+                        table.delete().where((table.c.ns == ns) & (table.c.run_id == run_id))
+                    )
+                    if table is store.checkpoints:
+                        deleted = result.rowcount
+                return deleted
+
+        return await store._retryable(_delete)
+
+    async def _compact_run(self, ns: str, run_id: str, now: datetime, report: CompactionReport) -> None:
+        cp = self.store.checkpoints.c
+        scope = (cp.ns == ns) & (cp.run_id == run_id)
+        async with self.store.engine.connect() as conn:
+            stamps = (await conn.execute(select(cp.seq, cp.ts).where(scope))).fetchall()
+        keep = self.policy.select_keep([(seq, ts) for seq, ts in stamps], now)
+        if len(keep) == len(stamps):
+            return
+
+        # Only runs with something to drop read their blobs. Checkpoints
+        # written since the stamps were read are past `last_seq`: kept as is.
+        last_seq = max(seq for seq, _ in stamps)
+        async with self.store.engine.connect() as conn:
+            rows = (await conn.execute(
+                select(cp.id, cp.seq, cp.kind, cp.state)
+                .where(scope & (cp.seq <= last_seq))
+                .order_by(cp.seq.asc())
+            )).fetchall()
+
+        rebase, drop = [], []
+        prev_kept = True
+        for row, state in SqlStateStore._replay(rows):
+            if row.seq not in keep:
+                drop.append(row.id)
+                prev_kept = False
+                continue
+            if row.kind == CheckpointKind.DELTA and not prev_kept:
+                rebase.append((row.id, state))
+            prev_kept = True
+
+        # Rebase first: a base snapshot is valid whether or not the rows
+        # before it still exist, so partial progress never breaks replay.
+        for start in range(0, len(rebase), self.policy.batch_size):
+            batch = rebase[start:start + self.policy.batch_size]
+
+            async def _rebase():
+                async with self.store._tx() as conn:
+                    for checkpoint_id, state in batch:
+                        await conn.execute(
+                            update(self.store.checkpoints)
+                            .where(cp.id == checkpoint_id)
+                            .values(kind=CheckpointKind.BASE, state=state)
+                        )
+
+            await self.store._retryable(_rebase)
+        report.checkpoints_rebased += len(rebase)
+        report.checkpoints_deleted += await self._delete_batched(drop)
+
+    async def _delete_batched(self, ids: List[str]) -> int:
+        cp = self.store.checkpoints.c
+        for start in range(0, len(ids), self.policy.batch_size):
+            batch = ids[start:start + self.policy.batch_size]
+
+            async def _delete():
+                async with self.store._tx() as conn:
+                    await conn.execute(delete(self.store.checkpoints).where(cp.id.in_(batch)))
+
+            await self.store._retryable(_delete)
+        return len(ids)
+
+    # ---- Maintenance ----------------------------------------------------
+
+    async def _db_size(self) -> Optional[int]:
+        backend = self.store.engine.url.get_backend_name()
+        async with self.store.engine.connect() as conn:
+            if backend == "sqlite":
+                page_count = (await conn.exec_driver_sql("PRAGMA page_count")).scalar()
+                page_size = (await conn.exec_driver_sql("PRAGMA page_size")).scalar()
+                return page_count * page_size
+            if backend == "postgresql":
+                return (await conn.exec_driver_sql("SELECT pg_database_size(current_database())")).scalar()
+        return None
+
+    async def _vacuum_analyze(self) -> None:
+        """VACUUM / ANALYZE cannot run inside a transaction, so use autocommit."""
+        backend = self.store.engine.url.get_backend_name()
+        async with self.store.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            if backend == "sqlite":
+                await conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+                await conn.exec_driver_sql("VACUUM")
+                await conn.exec_driver_sql("ANALYZE")
+            elif backend == "postgresql":
+                await conn.exec_driver_sql("VACUUM ANALYZE checkpoints")
+                await conn.exec_driver_sql("VACUUM ANALYZE sessions")
@@ -0,0 +1,78 @@
+"""
+Pluggable compression for stored state documents.
+
+A compressed blob is   HEADER_MAGIC | codec id (1 byte) | payload
+Blobs without the magic byte are legacy, uncompressed JSON. 0xA7 can never
+start a UTF-8 JSON document, so the two cannot be confused.
+"""
+from __future__ import annotations
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict, Union
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+
+HEADER_MAGIC = 0xA7
+HEADER_SIZE = 2
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    codec_id: int
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+CODECS: Dict[str, Codec] = {}
+_CODECS_BY_ID: Dict[int, Codec] = {}
+
+
+def register_codec(codec: Codec) -> None:
+    if not 0 <= codec.codec_id <= 255:
+        raise ValueError("codec_id must fit in one byte")
+    existing = _CODECS_BY_ID.get(codec.codec_id)
+    if existing is not None and existing.name != codec.name:
+        raise ValueError(f"codec id {codec.codec_id} already used by {existing.name!r}")
+    CODECS[codec.name] = codec
+    _CODECS_BY_ID[codec.codec_id] = codec
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"Unknown or unavailable compression codec {name!r} (available: {sorted(CODECS)})")
+
+
+register_codec(Codec("none", 0, bytes, bytes))
+register_codec(Codec("zlib", 1, lambda data: zlib.compress(data, 6), zlib.decompress))
+if zstandard is not None:
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+    register_codec(Codec("zstd", 2, _zstd_compressor.compress, _zstd_decompressor.decompress))
+
+
+def is_compressed(blob: Union[bytes, bytearray, memoryview]) -> bool:
+    return len(blob) >= HEADER_SIZE and blob[0] == HEADER_MAGIC
+
+
+def compress(data: bytes, codec: str = "zlib", *, min_size: int = 0) -> bytes:
+    """Frame `data` with a codec header; payloads under `min_size` are stored as-is."""
+    c = get_codec(codec) if len(data) >= min_size else CODECS["none"]
+    return bytes((HEADER_MAGIC, c.codec_id)) + c.compress(data)
+
+
+def decompress(blob: Union[bytes, bytearray, memoryview]) -> bytes:
+    """Inverse of `compress`; legacy (header-less) blobs are returned unchanged."""
+    blob = bytes(blob)
+    if not is_compressed(blob):
+        return blob
+    codec = _CODECS_BY_ID.get(blob[1])
+    if codec is None:
+        raise ValueError(f"Unknown compression codec id {blob[1]}")
+    return codec.decompress(blob[HEADER_SIZE:])
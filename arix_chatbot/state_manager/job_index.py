@@ -0,0 +1,128 @@
+"""
+Typed, indexed view of the jobs held in a SessionState.
+
+A state persists its jobs as three fields (`jobs`, `job_status`,
+`job_types`). Agents look jobs up by worker, manager and status several
+times per turn; rebuilding every Job with from_dict and scanning all of them
+on each lookup made a turn with many editor jobs quadratic.
+
+JobIndex keeps, per state:
+- typed Job objects: a stored job (a dict) is converted on first access and
+  put back into `state.jobs` in its place; jobs are turned back into dicts
+  only when the state is encoded (state_codec._default calls Job.to_dict).
+  SessionState hands out copies of them, so the index never goes stale
+  behind a job changed in place;
+- job ids by worker_id, report_to, status and turn_index.
+
+The index is derived data and holds no job of its own: it is rebuilt
+whenever one of the job fields is replaced (a load, clear_before_turn,
+change tracking taking ownership of the dicts), so the persisted fields stay
+the single source of truth.
+"""
+from __future__ import annotations
+from itertools import count
+from typing import Optional, Any, Dict, Iterable, List, NamedTuple, Set
+
+from arix_chatbot.jobs import JOB_REGISTRY
+from arix_chatbot.jobs.job import Job
+
+
+class JobKeys(NamedTuple):
+    worker_id: Optional[str]
+    report_to: Optional[str]
+    status: Optional[str]
+    turn_index: Optional[int]
+
+
+def _attr(job: Any, name: str) -> Any:
+    return job.get(name) if isinstance(job, dict) else getattr(job, name, None)
+
+
+class JobIndex:
+    """Secondary indexes over the job fields of one state (see SessionState.job_index)."""
+
+    def __init__(self, jobs: Dict[str, Any], job_status: Dict[str, str], job_types: Dict[str, str]):
+        self.jobs = jobs
+        self.job_status = job_status
+        self.job_types = job_types
+        self.entries: Dict[str, JobKeys] = {}
+        self.by_worker: Dict[Optional[str], Set[str]] = {}
+        self.by_report_to: Dict[Optional[str], Set[str]] = {}
+        self.by_status: Dict[Optional[str], Set[str]] = {}
+        self.by_turn: Dict[Optional[int], Set[str]] = {}
+        # insertion order of the job ids (results are returned in it)
+        self._positions: Dict[str, int] = {}
+        self._counter = count()
+        for job_id, job in jobs.items():
+            self.put(job_id, job, job_status.get(job_id))
+
+    def covers(self, jobs: Dict[str, Any], job_status: Dict[str, str], job_types: Dict[str, str]) -> bool:
+        """Whether the index was built over these very field objects."""
+        return self.jobs is jobs and self.job_status is job_status and self.job_types is job_types
+
+    def put(self, job_id: str, job: Any, status: Optional[str]) -> None:
+        """(Re-)index `job_id` after it was added or changed."""
+        keys = JobKeys(_attr(job, "worker_id"), _attr(job, "report_to"), status, _attr(job, "turn_index"))
+        previous = self.entries.get(job_id)
+        if previous == keys:
+            return
+        if previous is not None:
+            self._unlink(job_id, previous)
+        else:
+            self._positions[job_id] = next(self._counter)
+        self.entries[job_id] = keys
+        self.by_worker.setdefault(keys.worker_id, set()).add(job_id)
+        self.by_report_to.setdefault(keys.report_to, set()).add(job_id)
+        self.by_status.setdefault(keys.status, set()).add(job_id)
+        self.by_turn.setdefault(keys.turn_index, set()).add(job_id)
+
+    def discard(self, job_id: str) -> None:
+        keys = self.entries.pop(job_id, None)
+        if keys is not None:
+            self._unlink(job_id, keys)
+            del self._positions[job_id]
+
+    def _unlink(self, job_id: str, keys: JobKeys) -> None:
+        for bucket, key in ((self.by_worker, keys.worker_id), (self.by_report_to, keys.report_to),
+                            (self.by_status, keys.status), (self.by_turn, keys.turn_index)):
+            ids = bucket[key]
+            ids.discard(job_id)
+            if not ids:
+                del bucket[key]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """The typed Job for `job_id` (None if unknown), converted from its dict once."""
+        job = self.jobs.get(job_id)
+        if job is None or isinstance(job, Job):
+            return job
+        job = JOB_REGISTRY.get(self.job_types.get(job_id)).from_dict(job)
+        # Same content as the dict it replaces: bypass change tracking
+        dict.__setitem__(self.jobs, job_id, job)
+        return job
+
+    def not_in_turn(self, turn_index: int) -> List[str]:
+        return [job_id for turn, ids in self.by_turn.items() if turn != turn_index for job_id in ids]
+
+    def select(self,
+               worker_id: Optional[str] = None,
+               report_to: Optional[str] = None,
+               status: Optional[Iterable[str]] = None,
+               exclude_status: Iterable[str] = ()) -> List[str]:
+        """Ids of the jobs matching every given filter, in insertion order."""
+        buckets = []
+        if worker_id is not None:
+            buckets.append(self.by_worker.get(worker_id, set()))
+        if report_to is not None:
+            buckets.append(self.by_report_to.get(report_to, set()))
+        if status is not None:
+            buckets.append(set().union(*(self.by_status.get(s, ()) for s in status)))
+        if not buckets:
+            ids = self.entries.keys()
+        elif len(buckets) == 1:
+            ids = buckets[0]
+        else:
+            ids = set.intersection(*sorted(buckets, key=len))
+        if exclude_status:
+            excluded = frozenset(exclude_status)
+            ids = [job_id for job_id in ids if self.entries[job_id].status not in excluded]
+        return sorted(ids, key=self._positions.__getitem__)
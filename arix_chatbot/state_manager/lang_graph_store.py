@@ -1,100 +1,221 @@
-from arix_chatbot.state_manager.state_store import StateStore, SessionState
-from langgraph.checkpoint.sqlite import SqliteSaver
-from typing import Optional, Dict, Any
-from datetime import datetime
-from time import sleep
-import uuid
+from __future__ import annotations
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, NamedTuple
+
+import aiosqlite
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from sqlalchemy.engine import make_url
+
+from arix_chatbot.state_manager.state_store import (
+    StateStore, SessionState, StateConflictError, EventKind, fold_events,
+)
+from arix_chatbot.state_manager import state_codec
+
+STATE_CHANNEL = "state"
+EVENTS_TABLE = "arix_session_events"
+
+
+class _Event(NamedTuple):
+    seq: int
+    kind: str
+    payload: Any
+
+
+def _sqlite_path(conn_string: str) -> str:
+    """Accept "sqlite:///x.db" URLs as well as plain file paths / ":memory:"."""
+    if "://" not in conn_string:
+        return conn_string
+    url = make_url(conn_string)
+    if url.get_backend_name() != "sqlite":
+        raise ValueError(f"LangGraphStore needs a SQLite database, got {conn_string!r}")
+    return url.database or ":memory:"
 
 
 class LangGraphStore(StateStore):
     """
-    Persists your free-form dict state inside LangGraph's checkpoint store.
-    Each run_id maps to a thread; the entire pipeline state lives under one key.
+    Persists SessionState inside LangGraph's async SQLite checkpointer.
+    Each (ns, run_id) maps to a checkpoint thread; every write appends a
+    checkpoint (chained to the previous one) whose single channel holds the
+    state encoded with `state_codec`, so states round-trip exactly like in
+    SqlStateStore. `AsyncSqliteSaver.aput` commits before returning, so a
+    stored state is durable as soon as `store_state` returns.
+    Writes are compare-and-swap on `SessionState.version` (tracked as the
+    channel version) and raise StateConflictError on a stale write; the check
+    is serialized within this process, the store is meant for a single
+    worker (use SqlStateStore for several).
+    append_inbox / append_timeline do not write a checkpoint: they queue
+    events in a side table of the same database, which get_state folds in
+    (inbox messages through `SessionState.receive`) and the next write of a
+    state that saw them drops, so they never conflict with a running turn.
+    Only the StateStore protocol is implemented: there is no get_history,
+    get_checkpoint, restore or list_sessions (the checkpoints exist, but no
+    seq / kind index over them), and no lazy loading.
     """
+
     def __init__(self, conn_string: str = "sqlite:///ai_factory_sessions.db"):
         if not conn_string:
             raise ValueError("Connection string cannot be empty")
-        try:
-            # Context manager is fine; we "enter" once and keep the saver.
-            self._ctx = SqliteSaver.from_conn_string(conn_string)
-            self.checkpoint = self._ctx.__enter__()
-        except Exception as e:
-            raise RuntimeError(f"Failed to initialize database: {e}")
-
-    def make_config(self, run_id: str, ns: str = "sessions"):
-        return {
-            "configurable": {
-                "checkpoint_ns": ns,
-                "thread_id": run_id,
-            }
+        self.path = _sqlite_path(conn_string)
+        self.saver: Optional[AsyncSqliteSaver] = None
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._init_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+
+    async def _ensure_ready(self) -> AsyncSqliteSaver:
+        if self.saver is not None:
+            return self.saver
+        async with self._init_lock:
+            if self.saver is None:
+                try:
+                    self._conn = await aiosqlite.connect(self.path)
+                    saver = AsyncSqliteSaver(self._conn)
+                    await saver.setup()
+                    async with saver.lock:
+                        await self._conn.execute(
+                            f"CREATE TABLE IF NOT EXISTS {EVENTS_TABLE} ("
+                            "seq INTEGER PRIMARY KEY AUTOINCREMENT, ns TEXT NOT NULL, run_id TEXT NOT NULL, "
+                            "kind TEXT NOT NULL, payload BLOB NOT NULL)"
+                        )
+                        await self._conn.execute(
+                            f"CREATE INDEX IF NOT EXISTS ix_{EVENTS_TABLE}_run ON {EVENTS_TABLE} (ns, run_id, seq)"
+                        )
+                        await self._conn.commit()
+                except Exception as e:
+                    raise RuntimeError(f"Failed to initialize database: {e}")
+                self.saver = saver
+        return self.saver
+
+    @staticmethod
+    def make_config(run_id: str, ns: str = "sessions", checkpoint_id: Optional[str] = None):
+        configurable = {
+            "checkpoint_ns": ns,
+            "thread_id": run_id,
         }
+        if checkpoint_id is not None:
+            configurable["checkpoint_id"] = checkpoint_id
+        return {"configurable": configurable}
 
-    def make_checkpoint(self, state: SessionState, *, checkpoint_id: str | None = None, version: int | None = None):
+    @staticmethod
+    def make_checkpoint(state: SessionState, version: int):
         """
-        Build a LangGraph-style checkpoint object.
+        Build a LangGraph checkpoint holding the encoded state. uuid6 ids sort
+        by creation time, which is what the saver relies on to find the
+        latest checkpoint of a thread.
         """
-        v = version if version is not None else (len(state.timeline) or 1)
-        return {
-            "id": checkpoint_id or str(uuid.uuid4()),   # REQUIRED
-            "v": int(v),                                # REQUIRED (version int)
-            "ts": datetime.utcnow().isoformat(),
-            "channel_values": state,
-            "pending_writes": {},
-            # "parent": prev_id,                        # OPTIONAL (chaining)
-        }
+        doc = state_codec.state_fields(state)
+        doc.pop("version", None)
+        checkpoint = empty_checkpoint()
+        checkpoint.update(
+            id=str(uuid6()),
+            ts=datetime.now(timezone.utc).isoformat(),
+            channel_values={STATE_CHANNEL: state_codec.dumps(doc)},
+            channel_versions={STATE_CHANNEL: version},
+        )
+        return checkpoint
 
-    def make_metadata(self, state: SessionState):
+    @staticmethod
+    def make_metadata(state: SessionState, version: int):
         return {
+            "source": "update",
+            "step": version,
             "status": state.status,
             "owner_agent_id": state.owner_agent_id,
-            "pipeline": ",".join(state.pipeline),
+            "pipeline": ",".join(state.pipeline or []),
         }
 
-    def make_new_versions(self, state: SessionState):
-        return {
-            "timeline": len(state.timeline),
-        }
+    async def _latest(self, run_id: str, ns: str):
+        saver = await self._ensure_ready()
+        return await saver.aget_tuple(self.make_config(run_id, ns))
 
-    def _put(self, config, checkpoint, metadata, new_versions):
+    async def get_state(self, run_id: str, *, ns: str = "sessions",
+                        materialize_logs: bool = False, lazy: bool = False) -> Optional[SessionState]:
         """
-        Compatibility wrapper: use .atomic() if present, otherwise call put() directly.
+        Returns the latest stored state or None. Log fields are stored inline,
+        so `materialize_logs` is accepted for interface parity and ignored, as
+        is `lazy` (checkpoints carry no field index).
         """
-        atomic = getattr(self.checkpoint, "atomic", None)
-        if callable(atomic):
-            with atomic() as txn:
-                return txn.put(config, checkpoint, metadata, new_versions)
-        else:
-            return self.checkpoint.put(config, checkpoint, metadata, new_versions)
-
-    def get_state(self, run_id: str) -> Optional[SessionState]:
-        snap = self.checkpoint.get(self.make_config(run_id))
+        snap = await self._latest(run_id, ns)
         if snap is None:
             return None
-        return snap['channel_values']
-
-    def store_state(self, run_id: str, state: SessionState, *, ns: str = "sessions"):
-        config = self.make_config(run_id, ns=ns)
-        # Use a fresh checkpoint id per write to avoid unique-id collisions
-        checkpoint = self.make_checkpoint(state)
-        metadata = self.make_metadata(state)
-        new_versions = self.make_new_versions(state)
-
-        try:
-            self._put(config, checkpoint, metadata, new_versions)
-            # TODO: Check how to wait for sql to write ?
-            sleep(1)
-        except Exception as e:
-            raise RuntimeError(f"Failed to store state for run {run_id}: {e}")
-
-    def append_inbox(self, run_id: str, agent_id: str, msg: Dict[str, Any]) -> None:
-        state = self.get_state(run_id) or {}
-        inbox = state.setdefault("inbox", {})
-        inbox.setdefault(agent_id, []).append(msg)
-        self.store_state(run_id, state)
-
-    def append_timeline(self, run_id: str, event: Dict[str, Any]) -> None:
-        state = self.get_state(run_id) or {}
-        state.setdefault("timeline", []).append({
-            "timestamp": datetime.now().isoformat(), **event
-        })
-        self.store_state(run_id, state)
+        checkpoint = snap.checkpoint
+        state = SessionState.fromdict(state_codec.loads(checkpoint["channel_values"][STATE_CHANNEL]))
+        state.version = int(checkpoint["channel_versions"][STATE_CHANNEL])
+        fold_events(state, await self._pending_events(run_id, ns, after=state.event_seq))
+        return state
+
+    async def _pending_events(self, run_id: str, ns: str, *, after: int):
+        async with self.saver.lock, self._conn.execute(
+            f"SELECT seq, kind, payload FROM {EVENTS_TABLE} WHERE ns = ? AND run_id = ? AND seq > ? ORDER BY seq",
+            (ns, run_id, after),
+        ) as cur:
+            rows = await cur.fetchall()
+        return [_Event(seq, kind, state_codec.loads(payload)) for seq, kind, payload in rows]
+
+    async def _append_event(self, run_id: str, kind: str, payload: Dict[str, Any], ns: str) -> None:
+        if await self._latest(run_id, ns) is None:
+            raise ValueError(f"Run {run_id} not found")
+        async with self.saver.lock:
+            await self._conn.execute(
+                f"INSERT INTO {EVENTS_TABLE} (ns, run_id, kind, payload) VALUES (?, ?, ?, ?)",
+                (ns, run_id, kind, state_codec.dumps(payload)),
+            )
+            await self._conn.commit()
+
+    async def store_state(self, run_id: str, state: SessionState, *, ns: str = "sessions", force: bool = False):
+        """
+        Append a checkpoint for `state` if the stored version still equals
+        `state.version` (any version with `force`), and bump it by one.
+        """
+        saver = await self._ensure_ready()
+        async with self._write_lock:
+            snap = await self._latest(run_id, ns)
+            stored_version = int(snap.checkpoint["channel_versions"][STATE_CHANNEL]) if snap else None
+            expected = (stored_version or 0) if force else state.version
+            if (stored_version or 0) != expected:
+                raise StateConflictError(run_id, expected, stored_version)
+            version = expected + 1
+
+            parent_id = snap.checkpoint["id"] if snap else None
+            try:
+                await saver.aput(
+                    self.make_config(run_id, ns, checkpoint_id=parent_id),
+                    self.make_checkpoint(state, version),
+                    self.make_metadata(state, version),
+                    {STATE_CHANNEL: version},
+                )
+            except Exception as e:
+                raise RuntimeError(f"Failed to store state for run {run_id}: {e}")
+            async with saver.lock:
+                await self._conn.execute(
+                    f"DELETE FROM {EVENTS_TABLE} WHERE ns = ? AND run_id = ? AND seq <= ?",
+                    (ns, run_id, state.event_seq),
+                )
+                await self._conn.commit()
+        state.version = version
+        state.received_stored()
+
+    async def append_inbox(self, run_id: str, agent_id: str, msg: Dict[str, Any], *,
+                           sender: str = "user", ns: str = "sessions") -> None:
+        await self._append_event(run_id, EventKind.INBOX, {"agent_id": agent_id, "sender": sender, "msg": msg}, ns)
+
+    async def append_timeline(self, run_id: str, event: Dict[str, Any], *, ns: str = "sessions") -> None:
+        await self._append_event(run_id, EventKind.TIMELINE, {"timestamp": datetime.now().isoformat(), **event}, ns)
+
+    async def delete_state(self, run_id: str, *, ns: str = "sessions") -> bool:
+        """Drop every checkpoint of the run (all namespaces: threads are keyed by run_id)."""
+        if await self._latest(run_id, ns) is None:
+            return False
+        await self.saver.adelete_thread(run_id)
+        async with self.saver.lock:
+            await self._conn.execute(f"DELETE FROM {EVENTS_TABLE} WHERE run_id = ?", (run_id,))
+            await self._conn.commit()
+        return True
+
+    async def dispose(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+            self.saver = None
@@ -0,0 +1,121 @@
+"""
+Lazily decoded SessionState for read-mostly access.
+
+Stores that keep a state document as `state_codec.join_indexed` output (raw
+JSON bytes + member offsets) can hand out a LazySessionState instead of
+decoding the whole document: each field is decoded on first access and
+cached, so a reader of `turn_index` and one schema never builds the rest.
+Assigning any field first materializes all of them, after which the object
+is an ordinary SessionState (stores encode it like any other).
+"""
+from __future__ import annotations
+from dataclasses import MISSING
+from typing import Optional, Any, Dict, List, Sequence, Tuple
+
+from arix_chatbot.state_manager.state_store import SessionState, SESSION_STATE_FIELDS
+from arix_chatbot.state_manager import state_codec
+
+
+_MISSING_VALUE = object()
+
+
+class LazyDocument:
+    """Raw JSON object bytes whose top-level members are decoded one at a time."""
+    __slots__ = ("raw", "spans")
+
+    def __init__(self, raw: bytes, offsets: Sequence[int]):
+        self.raw = raw
+        # member name -> (start, end) of its encoded value
+        self.spans: Dict[str, Tuple[int, int]] = {}
+        ends = [offset - 1 for offset in offsets[1:]] + [len(raw) - 1]
+        for offset, end in zip(offsets, ends):
+            colon = raw.index(b'":', offset)
+            self.spans[raw[offset + 1:colon].decode("utf-8")] = (colon + 2, end)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.spans
+
+    def encoded(self, name: str) -> bytes:
+        start, end = self.spans[name]
+        return self.raw[start:end]
+
+    def get(self, name: str, default: Any = None) -> Any:
+        span = self.spans.get(name)
+        if span is None:
+            return default
+        return state_codec.loads(self.raw[span[0]:span[1]])
+
+    def todict(self) -> Dict[str, Any]:
+        return state_codec.loads(self.raw)
+
+
+def _default(name: str) -> Any:
+    spec = SessionState.__dataclass_fields__[name]
+    if spec.default is not MISSING:
+        return spec.default
+    if spec.default_factory is not MISSING:
+        return spec.default_factory()
+    return None
+
+
+class _LazyField:
+    """Non-data descriptor: decodes the field once, then the instance attribute shadows it."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        doc = instance.__dict__["_doc"]
+        value = doc.get(self.name, _MISSING_VALUE)
+        if value is _MISSING_VALUE:
+            value = _default(self.name)
+        instance.__dict__[self.name] = value
+        return value
+
+
+class LazySessionState(SessionState):
+    """
+    SessionState view over a LazyDocument. `preset` values (e.g. the version,
+    or log fields the store builds itself) are set without decoding anything.
+    """
+
+    def __init__(self, doc: LazyDocument, preset: Optional[Dict[str, Any]] = None):
+        self.__dict__["_doc"] = doc
+        self.__dict__.update(preset or {})
+
+    @property
+    def materialized(self) -> bool:
+        return "_doc" not in self.__dict__
+
+    def decoded_fields(self) -> List[str]:
+        """Fields decoded (or set) so far."""
+        return [name for name in SESSION_STATE_FIELDS if name in self.__dict__]
+
+    def materialize(self) -> "LazySessionState":
+        """Decode every field that was not accessed yet."""
+        if self.materialized:
+            return self
+        for name in SESSION_STATE_FIELDS:
+            if name not in self.__dict__:
+                getattr(self, name)
+        del self.__dict__["_doc"]
+        return self
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if not self.materialized and name in SessionState.__dataclass_fields__:
+            self.materialize()
+        super().__setattr__(name, value)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SessionState):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in SESSION_STATE_FIELDS)
+
+    __hash__ = None
+
+
+for _name in SESSION_STATE_FIELDS:
+    setattr(LazySessionState, _name, _LazyField(_name))
+del _name
@@ -0,0 +1,325 @@
+from __future__ import annotations
+import logging
+import os
+import tempfile
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional, Any, Dict, Deque, List, Sequence, AsyncIterator, Tuple
+
+from arix_chatbot.state_manager.state_store import (
+    StateStore, SessionState, StateConflictError, SessionSummary, SessionPage,
+    encode_list_cursor, decode_list_cursor, naive_utc, EventKind, fold_events,
+)
+from arix_chatbot.state_manager.change_tracking import changes_of
+from arix_chatbot.state_manager.lazy_state import LazyDocument, LazySessionState
+from arix_chatbot.state_manager import state_codec
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Checkpoint:
+    seq: int
+    version: int
+    ts: datetime
+    doc: bytes  # encoded state document
+    metadata: Dict[str, Any]
+
+    @property
+    def id(self) -> str:
+        return str(self.seq)
+
+
+@dataclass
+class _Event:
+    seq: int
+    kind: str
+    payload: bytes  # encoded, like the documents
+
+    def decoded(self) -> "_Event":
+        return _Event(self.seq, self.kind, state_codec.loads(self.payload))
+
+
+@dataclass
+class _Session:
+    version: int
+    updated_at: datetime
+    doc: bytes
+    offsets: List[int]  # member offsets in doc (state_codec.join_indexed)
+    status: Optional[str] = None
+    owner_agent_id: Optional[str] = None
+    turn_index: int = 0
+    checkpoints: Deque[_Checkpoint] = field(default_factory=deque)
+    last_seq: int = 0
+    # appended inbox / timeline events not folded into a stored state yet
+    events: List[_Event] = field(default_factory=list)
+    event_seq: int = 0
+
+
+class InMemoryStateStore(StateStore):
+    """
+    StateStore kept in process memory: no I/O on the hot path, meant for
+    tests, benchmarks and single-node deployments.
+    Same semantics as SqlStateStore: writes are compare-and-swap on
+    `SessionState.version` (StateConflictError, `force`), states are stored
+    encoded so callers never share objects with the store, and every write
+    keeps a checkpoint (the latest `max_history` per run) for get_history /
+    get_checkpoint / restore. append_inbox / append_timeline keep pending
+    events next to the run without a new version, so they never conflict
+    with a turn; get_state folds them in (SessionState.receive) and the next
+    write of a state that saw them drops them.
+    With `snapshot_path`, the latest state (and pending events) of every run
+    is loaded from that file on creation and written back (atomically) by
+    `save_snapshot` and `dispose`; checkpoint history is not snapshotted.
+    """
+
+    def __init__(self, *, max_history: Optional[int] = 100, snapshot_path: Optional[str] = None):
+        if max_history is not None and max_history < 1:
+            raise ValueError("max_history must be >= 1")
+        self.max_history = max_history
+        self.snapshot_path = snapshot_path
+        self._sessions: Dict[Tuple[str, str], _Session] = {}
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.load_snapshot()
+
+    # ---- Public API -----------------------------------------------------
+
+    async def get_state(self, run_id: str, *, ns: str = "sessions",
+                        materialize_logs: bool = False, lazy: bool = False) -> Optional[SessionState]:
+        """
+        Returns a private copy of the latest stored state or None (logs are
+        always materialized). With `lazy`, a LazySessionState decoding fields
+        on first access.
+        """
+        session = self._sessions.get((ns, run_id))
+        if session is None:
+            return None
+        if lazy:
+            state = LazySessionState(LazyDocument(session.doc, session.offsets), {"version": session.version})
+        else:
+            state = self._decode(session.doc, session.version)
+        if session.events:
+            fold_events(state, [event.decoded() for event in session.events if event.seq > state.event_seq])
+        return state
+
+    async def store_state(self, run_id: str, state: SessionState, *, ns: str = "sessions", force: bool = False):
+        """
+        Store a snapshot of `state` if the stored version still equals
+        `state.version` (any version with `force`), and bump it by one.
+        """
+        tracker = changes_of(state)
+        fields = state_codec.state_fields(state)
+        fields.pop("version", None)
+        if tracker is None:
+            encoded_fields = {name: state_codec.dumps(value) for name, value in fields.items()}
+        else:
+            snapshot = tracker.begin_write()
+            encoded_fields = tracker.encode_fields(fields)
+        doc, offsets = state_codec.join_indexed(encoded_fields)
+        session = self._sessions.get((ns, run_id))
+        stored_version = session.version if session else None
+        expected = (stored_version or 0) if force else state.version
+        if (stored_version or 0) != expected:
+            if tracker is not None:
+                tracker.forget()
+            raise StateConflictError(run_id, expected, stored_version)
+        version = expected + 1
+        ts = datetime.utcnow()
+
+        if session is None:
+            session = self._sessions[(ns, run_id)] = _Session(version, ts, doc, offsets)
+        else:
+            session.version, session.updated_at, session.doc, session.offsets = version, ts, doc, offsets
+        session.status, session.owner_agent_id, session.turn_index = \
+            state.status, state.owner_agent_id, state.turn_index or 0
+        self._checkpoint(session, version, ts, doc, state)
+        if session.events:
+            # folded into the state just written
+            session.events = [event for event in session.events if event.seq > state.event_seq]
+        state.version = version
+        state.received_stored()
+        if tracker is not None:
+            tracker.written(snapshot, version, encoded_fields)
+
+    async def append_inbox(self, run_id: str, agent_id: str, msg: Dict[str, Any], *,
+                           sender: str = "user", ns: str = "sessions") -> None:
+        """
+        Post `msg` to `agent_id`'s inbox (under `sender`) as a pending event;
+        the stored state and its version do not change.
+        Raises ValueError if the run does not exist.
+        """
+        self._append_event(run_id, EventKind.INBOX, {"agent_id": agent_id, "sender": sender, "msg": msg}, ns)
+
+    async def append_timeline(self, run_id: str, event: Dict[str, Any], *, ns: str = "sessions") -> None:
+        """Append a timestamped timeline entry as a pending event (see append_inbox)."""
+        self._append_event(run_id, EventKind.TIMELINE, {"timestamp": datetime.now().isoformat(), **event}, ns)
+
+    async def delete_state(self, run_id: str, *, ns: str = "sessions") -> bool:
+        """Drop the run and its history."""
+        return self._sessions.pop((ns, run_id), None) is not None
+
+    async def list_sessions(self, *, ns: str = "sessions", status: Optional[str] = None,
+                            owner_agent_id: Optional[str] = None, updated_since: Optional[datetime] = None,
+                            cursor: Optional[str] = None, limit: int = 50) -> SessionPage:
+        """Same contract as SqlStateStore.list_sessions (newest first, keyset cursor)."""
+        if limit < 1:
+            raise ValueError("limit must be >= 1")
+        after = decode_list_cursor(cursor) if cursor is not None else None
+        if updated_since is not None:
+            updated_since = naive_utc(updated_since)
+        rows = []
+        for (row_ns, run_id), session in self._sessions.items():
+            if row_ns != ns \
+                    or (status is not None and session.status != status) \
+                    or (owner_agent_id is not None and session.owner_agent_id != owner_agent_id) \
+                    or (updated_since is not None and session.updated_at < updated_since) \
+                    or (after is not None and (session.updated_at, run_id) >= after):
+                continue
+            rows.append(SessionSummary(
+                run_id=run_id,
+                status=session.status,
+                owner_agent_id=session.owner_agent_id,
+                turn_index=session.turn_index,
+                version=session.version,
+                updated_at=session.updated_at,
+            ))
+        rows.sort(key=lambda item: (item.updated_at, item.run_id), reverse=True)
+        items = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_list_cursor(items[-1].updated_at, items[-1].run_id)
+        return SessionPage(items=items, next_cursor=next_cursor)
+
+    # ---- History / restore ------------------------------------------------
+
+    async def get_history(self, run_id: str, *, ns: str = "sessions", limit: Optional[int] = 50,
+                          before_seq: Optional[int] = None, fields: Optional[Sequence[str]] = None,
+                          page_size: int = 50) -> AsyncIterator[Dict[str, Any]]:
+        """Same contract as SqlStateStore.get_history; only the retained `max_history` checkpoints are visible."""
+        session = self._sessions.get((ns, run_id))
+        if session is None:
+            return
+        checkpoints = [cp for cp in reversed(session.checkpoints) if before_seq is None or cp.seq < before_seq]
+        for cp in checkpoints if limit is None else checkpoints[:limit]:
+            entry = {
+                "id": cp.id,
+                "seq": cp.seq,
+                "version": cp.version,
+                "ts": cp.ts,
+                "metadata": cp.metadata,
+            }
+            if fields is None:
+                entry["state"] = state_codec.loads(cp.doc)
+            elif fields:
+                entry["state"] = state_codec.project(state_codec.loads(cp.doc), fields)
+            yield entry
+
+    async def get_checkpoint(self, run_id: str, seq: int, *, ns: str = "sessions") -> Optional[SessionState]:
+        session = self._sessions.get((ns, run_id))
+        if session is None:
+            return None
+        for cp in session.checkpoints:
+            if cp.seq == seq:
+                return self._decode(cp.doc, cp.version)
+        return None
+
+    async def restore(self, run_id: str, seq: int, *, ns: str = "sessions") -> Optional[SessionState]:
+        """Make checkpoint `seq` the current state again (recorded as a new checkpoint)."""
+        state = await self.get_checkpoint(run_id, seq, ns=ns)
+        if state is not None:
+            await self.store_state(run_id, state, ns=ns, force=True)
+        return state
+
+    # ---- Snapshots ----------------------------------------------------------
+
+    def save_snapshot(self, path: Optional[str] = None) -> int:
+        """Write the latest state of every run to `path` (default `snapshot_path`). Returns the run count."""
+        path = path or self.snapshot_path
+        if not path:
+            raise ValueError("No snapshot path configured")
+        payload = [
+            {
+                "ns": ns,
+                "run_id": run_id,
+                "version": session.version,
+                "updated_at": session.updated_at.isoformat(),
+                "state": state_codec.loads(session.doc),
+                "event_seq": session.event_seq,
+                "events": [[event.seq, event.kind, state_codec.loads(event.payload)] for event in session.events],
+            }
+            for (ns, run_id), session in self._sessions.items()
+        ]
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(state_codec.dumps(payload))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return len(payload)
+
+    def load_snapshot(self, path: Optional[str] = None) -> int:
+        """Replace the store's content with a snapshot written by `save_snapshot`. Returns the run count."""
+        path = path or self.snapshot_path
+        with open(path, "rb") as f:
+            payload = state_codec.loads(f.read())
+        self._sessions.clear()
+        for row in payload:
+            doc, offsets = state_codec.join_indexed(
+                {name: state_codec.dumps(value) for name, value in row["state"].items()}
+            )
+            state = self._decode(doc, row["version"])
+            updated_at = datetime.fromisoformat(row["updated_at"])
+            session = self._sessions[(row["ns"], row["run_id"])] = _Session(
+                row["version"], updated_at, doc, offsets, state.status, state.owner_agent_id, state.turn_index or 0
+            )
+            self._checkpoint(session, row["version"], updated_at, doc, state)
+            # snapshots written before pending events existed have neither key
+            session.event_seq = row.get("event_seq", 0)
+            session.events = [_Event(seq, kind, state_codec.dumps(payload))
+                              for seq, kind, payload in row.get("events", [])]
+        return len(payload)
+
+    async def dispose(self) -> None:
+        if self.snapshot_path:
+            try:
+                self.save_snapshot()
+            except Exception as e:
+                logger.error(f"Failed to save state snapshot to {self.snapshot_path}: {e}")
+
+    # ---- Internals ------------------------------------------------------------
+
+    def _append_event(self, run_id: str, kind: str, payload: Dict[str, Any], ns: str) -> None:
+        session = self._sessions.get((ns, run_id))
+        if session is None:
+            raise ValueError(f"Run {run_id} not found")
+        session.event_seq += 1
+        session.events.append(_Event(session.event_seq, kind, state_codec.dumps(payload)))
+
+    @staticmethod
+    def _decode(doc: bytes, version: int) -> SessionState:
+        state = SessionState.fromdict(state_codec.loads(doc))
+        state.version = version
+        return state
+
+    def _checkpoint(self, session: _Session, version: int, ts: datetime, doc: bytes, state: SessionState) -> None:
+        session.last_seq += 1
+        session.checkpoints.append(_Checkpoint(
+            seq=session.last_seq,
+            version=version,
+            ts=ts,
+            doc=doc,
+            metadata={
+                "status": state.status,
+                "owner_agent_id": state.owner_agent_id,
+                "pipeline": ",".join(state.pipeline or []),
+            },
+        ))
+        if self.max_history is not None and len(session.checkpoints) > self.max_history:
+            session.checkpoints.popleft()
@@ -0,0 +1,201 @@
+from __future__ import annotations
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Any, Dict, Tuple
+
+from sqlalchemy import Index, TypeDecorator, inspect, literal, select
+from sqlalchemy.dialects.postgresql import JSONB, BYTEA
+
+from arix_chatbot.state_manager.state_store import SessionState, SessionPage, StateConflictError
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore, _migrate_schema
+from arix_chatbot.state_manager.change_tracking import TRACKED_FIELDS, changes_of
+from arix_chatbot.state_manager import state_codec
+
+
+class StateJsonb(TypeDecorator):
+    """
+    JSONB column bound from python objects (encoded with the state codec) or
+    from already-encoded JSON bytes, which are sent as-is; reads return the
+    decoded document.
+    """
+    impl = JSONB
+    cache_ok = True
+
+    def bind_processor(self, dialect):
+        def process(value):
+            if value is None:
+                return None
+            if isinstance(value, (bytes, bytearray)):
+                return bytes(value).decode("utf-8")
+            return state_codec.dumps_str(value)
+        return process
+
+    def result_processor(self, dialect, coltype):
+        def process(value):
+            if value is None or not isinstance(value, (str, bytes)):
+                return value
+            return state_codec.loads(value)
+        return process
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class PostgresStateStore(SqlStateStore):
+    """
+    SqlStateStore specialised for Postgres (psycopg 3 async driver, pooled):
+      - state documents, log entries and metadata are JSONB, so they can be
+        queried in SQL; metadata has GIN (jsonb_path_ops) indexes and
+        `list_sessions(metadata_contains=...)` filters on them with @>
+      - a write only sends the top-level SessionState fields that changed
+        since the version this process last wrote (`state || patch`; with
+        change tracking, see change_tracking, clean fields are not even
+        encoded), and
+        records that patch as the delta checkpoint. Without a known base
+        (first write from this process, or another worker wrote last) the
+        full document is sent and a base checkpoint is recorded.
+    Postgres still writes a new row version for every UPDATE (there is no
+    in-place JSONB update); the patch saves encoding, network and WAL for
+    the unchanged fields.
+    """
+
+    # JSONB is not stored as the written bytes: no lazy (field-indexed) reads
+    _lazy_reads = False
+
+    def __init__(self, conn_string: str, *, pool_size: int = 10, max_overflow: int = 10,
+                 digest_cache_size: int = 10_000, engine_options: Optional[Dict[str, Any]] = None, **kwargs):
+        options = {"pool_size": pool_size, "max_overflow": max_overflow, "pool_pre_ping": True}
+        options.update(engine_options or {})
+        super().__init__(conn_string, engine_options=options, **kwargs)
+        if self.engine.url.get_backend_name() != "postgresql":
+            raise ValueError(f"PostgresStateStore needs a postgresql URL, got {conn_string!r}")
+        self.digest_cache_size = digest_cache_size
+        # (ns, run_id) -> (version, {field: digest}) of the last document this process wrote
+        self._digests: "OrderedDict[Tuple[str, str], Tuple[int, Dict[str, bytes]]]" = OrderedDict()
+
+        Index("ix_sessions_metadata_gin", self.sessions.c.metadata,
+              postgresql_using="gin", postgresql_ops={"metadata": "jsonb_path_ops"})
+        Index("ix_checkpoints_metadata_gin", self.checkpoints.c.metadata,
+              postgresql_using="gin", postgresql_ops={"metadata": "jsonb_path_ops"})
+
+    def _state_type(self):
+        return StateJsonb()
+
+    def _document_type(self):
+        return JSONB
+
+    @staticmethod
+    def _migrate_schema(conn) -> None:
+        """Move json columns of an existing schema to jsonb (compressed bytea state cannot be converted in SQL)."""
+        insp = inspect(conn)
+        columns = {
+            "sessions": ("state", "metadata"),
+            "checkpoints": ("state", "metadata"),
+            "session_logs": ("entry",),
+            "session_events": ("payload",),
+        }
+        for table, names in columns.items():
+            if not insp.has_table(table):
+                continue
+            types = {c["name"]: c["type"] for c in insp.get_columns(table)}
+            for name in names:
+                if isinstance(types.get(name), BYTEA):
+                    raise RuntimeError(
+                        f"{table}.{name} holds SqlStateStore blobs; PostgresStateStore needs its own database"
+                    )
+                if name in types and not isinstance(types[name], JSONB):
+                    conn.exec_driver_sql(f"ALTER TABLE {table} ALTER COLUMN {name} TYPE jsonb USING {name}::jsonb")
+        _migrate_schema(conn, blob_state=False)
+
+    # ---- Writes -----------------------------------------------------------
+
+    async def store_state(self, run_id: str, state: SessionState, *, ns: str = "sessions", force: bool = False):
+        """
+        Same contract as SqlStateStore.store_state; sends only the changed
+        top-level fields when this process knows the stored document: from
+        the state's change tracker if it has one, by comparing field digests
+        with the last write otherwise.
+        """
+        doc, log_writes = self._split_logs(state)
+        key = (ns, run_id)
+        tracker = changes_of(state)
+        if tracker is not None:
+            # clean fields are only encoded if a full document is needed
+            self._digests.pop(key, None)
+            digests = None
+            base_version = tracker.version
+            changed = [name for name in doc if name in tracker.dirty or name not in TRACKED_FIELDS]
+            encoded_fields = {name: state_codec.dumps(doc[name]) for name in changed}
+        else:
+            encoded_fields = {name: state_codec.dumps(value) for name, value in doc.items()}
+            digests = {name: _digest(data) for name, data in encoded_fields.items()}
+            known = self._digests.get(key)
+            base_version = known[0] if known else None
+            changed = [name for name in doc if known is None or known[1].get(name) != digests[name]]
+        ts = datetime.utcnow()
+        sc = self.sessions.c
+
+        def _full() -> bytes:
+            missing = {name: value for name, value in doc.items() if name not in encoded_fields}
+            if missing:
+                encoded_fields.update(tracker.encode_fields(missing))
+            return state_codec.join_object({name: encoded_fields[name] for name in doc})
+
+        async def _write():
+            async with self._tx() as conn:
+                existing = (await conn.execute(
+                    select(sc.version, sc.state["$logs"].label("logs"))
+                    .where((sc.ns == ns) & (sc.run_id == run_id))
+                )).fetchone()
+                stored_version = existing.version if existing else None
+                expected = self._check_version(run_id, state, stored_version, force)
+                version = expected + 1
+
+                patch = None
+                if existing is not None and base_version == expected:
+                    patch = state_codec.join_object({name: encoded_fields[name] for name in changed})
+                    values = {"state": sc.state.op("||")(literal(patch, StateJsonb()))}
+                else:
+                    values = {"state": _full()}
+
+                await self._write_session(conn, ns, run_id, state, existing is None, expected, version, ts, values)
+                stored_cursors = (existing.logs or {}) if existing else {}
+                await self._write_logs_and_events(conn, ns, run_id, state, log_writes, stored_cursors)
+                await self._append_checkpoint(
+                    conn, ns, run_id, state, version, ts, _full,
+                    lambda: None if patch is None else b'{"$set":' + patch + b"}",
+                )
+                return version
+
+        try:
+            await self._run_write(_write, run_id, state, encoded_fields, doc["$logs"])
+        except StateConflictError:
+            self._digests.pop(key, None)
+            raise
+        if digests is not None:
+            self._digests[key] = (state.version, digests)
+            self._digests.move_to_end(key)
+            while len(self._digests) > self.digest_cache_size:
+                self._digests.popitem(last=False)
+
+    async def delete_state(self, run_id: str, *, ns: str = "sessions") -> bool:
+        self._digests.pop((ns, run_id), None)
+        return await super().delete_state(run_id, ns=ns)
+
+    # ---- Metadata queries -------------------------------------------------
+
+    async def list_sessions(self, *, ns: str = "sessions", status: Optional[str] = None,
+                            owner_agent_id: Optional[str] = None, updated_since: Optional[datetime] = None,
+                            cursor: Optional[str] = None, limit: int = 50,
+                            metadata_contains: Optional[Dict[str, Any]] = None) -> SessionPage:
+        """
+        SqlStateStore.list_sessions, optionally restricted to sessions whose
+        metadata contains `metadata_contains` (JSONB @>, served by the GIN index).
+        """
+        query = self._list_query(ns=ns, status=status, owner_agent_id=owner_agent_id,
+                                 updated_since=updated_since, cursor=cursor, limit=limit)
+        if metadata_contains:
+            query = query.where(self.sessions.c.metadata.contains(metadata_contains))
+        return await self._list_page(query, limit)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Protocol
+
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseStore(Protocol):
+    async def acquire_lease(self, run_id: str, owner: str, ttl_seconds: float) -> bool: ...
+    async def release_lease(self, run_id: str, owner: str) -> None: ...
+
+
+class LeaseTimeoutError(TimeoutError):
+    def __init__(self, run_id: str, timeout_seconds: float):
+        self.run_id = run_id
+        super().__init__(f"Could not acquire the lease on run {run_id} within {timeout_seconds}s")
+
+
+class RunLease:
+    """
+    Cross-process mutual exclusion per run on top of a LeaseStore (e.g.
+    SqlStateStore). Leases expire after `ttl_seconds` so a crashed holder does
+    not block a run forever; while held, the lease is renewed in the
+    background every `ttl_seconds / 3`.
+    """
+
+    def __init__(self, store: LeaseStore, *, ttl_seconds: float = 120.0, timeout_seconds: float = 60.0,
+                 poll_seconds: float = 0.05):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self.poll_seconds = poll_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @asynccontextmanager
+    async def hold(self, run_id: str):
+        deadline = time.monotonic() + self.timeout_seconds
+        delay = self.poll_seconds
+        while not await self.store.acquire_lease(run_id, self.owner, self.ttl_seconds):
+            if time.monotonic() >= deadline:
+                raise LeaseTimeoutError(run_id, self.timeout_seconds)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+        renewer = asyncio.create_task(self._renew(run_id))
+        try:
+            yield
+        finally:
+            renewer.cancel()
+            try:
+                await renewer
+            except asyncio.CancelledError:
+                pass
+            await self.store.release_lease(run_id, self.owner)
+
+    async def _renew(self, run_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.ttl_seconds / 3)
+            try:
+                if not await self.store.acquire_lease(run_id, self.owner, self.ttl_seconds):
+                    logger.error(f"Lost the lease on run {run_id}")
+                    return
+            except Exception as e:
+                logger.error(f"Failed to renew the lease on run {run_id}: {e}")
@@ -0,0 +1,354 @@
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Tuple
+
+from arix_chatbot.state_manager.state_store import StateStore, SessionState, StateConflictError
+from arix_chatbot.state_manager.append_log import AppendLog, LOG_FIELDS
+from arix_chatbot.state_manager.change_tracking import changes_of, track_copy
+from arix_chatbot.state_manager.lazy_state import LazySessionState
+from arix_chatbot.state_manager import state_codec
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    flushes: int = 0
+    flush_errors: int = 0
+    conflicts: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def todict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "conflicts": self.conflicts,
+            "hit_rate": self.hit_rate,
+        }
+
+
+@dataclass
+class _Entry:
+    state: SessionState
+    loaded_at: float
+    dirty: bool = False
+    force: bool = False
+    stale: bool = False  # backend got events the cached state has not seen
+    # encoded fields of `state` (but its version and logs) that copies are decoded from
+    encoded: Optional[bytes] = None
+    # serializes the flushes of a run; passed on when a store replaces the entry
+    flush_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+def _copy_log(log: Any) -> Any:
+    if isinstance(log, AppendLog):
+        # list.copy: only the entries held in memory (the log need not be loaded)
+        return AppendLog(list.copy(log), persisted=log.persisted, offset=log.offset)
+    return list(log)
+
+
+def _rebase(state: SessionState) -> None:
+    """
+    Catch a copy handed out by `_checkout` up with the flushes of the state it
+    was copied from (if they happened after the checkout): flushing changes
+    only that state's version and log cursors, and the copy holds the same
+    content plus its own changes.
+    """
+    base = state.__dict__.pop("_cached_from", None)
+    if base is None:
+        return
+    _rebase(base)
+    if base.version <= state.version:
+        return
+    state.version = base.version
+    for name in LOG_FIELDS:
+        log, base_log = getattr(state, name), getattr(base, name)
+        if isinstance(base_log, AppendLog):
+            if isinstance(log, AppendLog):
+                log.mark_persisted(base_log.persisted)
+            else:
+                setattr(state, name, AppendLog(log, persisted=base_log.persisted, offset=base_log.offset))
+    tracker, base_tracker = changes_of(state), changes_of(base)
+    if tracker is not None:
+        tracker.version = base_tracker.version if base_tracker is not None else None
+
+
+class CachedStateStore(StateStore):
+    """
+    Process-local, write-behind cache of deserialized SessionState objects in
+    front of another store (normally SqlStateStore).
+
+    - get_state returns a private copy of the cached state, decoded from its
+      encoding kept in the entry, so a hot run skips the DB read and
+      decompression. The cached object itself is never handed out: a turn
+      that fails halfway leaves the cache as it was, and the flusher never
+      sees a half-finished turn.
+    - store_state takes ownership of the state (do not change it afterwards)
+      and only marks the entry dirty; a background task flushes dirty
+      entries every `flush_interval_seconds`, and eviction / expiry of a dirty
+      entry flushes it first.
+    - Entries are bounded by `max_entries` (LRU) and `ttl_seconds` since load.
+    - If a flush hits a StateConflictError (another process wrote the run),
+      the cached copy is stale: it is dropped and the conflict is counted.
+      A background flush can only log it; a caller that must know (a turn
+      that can be replayed) writes through with flush(run_id, raise_errors=True).
+
+    Anything not cached (get_history, get_checkpoint, ...) is delegated to the
+    backend after flushing the affected run, so reads never see stale data.
+    append_inbox / append_timeline go straight to the backend and mark the
+    run stale, so its next get_state flushes and reloads it with the events.
+    """
+
+    def __init__(self,
+                 backend: StateStore,
+                 *,
+                 max_entries: int = 1024,
+                 ttl_seconds: float = 15 * 60,
+                 flush_interval_seconds: float = 1.0):
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.flush_interval_seconds = flush_interval_seconds
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def __getattr__(self, name: str):
+        # Only reached for attributes not defined here (e.g. backend tables)
+        if name == "backend":
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    def _expired(self, entry: _Entry) -> bool:
+        return self.ttl_seconds is not None and time.monotonic() - entry.loaded_at > self.ttl_seconds
+
+    # ---- StateStore API -------------------------------------------------
+
+    async def get_state(self, run_id: str, *, ns: str = "sessions",
+                        materialize_logs: bool = False, lazy: bool = False) -> Optional[SessionState]:
+        key = (ns, run_id)
+        entry = self._entries.get(key)
+        if entry is not None and (entry.stale or self._expired(entry)):
+            if not entry.stale:
+                self.stats.expirations += 1
+            await self._drop(key)
+            entry = None
+
+        if entry is not None:
+            self.stats.hits += 1
+            self._entries.move_to_end(key)
+            if materialize_logs:
+                await self.backend.load_logs(entry.state, ns=ns)
+            return self._checkout(entry)
+
+        self.stats.misses += 1
+        # a lazy state stays lazy in the cache until a turn writes to it
+        state = await self.backend.get_state(run_id, ns=ns, materialize_logs=materialize_logs, lazy=lazy)
+        if state is None:
+            return None
+        entry = _Entry(state=state, loaded_at=time.monotonic())
+        await self._put(key, entry)
+        return self._checkout(entry)
+
+    async def store_state(self, run_id: str, state: SessionState, *, ns: str = "sessions", force: bool = False):
+        key = (ns, run_id)
+        entry = self._entries.get(key)
+        if entry is not None and entry.state is state:
+            entry.dirty = True
+            entry.force = entry.force or force
+            entry.encoded = None
+            self._entries.move_to_end(key)
+        else:
+            replaced = _Entry(state=state, loaded_at=time.monotonic(), dirty=True, force=force)
+            if entry is not None:
+                # events appended during the turn are not in `state` either
+                replaced.flush_lock, replaced.stale = entry.flush_lock, entry.stale
+            await self._put(key, replaced)
+        self._ensure_flusher()
+
+    async def append_inbox(self, run_id: str, agent_id: str, msg: Dict[str, Any], *, ns: str = "sessions",
+                           **kwargs) -> None:
+        await self.backend.append_inbox(run_id, agent_id, msg, ns=ns, **kwargs)
+        self._mark_stale((ns, run_id))
+
+    async def append_timeline(self, run_id: str, event: Dict[str, Any], *, ns: str = "sessions") -> None:
+        await self.backend.append_timeline(run_id, event, ns=ns)
+        self._mark_stale((ns, run_id))
+
+    async def delete_state(self, run_id: str, *, ns: str = "sessions") -> bool:
+        # pending writes of a deleted run are discarded, not flushed
+        self._entries.pop((ns, run_id), None)
+        return await self.backend.delete_state(run_id, ns=ns)
+
+    async def get_history(self, run_id: str, *, ns: str = "sessions", **kwargs):
+        await self.flush(run_id, ns=ns)
+        async for entry in self.backend.get_history(run_id, ns=ns, **kwargs):
+            yield entry
+
+    async def list_sessions(self, *, ns: str = "sessions", **kwargs):
+        # dirty entries would otherwise be listed with stale status / updated_at
+        await self.flush(ns=ns)
+        return await self.backend.list_sessions(ns=ns, **kwargs)
+
+    async def get_checkpoint(self, run_id: str, seq: int, *, ns: str = "sessions") -> Optional[SessionState]:
+        await self.flush(run_id, ns=ns)
+        return await self.backend.get_checkpoint(run_id, seq, ns=ns)
+
+    async def restore(self, run_id: str, seq: int, *, ns: str = "sessions") -> Optional[SessionState]:
+        await self.invalidate(run_id, ns=ns)
+        return await self.backend.restore(run_id, seq, ns=ns)
+
+    # ---- Cache control --------------------------------------------------
+
+    async def invalidate(self, run_id: str, *, ns: str = "sessions") -> None:
+        """Flush (if dirty) and forget a run, e.g. after an out-of-band write."""
+        await self._drop((ns, run_id))
+
+    async def flush(self, run_id: str = None, *, ns: str = "sessions", raise_errors: bool = False) -> int:
+        """
+        Write dirty entries (all, or a single run) to the backend. Failures are
+        logged, or raised with `raise_errors` (e.g. the StateConflictError of
+        a turn, whose cached state is then dropped so a retry reloads it).
+        """
+        keys = [(ns, run_id)] if run_id is not None else list(self._entries)
+        flushed = 0
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None or not entry.dirty:
+                continue
+            try:
+                await self._flush_entry(key, entry)
+                flushed += 1
+            except Exception as e:
+                if raise_errors:
+                    raise
+                logger.error(f"Failed to flush cached state for run {key[1]}: {e}")
+        return flushed
+
+    async def dispose(self) -> None:
+        """Stop the flusher, write everything dirty and close the backend."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except (asyncio.CancelledError, RuntimeError):
+                pass
+            self._flush_task = None
+        await self.flush()
+        dispose = getattr(self.backend, "dispose", None)
+        if callable(dispose):
+            await dispose()
+
+    # ---- Internals ------------------------------------------------------
+
+    @staticmethod
+    def _checkout(entry: _Entry) -> SessionState:
+        """
+        Private copy of the cached state. A flush changes the cached state's
+        version and log cursors only, which are taken from it on every copy.
+        """
+        state = entry.state
+        logs = {name: _copy_log(getattr(state, name)) for name in LOG_FIELDS}
+        if isinstance(state, LazySessionState) and not state.materialized:
+            # the document is immutable bytes: only the fields decoded so far are copied
+            preset = {name: state_codec.loads(state_codec.dumps(state.__dict__[name]))
+                      for name in state.decoded_fields() if name not in LOG_FIELDS}
+            copy = LazySessionState(state.__dict__["_doc"], {**preset, **logs, "version": state.version})
+        else:
+            if entry.encoded is None:
+                fields = state_codec.state_fields(state)
+                for name in LOG_FIELDS + ("version",):
+                    del fields[name]
+                entry.encoded = state_codec.dumps(fields)
+            copy = SessionState.fromdict({**state_codec.loads(entry.encoded), **logs, "version": state.version})
+        tracker = changes_of(state)
+        if tracker is not None:
+            track_copy(copy, tracker)
+        if "_received" in state.__dict__:
+            copy.__dict__["_received"] = list(state.__dict__["_received"])
+        copy.__dict__["_cached_from"] = state
+        return copy
+
+    async def _flush_entry(self, key: Tuple[str, str], entry: _Entry) -> None:
+        ns, run_id = key
+        async with entry.flush_lock:
+            if not entry.dirty:
+                return
+            # a copy is written after the write of the state it was copied from
+            _rebase(entry.state)
+            # Clear first: a store_state racing with the write re-marks it dirty
+            entry.dirty, force, entry.force = False, entry.force, False
+            try:
+                await self.backend.store_state(run_id, entry.state, ns=ns, force=force)
+            except StateConflictError:
+                self.stats.conflicts += 1
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                raise
+            except Exception:
+                entry.dirty, entry.force = True, entry.force or force
+                self.stats.flush_errors += 1
+                raise
+            self.stats.flushes += 1
+
+    async def _put(self, key: Tuple[str, str], entry: _Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            lru_key = next(iter(self._entries))
+            self.stats.evictions += 1
+            await self._drop(lru_key)
+
+    def _mark_stale(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            # also when clean: a turn working on a copy stores it back over the entry
+            entry.stale = True
+
+    async def _drop(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        if entry.dirty:
+            await self._flush_entry(key, entry)
+        # The entry may have been replaced while flushing
+        if self._entries.get(key) is entry and not entry.dirty:
+            del self._entries[key]
+
+    def _ensure_flusher(self) -> None:
+        loop = asyncio.get_running_loop()
+        task = self._flush_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._flush_task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            for key, entry in list(self._entries.items()):
+                try:
+                    if entry.dirty:
+                        await self._flush_entry(key, entry)
+                    elif self._expired(entry):
+                        self.stats.expirations += 1
+                        await self._drop(key)
+                except Exception as e:
+                    logger.error(f"Failed to flush cached state for run {key[1]}: {e}")
@@ -0,0 +1,230 @@
+"""
+Hash-partitioned SQLite storage: runs are spread over N SqlStateStores, one
+database file (and engine / connection pool) each, so writers of different
+runs do not serialize on a single SQLite write lock.
+
+Resharding (changing N, or moving a single-file SqlStateStore into shards)
+copies every row to its new shard:
+
+    python -m arix_chatbot.state_manager.sharded_state_store \
+        --source-dir ai_factory_sessions --source-shards 4 \
+        --target-dir ai_factory_sessions_8 --target-shards 8
+
+(or `--source-url sqlite:///ai_factory_sessions.db` for a single-file store).
+Run it with the API stopped; it is idempotent, so an interrupted copy can be
+restarted.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import glob
+import heapq
+import logging
+import os
+import re
+import zlib
+from datetime import datetime
+from typing import Optional, Any, Dict, List, Sequence, AsyncIterator
+
+from sqlalchemy import Table
+from sqlalchemy.dialects import sqlite as sqlite_dialect
+
+from arix_chatbot.state_manager.state_store import StateStore, SessionState, SessionPage, encode_list_cursor
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+
+
+logger = logging.getLogger(__name__)
+
+SHARD_FILE = "shard-{index:03d}-of-{count:03d}.db"
+_SHARD_FILE_RE = re.compile(r"shard-(\d{3})-of-(\d{3})\.db$")
+
+
+def shard_index(run_id: str, shards: int) -> int:
+    """Stable shard of a run (crc32, identical across processes and restarts)."""
+    return zlib.crc32(run_id.encode("utf-8")) % shards
+
+
+class ShardedSqlStateStore(StateStore):
+    """
+    StateStore routing each run to one of `shards` SQLite files in
+    `directory` by a stable hash of its run_id. Per-run calls go to that
+    shard's SqlStateStore unchanged; `list_sessions` merges the shards.
+    The shard count is part of the file names, and opening a directory laid
+    out for another count fails instead of silently misrouting runs.
+    """
+
+    def __init__(self, directory: str = "ai_factory_sessions", *, shards: int = 8, **store_kwargs):
+        if shards < 1:
+            raise ValueError("shards must be >= 1")
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, "shard-*.db")):
+            match = _SHARD_FILE_RE.search(path)
+            if match and int(match.group(2)) != shards:
+                raise ValueError(
+                    f"{directory} holds {int(match.group(2))} shards, not {shards}; reshard it first"
+                )
+        self.directory = directory
+        self.shards: List[SqlStateStore] = [
+            SqlStateStore(
+                f"sqlite:///{os.path.join(directory, SHARD_FILE.format(index=i, count=shards))}",
+                **store_kwargs,
+            )
+            for i in range(shards)
+        ]
+
+    def shard_for(self, run_id: str) -> SqlStateStore:
+        return self.shards[shard_index(run_id, len(self.shards))]
+
+    # ---- Per-run API ------------------------------------------------------
+
+    async def get_state(self, run_id: str, *, ns: str = "sessions",
+                        materialize_logs: bool = False, lazy: bool = False) -> Optional[SessionState]:
+        return await self.shard_for(run_id).get_state(run_id, ns=ns, materialize_logs=materialize_logs, lazy=lazy)
+
+    async def load_logs(self, state: SessionState, *, ns: str = "sessions") -> SessionState:
+        return await self.shard_for(state.run_id).load_logs(state, ns=ns)
+
+    async def store_state(self, run_id: str, state: SessionState, *, ns: str = "sessions", force: bool = False):
+        await self.shard_for(run_id).store_state(run_id, state, ns=ns, force=force)
+
+    async def append_inbox(self, run_id: str, agent_id: str, msg: Dict[str, Any], *, ns: str = "sessions",
+                           **kwargs) -> None:
+        await self.shard_for(run_id).append_inbox(run_id, agent_id, msg, ns=ns, **kwargs)
+
+    async def append_timeline(self, run_id: str, event: Dict[str, Any], *, ns: str = "sessions") -> None:
+        await self.shard_for(run_id).append_timeline(run_id, event, ns=ns)
+
+    async def delete_state(self, run_id: str, *, ns: str = "sessions") -> bool:
+        return await self.shard_for(run_id).delete_state(run_id, ns=ns)
+
+    async def get_history(self, run_id: str, *, ns: str = "sessions", **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        async for entry in self.shard_for(run_id).get_history(run_id, ns=ns, **kwargs):
+            yield entry
+
+    async def get_checkpoint(self, run_id: str, seq: int, *, ns: str = "sessions") -> Optional[SessionState]:
+        return await self.shard_for(run_id).get_checkpoint(run_id, seq, ns=ns)
+
+    async def restore(self, run_id: str, seq: int, *, ns: str = "sessions") -> Optional[SessionState]:
+        return await self.shard_for(run_id).restore(run_id, seq, ns=ns)
+
+    async def acquire_lease(self, run_id: str, owner: str, ttl_seconds: float, *, ns: str = "sessions") -> bool:
+        return await self.shard_for(run_id).acquire_lease(run_id, owner, ttl_seconds, ns=ns)
+
+    async def release_lease(self, run_id: str, owner: str, *, ns: str = "sessions") -> None:
+        await self.shard_for(run_id).release_lease(run_id, owner, ns=ns)
+
+    # ---- Cross-shard API --------------------------------------------------
+
+    async def list_sessions(self, *, ns: str = "sessions", status: Optional[str] = None,
+                            owner_agent_id: Optional[str] = None, updated_since: Optional[datetime] = None,
+                            cursor: Optional[str] = None, limit: int = 50) -> SessionPage:
+        """
+        Same contract as SqlStateStore.list_sessions. The keyset cursor is a
+        global (updated_at, run_id) position, so every shard can be asked for
+        its next `limit` rows after it and the pages merged.
+        """
+        pages = await asyncio.gather(*(
+            shard.list_sessions(ns=ns, status=status, owner_agent_id=owner_agent_id,
+                                updated_since=updated_since, cursor=cursor, limit=limit)
+            for shard in self.shards
+        ))
+        merged = list(heapq.merge(*(page.items for page in pages),
+                                  key=lambda item: (item.updated_at, item.run_id), reverse=True))
+        items = merged[:limit]
+        next_cursor = None
+        if len(merged) > limit or any(page.next_cursor for page in pages):
+            next_cursor = encode_list_cursor(items[-1].updated_at, items[-1].run_id)
+        return SessionPage(items=items, next_cursor=next_cursor)
+
+    async def migrate_state_encoding(self, *, batch_size: int = 500) -> int:
+        counts = await asyncio.gather(*(shard.migrate_state_encoding(batch_size=batch_size) for shard in self.shards))
+        return sum(counts)
+
+    async def dispose(self) -> None:
+        await asyncio.gather(*(shard.dispose() for shard in self.shards))
+
+
+# ---- Resharding -----------------------------------------------------------
+
+# Leases are short-lived and not copied
+RESHARD_TABLES = ("sessions", "checkpoints", "session_logs", "session_events")
+
+
+def _insert_ignore(table: Table):
+    return sqlite_dialect.insert(table).on_conflict_do_nothing()
+
+
+async def reshard(sources: Sequence[SqlStateStore], target: ShardedSqlStateStore, *,
+                  batch_size: int = 500) -> Dict[str, int]:
+    """
+    Copy every run of `sources` into its shard of `target`. Rows already in
+    the target are left untouched, so the copy can be re-run after an
+    interruption. Returns the number of rows read per table.
+    """
+    copied = {name: 0 for name in RESHARD_TABLES}
+    for store in target.shards:
+        await store._ensure_ready()
+    for source in sources:
+        await source._ensure_ready()
+        for name in RESHARD_TABLES:
+            table = source.meta.tables[name]
+            pending: Dict[int, List[Dict[str, Any]]] = {}
+
+            async def _flush_shard(index: int):
+                rows = pending.pop(index, None)
+                if not rows:
+                    return
+                shard = target.shards[index]
+                async with shard._tx() as conn:
+                    await conn.execute(_insert_ignore(shard.meta.tables[name]), rows)
+
+            async with source.engine.connect() as conn:
+                result = await conn.stream(table.select().execution_options(yield_per=batch_size))
+                async for row in result:
+                    index = shard_index(row.run_id, len(target.shards))
+                    pending.setdefault(index, []).append(dict(row._mapping))
+                    copied[name] += 1
+                    if len(pending[index]) >= batch_size:
+                        await _flush_shard(index)
+            for index in list(pending):
+                await _flush_shard(index)
+            logger.info(f"Resharded {copied[name]} rows of {name}")
+    return copied
+
+
+async def _reshard_main(args) -> None:
+    if args.source_url:
+        sources = [SqlStateStore(url) for url in args.source_url]
+    else:
+        sources = ShardedSqlStateStore(args.source_dir, shards=args.source_shards).shards
+    target = ShardedSqlStateStore(args.target_dir, shards=args.target_shards)
+    try:
+        copied = await reshard(sources, target, batch_size=args.batch_size)
+    finally:
+        await asyncio.gather(*(source.dispose() for source in sources))
+        await target.dispose()
+    for name, count in copied.items():
+        print(f"{name}: {count} rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy session storage into a new shard layout")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--source-url", nargs="+", help="single-file SqlStateStore URL(s)")
+    source.add_argument("--source-dir", help="directory of an existing sharded store")
+    parser.add_argument("--source-shards", type=int, help="shard count of --source-dir")
+    parser.add_argument("--target-dir", required=True)
+    parser.add_argument("--target-shards", type=int, required=True)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    if args.source_dir and not args.source_shards:
+        parser.error("--source-shards is required with --source-dir")
+    if args.source_dir and os.path.abspath(args.source_dir) == os.path.abspath(args.target_dir):
+        parser.error("--target-dir must differ from --source-dir")
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_reshard_main(args))
+
+
+if __name__ == "__main__":
+    main()
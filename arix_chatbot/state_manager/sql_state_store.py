@@ -1,78 +1,258 @@
 from __future__ import annotations
+import asyncio
 import json
-import time
 import uuid
-from typing import Optional, Any, Dict
-from datetime import datetime
-from contextlib import contextmanager
+from typing import Optional, Any, Dict, Sequence, AsyncIterator
+from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
 
 # Assuming these types exist as in your snippet:
-from arix_chatbot.state_manager.state_store import StateStore, SessionState
+from arix_chatbot.state_manager.state_store import (
+    StateStore, SessionState, StateConflictError, SessionSummary, SessionPage,
+    encode_list_cursor, decode_list_cursor, naive_utc, EventKind, fold_events,
+)
+from arix_chatbot.state_manager.state_diff import diff, apply_diff
+from arix_chatbot.state_manager import state_codec, compression, sqlite_profiles
+from arix_chatbot.state_manager.append_log import AppendLog, LOG_FIELDS
+from arix_chatbot.state_manager.change_tracking import TRACKED_FIELDS, changes_of
+from arix_chatbot.state_manager.lazy_state import LazyDocument, LazySessionState
 
 from sqlalchemy import (
-    Table, Column, String, Integer, DateTime, JSON, MetaData,
-    create_engine, select, insert, update, UniqueConstraint
+    Table, Column, Index, String, Integer, DateTime, JSON, LargeBinary, MetaData, TypeDecorator,
+    select, insert, update, func, case, inspect, text, tuple_, type_coerce, UniqueConstraint
 )
-from sqlalchemy.engine import Engine
-from sqlalchemy.exc import OperationalError, DatabaseError
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.exc import OperationalError, DatabaseError, IntegrityError
+from sqlalchemy.dialects import sqlite as sqlite_dialect, postgresql as postgresql_dialect
+
+
+# Sync driver names -> async drivers understood by create_async_engine
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+psycopg",
+}
+
+
+def _to_async_url(conn_string: str) -> str:
+    """
+    Accept plain sync URLs ("sqlite:///x.db") and map them to their async driver.
+    URLs that already name an async driver are returned untouched.
+    """
+    url = make_url(conn_string)
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    if driver is None:
+        return conn_string
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def _is_memory_db(url) -> bool:
+    return url.database in (None, "", ":memory:") or "mode=memory" in str(url)
+
+
+class StateBlob(TypeDecorator):
+    """
+    Binary column holding a JSON document framed and compressed by
+    `compression` (codec header + payload). Binds python objects (encoded with
+    the state codec) or already-encoded JSON bytes; reads return the decoded
+    document. Legacy uncompressed JSON rows (text on SQLite, header-less bytes
+    on migrated Postgres) decode transparently.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, codec: str = "zlib", min_size: int = 256):
+        super().__init__()
+        compression.get_codec(codec)  # fail fast on unknown codecs
+        self.codec = codec
+        self.min_size = min_size
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        data = bytes(value) if isinstance(value, (bytes, bytearray)) else state_codec.dumps(value)
+        return compression.compress(data, self.codec, min_size=self.min_size)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            return state_codec.loads(value)
+        return state_codec.loads(compression.decompress(value))
+
+
+_NO_STATE = object()
+
 
+class CheckpointKind:
+    BASE = "base"      # full state snapshot
+    DELTA = "delta"    # structural diff against the previous checkpoint
 
-def _to_jsonable(obj: Any) -> Any:
+
+def _migrate_schema(conn, *, blob_state: bool = True) -> None:
     """
-    Convert SessionState (or any object) to something json.dumps can handle.
-    - If it has .dict(), use it (pydantic-like)
-    - If it has __dict__, use that
-    - If it's already a dict/list/primitive, leave it
+    Add columns introduced after a table was first created (create_all only
+    creates missing tables) and backfill checkpoint ordering for old rows.
+    Runs on a sync connection via AsyncConnection.run_sync.
     """
-    try:
-        if hasattr(obj, "dict") and callable(obj.dict):
-            return obj.dict()
-        if hasattr(obj, "__dict__"):
-            return vars(obj)
-    except Exception:
-        pass
-    return obj
-
-
-def _serialize_state(state: SessionState) -> Dict[str, Any]:
-    # Ensure we store a plain JSON structure
-    try:
-        return json.loads(json.dumps(_to_jsonable(state), default=str))
-    except TypeError:
-        # Fallback: stringify unknowns
-        return json.loads(json.dumps(_to_jsonable(state), default=str))
-
-
-def _infer_version_from_state(state: SessionState) -> int:
-    # Try to track your semantic version from timeline length; fallback to 1
-    try:
-        v = getattr(state, "timeline", None)
-        return int(len(v) if v is not None else 1)
-    except Exception:
-        return 1
+    insp = inspect(conn)
+    if blob_state and conn.dialect.name == "postgresql":
+        # state used to be a json column; compressed documents need bytea
+        for table in ("sessions", "checkpoints"):
+            if not insp.has_table(table):
+                continue
+            column = next(c for c in insp.get_columns(table) if c["name"] == "state")
+            if isinstance(column["type"], JSON):
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table} ALTER COLUMN state TYPE bytea "
+                    f"USING convert_to(state::text, 'UTF8')"
+                )
+    if insp.has_table("sessions"):
+        # Versions used to be timeline lengths; 0 now means "never stored".
+        conn.exec_driver_sql("UPDATE sessions SET version = 1 WHERE version < 1")
+        existing = {c["name"] for c in insp.get_columns("sessions")}
+        _promote_session_columns(conn, existing)
+        if "event_seq" not in existing:
+            conn.exec_driver_sql("ALTER TABLE sessions ADD COLUMN event_seq INTEGER NOT NULL DEFAULT 0")
+        if "field_index" not in existing:
+            conn.exec_driver_sql("ALTER TABLE sessions ADD COLUMN field_index JSON")
+    if not insp.has_table("checkpoints"):
+        return
+    existing = {c["name"] for c in insp.get_columns("checkpoints")}
+    if "seq" not in existing:
+        conn.exec_driver_sql("ALTER TABLE checkpoints ADD COLUMN seq INTEGER")
+    if "kind" not in existing:
+        conn.exec_driver_sql("ALTER TABLE checkpoints ADD COLUMN kind VARCHAR(8)")
+
+    # Legacy rows were full snapshots; number them per run in write order.
+    legacy = conn.exec_driver_sql(
+        "SELECT id, ns, run_id FROM checkpoints WHERE seq IS NULL ORDER BY ns, run_id, ts"
+    ).fetchall()
+    counters: Dict[tuple, int] = {}
+    for checkpoint_id, ns, run_id in legacy:
+        seq = counters[(ns, run_id)] = counters.get((ns, run_id), 0) + 1
+        conn.execute(
+            text("UPDATE checkpoints SET seq = :seq, kind = :kind WHERE id = :id"),
+            {"seq": seq, "kind": CheckpointKind.BASE, "id": checkpoint_id},
+        )
+    # create_all only indexes new tables: history reads look checkpoints up by (ns, run_id, seq)
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_checkpoints_seq ON checkpoints (seq)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_checkpoints_ns_run_seq ON checkpoints (ns, run_id, seq)")
+
+
+# Listing columns promoted out of the metadata JSON / state document
+PROMOTED_SESSION_COLUMNS = {
+    "status": "VARCHAR(32)",
+    "owner_agent_id": "VARCHAR(128)",
+    "turn_index": "INTEGER",
+}
+
+
+def _promote_session_columns(conn, existing) -> None:
+    """
+    Add the indexed listing columns to a pre-existing sessions table and
+    backfill them once from each row's metadata and state document.
+    """
+    missing = [name for name in PROMOTED_SESSION_COLUMNS if name not in existing]
+    if not missing:
+        return
+    for name in missing:
+        conn.exec_driver_sql(f"ALTER TABLE sessions ADD COLUMN {name} {PROMOTED_SESSION_COLUMNS[name]}")
+
+    rows = conn.exec_driver_sql("SELECT ns, run_id, metadata, state FROM sessions").fetchall()
+    for ns, run_id, metadata, raw in rows:
+        if isinstance(metadata, str):
+            metadata = json.loads(metadata)
+        doc = SqlStateStore._decode_raw(raw)
+        conn.execute(
+            text("UPDATE sessions SET status = :status, owner_agent_id = :owner, turn_index = :turn "
+                 "WHERE ns = :ns AND run_id = :run_id"),
+            {
+                "status": (metadata or {}).get("status", doc.get("status")),
+                "owner": (metadata or {}).get("owner_agent_id", doc.get("owner_agent_id")),
+                "turn": doc.get("turn_index") or 0,
+                "ns": ns,
+                "run_id": run_id,
+            },
+        )
 
 
 class SqlStateStore(StateStore):
     """
-    Durable state store independent of LangGraph.
+    Durable, async-native state store independent of LangGraph.
     Maintains:
-      - sessions(run_id, ns) -> last state snapshot + version + metadata
-      - checkpoints(id, run_id, ns, version, ts, state, metadata)
-    Works with Postgres or SQLite.
+      - sessions(run_id, ns) -> last state snapshot + version + metadata, where
+        version is bumped on every write and guards it (compare-and-swap);
+        status, owner_agent_id, turn_index and updated_at are indexed columns
+        backing `list_sessions`
+      - checkpoints(id, run_id, ns, seq, kind, version, ts, state, metadata)
+        where `state` is a full snapshot every `snapshot_every` checkpoints
+        and a structural diff against the previous checkpoint otherwise.
+      - session_logs(ns, run_id, log, seq, entry) -> append-only rows of the
+        ever-growing SessionState lists (LOG_FIELDS); the state document only
+        keeps their lengths under "$logs", so a turn writes just its new entries
+      - run_leases(ns, run_id, owner, expires_at) -> cross-process turn leases
+        (see run_lease.RunLease)
+      - session_events(ns, run_id, seq, kind, ts, payload) -> inbox messages /
+        timeline events posted with append_inbox / append_timeline without
+        rewriting the state; folded into the state on read and dropped once a
+        write has persisted them (sessions.event_seq numbers them per run)
+    `state` columns are compressed blobs (see StateBlob) using `compression`
+    ("none", "zlib" or, with zstandard installed, "zstd").
+    On SQLite, `sqlite_profile` picks the durability / speed trade-off
+    ("durable", "balanced", "throughput", see sqlite_profiles).
+    Works with Postgres (async driver URL) or SQLite (via aiosqlite).
     """
 
-    def __init__(self, conn_string: str = "sqlite:///ai_factory_sessions.db"):
+    # raw state bytes are the codec's JSON, so member offsets can index them
+    _lazy_reads = True
+
+    def __init__(self, conn_string: str = "sqlite:///ai_factory_sessions.db", *, snapshot_every: int = 20,
+                 compression: str = "zlib", read_pool_size: int = 8,
+                 sqlite_profile: str = sqlite_profiles.DEFAULT_PROFILE,
+                 engine_options: Optional[Dict[str, Any]] = None):
         if not conn_string:
             raise ValueError("Connection string cannot be empty")
+        if snapshot_every < 1:
+            raise ValueError("snapshot_every must be >= 1")
+        self.snapshot_every = snapshot_every
+        self.compression = compression
+        state_type = self._state_type()
+        document_type = self._document_type()
 
-        self.engine: Engine = create_engine(conn_string, future=True)
+        # JSON columns go through the single-pass state codec
+        self.engine: AsyncEngine = create_async_engine(
+            _to_async_url(conn_string),
+            json_serializer=state_codec.dumps_str,
+            json_deserializer=state_codec.loads,
+            **(engine_options or {}),
+        )
+        self._is_sqlite = self.engine.url.get_backend_name() == "sqlite"
+        # SQLite pragmas are per connection: set them on every pooled one
+        self.sqlite_profile = sqlite_profiles.get_profile(sqlite_profile)
+        if self._is_sqlite:
+            event.listen(self.engine.sync_engine, "connect", self._on_connect)
 
-        # SQLite durability tuning (safe defaults)
-        if conn_string.startswith("sqlite"):
-            with self.engine.begin() as conn:
-                conn.exec_driver_sql("PRAGMA journal_mode=WAL;")
-                conn.exec_driver_sql("PRAGMA synchronous=FULL;")
-                conn.exec_driver_sql("PRAGMA foreign_keys=ON;")
+        # SQLite reads get their own query-only pool and deferred (snapshot)
+        # transactions, so they never queue behind BEGIN IMMEDIATE writers.
+        # read_pool_size=0 sends reads through _tx() like writes.
+        self.read_pool_size = read_pool_size
+        self.read_engine: AsyncEngine = self.engine
+        if self._is_sqlite and read_pool_size and not _is_memory_db(self.engine.url):
+            self.read_engine = create_async_engine(
+                self.engine.url,
+                json_serializer=state_codec.dumps_str,
+                json_deserializer=state_codec.loads,
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=read_pool_size,
+                max_overflow=0,
+            )
+            event.listen(self.read_engine.sync_engine, "connect", self._on_read_connect)
+        self._ready = False
+        self._init_lock = asyncio.Lock()
 
         self.meta = MetaData()
 
@@ -84,44 +264,147 @@ class SqlStateStore(StateStore):
             Column("run_id", String(128), nullable=False),
             Column("version", Integer, nullable=False),
             Column("updated_at", DateTime, nullable=False),
-            Column("state", JSON, nullable=False),
-            Column("metadata", JSON, nullable=False),
+            Column("status", String(32)),
+            Column("owner_agent_id", String(128)),
+            Column("turn_index", Integer),
+            Column("event_seq", Integer, nullable=False, server_default=text("0")),
+            Column("state", state_type, nullable=False),
+            Column("metadata", document_type, nullable=False),
+            # member offsets of the state document, for lazy decoding (see lazy_state)
+            Column("field_index", document_type),
             UniqueConstraint("ns", "run_id", name="uq_sessions_ns_run"),
+            # keyset listing: newest first, optionally within a status / owner
+            Index("ix_sessions_ns_updated", "ns", "updated_at", "run_id"),
+            Index("ix_sessions_ns_status_updated", "ns", "status", "updated_at", "run_id"),
+            Index("ix_sessions_ns_owner_updated", "ns", "owner_agent_id", "updated_at", "run_id"),
+            Index("ix_sessions_ns_turn", "ns", "turn_index"),
         )
 
-        # Append-only log for history/restore
+        # Append-only log for history/restore: base snapshots + per-write diffs
         self.checkpoints = Table(
             "checkpoints",
             self.meta,
             Column("id", String(64), primary_key=True),
             Column("ns", String(64), nullable=False, index=True),
             Column("run_id", String(128), nullable=False, index=True),
+            Column("seq", Integer, index=True),
+            Column("kind", String(8)),
             Column("version", Integer, nullable=False, index=True),
             Column("ts", DateTime, nullable=False),
-            Column("state", JSON, nullable=False),
-            Column("metadata", JSON, nullable=False),
+            Column("state", state_type, nullable=False),
+            Column("metadata", document_type, nullable=False),
+            Index("ix_checkpoints_ns_run_seq", "ns", "run_id", "seq"),
+        )
+
+        # Append-only entries of chat_full_history / timeline
+        self.session_logs = Table(
+            "session_logs",
+            self.meta,
+            Column("ns", String(64), primary_key=True),
+            Column("run_id", String(128), primary_key=True),
+            Column("log", String(32), primary_key=True),
+            Column("seq", Integer, primary_key=True),
+            Column("entry", state_type, nullable=False),
+        )
+
+        # Appended inbox / timeline events not folded into a stored state yet
+        self.session_events = Table(
+            "session_events",
+            self.meta,
+            Column("ns", String(64), primary_key=True),
+            Column("run_id", String(128), primary_key=True),
+            Column("seq", Integer, primary_key=True),
+            Column("kind", String(16), nullable=False),
+            Column("ts", DateTime, nullable=False),
+            Column("payload", state_type, nullable=False),
+        )
+
+        # Short-lived, expiring ownership of a run while a turn executes
+        self.run_leases = Table(
+            "run_leases",
+            self.meta,
+            Column("ns", String(64), primary_key=True),
+            Column("run_id", String(128), primary_key=True),
+            Column("owner", String(128), nullable=False),
+            Column("expires_at", DateTime, nullable=False),
         )
 
-        self.meta.create_all(self.engine)
+    async def _ensure_ready(self):
+        """
+        Lazily create / migrate the schema on first use, since the async
+        engine cannot be driven from __init__.
+        """
+        if self._ready:
+            return
+        async with self._init_lock:
+            if self._ready:
+                return
+            async with self.engine.begin() as conn:
+                await conn.run_sync(self._migrate_schema)
+                await conn.run_sync(self.meta.create_all)
+                # create_all skips indexes of tables that already existed
+                await conn.run_sync(lambda c: [
+                    ix.create(c, checkfirst=True) for table in self.meta.sorted_tables for ix in table.indexes
+                ])
+            self._ready = True
+
+    def _state_type(self):
+        """Column type of state documents (and log entries / event payloads)."""
+        return StateBlob(self.compression)
+
+    def _document_type(self):
+        """Column type of the metadata documents."""
+        return JSON
+
+    @staticmethod
+    def _migrate_schema(conn) -> None:
+        _migrate_schema(conn)
 
-    @contextmanager
-    def _tx(self):
+    @asynccontextmanager
+    async def _tx(self):
         """
-        Context manager that opens a transaction.
+        Async context manager that opens a transaction.
         For SQLite we explicitly do BEGIN IMMEDIATE to reduce writer races.
         """
-        with self.engine.begin() as conn:
-            if str(self.engine.url).startswith("sqlite"):
-                conn.exec_driver_sql("BEGIN IMMEDIATE;")
+        await self._ensure_ready()
+        async with self.engine.begin() as conn:
+            if self._is_sqlite:
+                await conn.exec_driver_sql("BEGIN IMMEDIATE;")
             yield conn
 
-    def _retryable(self, fn, *, retries: int = 5, base_sleep: float = 0.08):
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        sqlite_profiles.apply_profile(dbapi_connection, self.sqlite_profile)
+
+    def _on_read_connect(self, dbapi_connection, connection_record) -> None:
+        # the read pool also rejects any write
+        sqlite_profiles.apply_profile(dbapi_connection, self.sqlite_profile, read_only=True)
+
+    @asynccontextmanager
+    async def _snapshot(self):
+        """
+        Read-only connection for a consistent multi-statement read. On SQLite
+        it opens a deferred transaction on the read pool: in WAL mode that is
+        a snapshot of the last commit which neither takes nor waits for the
+        writer lock. Other backends use a plain transaction (MVCC snapshot).
+        """
+        if self._is_sqlite and not self.read_pool_size:
+            async with self._tx() as conn:
+                yield conn
+            return
+        await self._ensure_ready()
+        async with self.read_engine.connect() as conn:
+            if self._is_sqlite:
+                await conn.exec_driver_sql("BEGIN DEFERRED;")
+            yield conn
+
+    async def _retryable(self, fn, *, retries: int = 5, base_sleep: float = 0.08):
         """
         Retry transient errors (locks, deadlocks).
+        `fn` is a coroutine function; backoff sleeps yield to the event loop.
         """
         for attempt in range(retries):
             try:
-                return fn()
+                return await fn()
             except (OperationalError, DatabaseError) as e:
                 # Common transient patterns across drivers
                 msg = str(e).lower()
@@ -132,113 +415,694 @@ class SqlStateStore(StateStore):
                     ]
                 )
                 if attempt < retries - 1 and transient:
-                    time.sleep(base_sleep * (2 ** attempt))
+                    await asyncio.sleep(base_sleep * (2 ** attempt))
                     continue
                 raise
 
     # ---- Public API -----------------------------------------------------
 
-    def get_state(self, run_id: str, *, ns: str = "sessions") -> Optional[SessionState]:
+    async def get_state(self, run_id: str, *, ns: str = "sessions",
+                        materialize_logs: bool = False, lazy: bool = False) -> Optional[SessionState]:
         """
         Returns the latest stored state or None.
+        Log fields (chat_full_history, timeline) come back as AppendLogs that
+        accept appends but are only readable with `materialize_logs=True` or
+        after `load_logs`.
+        With `lazy`, the state is a LazySessionState decoding fields on first
+        access (rows written before field indexes existed decode eagerly).
         """
-        def _read():
-            with self._tx() as conn:
-                row = conn.execute(
-                    select(self.sessions.c.state)
-                    .where(
-                        (self.sessions.c.ns == ns) &
-                        (self.sessions.c.run_id == run_id)
-                    )
-                ).fetchone()
-                if not row:
-                    return None
-                data = row[0]
-                # If your SessionState is a pydantic/dataclass, reconstruct here if desired.
-                # For now, we return the raw dict (or you can plug in a converter).
-                return data  # type: ignore[return-value]
+        sc, ec = self.sessions.c, self.session_events.c
+        lazy = lazy and self._lazy_reads
+        if lazy:
+            columns = (type_coerce(sc.state, LargeBinary).label("state"), sc.field_index)
+        else:
+            columns = (sc.state,)
+
+        async def _read():
+            async with self._snapshot() as conn:
+                row = (await conn.execute(
+                    select(sc.version, sc.event_seq, *columns)
+                    .where((sc.ns == ns) & (sc.run_id == run_id))
+                )).fetchone()
+                if row is None:
+                    return None, None, []
+                doc = self._lazy_document(row.state, row.field_index) if lazy else row.state
+                if row.event_seq <= (doc.get("event_seq") or 0):
+                    return row, doc, []
+                events = (await conn.execute(
+                    select(ec.seq, ec.kind, ec.ts, ec.payload)
+                    .where((ec.ns == ns) & (ec.run_id == run_id) & (ec.seq > (doc.get("event_seq") or 0)))
+                    .order_by(ec.seq.asc())
+                )).fetchall()
+                return row, doc, events
+
+        row, doc, events = await self._retryable(_read)
+        if row is None:
+            return None
+        state = self._state_from_doc(doc, row.version)
+        fold_events(state, events)
+        if materialize_logs:
+            await self.load_logs(state, ns=ns)
+        return state
 
-        return SessionState.fromdict(self._retryable(_read))
+    @staticmethod
+    def _lazy_document(raw, field_index) -> Any:
+        """LazyDocument over a raw state column value, or the decoded dict if it has no field index."""
+        if field_index is None or isinstance(raw, str):
+            return SqlStateStore._decode_raw(raw)
+        doc = LazyDocument(compression.decompress(raw), field_index)
+        # legacy documents keep their logs inline: decode those eagerly
+        return doc if "$logs" in doc else doc.todict()
 
-    def store_state(self, run_id: str, state: SessionState, *, ns: str = "sessions"):
+    @staticmethod
+    def _state_from_doc(doc: Any, version: int) -> SessionState:
+        if isinstance(doc, LazyDocument):
+            cursors = doc.get("$logs")
+            preset = {name: AppendLog(persisted=cursors.get(name, 0), offset=cursors.get(name, 0))
+                      for name in LOG_FIELDS}
+            return LazySessionState(doc, {"version": version, **preset})
+        doc = dict(doc)
+        cursors = doc.pop("$logs", None)
+        state = SessionState.fromdict(doc)
+        state.version = version
+        for name in LOG_FIELDS:
+            if cursors is None:
+                # Legacy document with the lists inline: all entries still to be written
+                setattr(state, name, AppendLog(getattr(state, name)))
+            else:
+                n = cursors.get(name, 0)
+                setattr(state, name, AppendLog(persisted=n, offset=n))
+        return state
+
+    async def load_logs(self, state: SessionState, *, ns: str = "sessions") -> SessionState:
+        """Load the stored entries of every log field of `state` that is not loaded yet."""
+        lc = self.session_logs.c
+        async with self._snapshot() as conn:
+            for name in LOG_FIELDS:
+                log = getattr(state, name)
+                if not isinstance(log, AppendLog) or log.loaded:
+                    continue
+                entries = (await conn.execute(
+                    select(lc.entry)
+                    .where((lc.ns == ns) & (lc.run_id == state.run_id) & (lc.log == name) & (lc.seq < log.offset))
+                    .order_by(lc.seq.asc())
+                )).scalars().all()
+                log.attach(list(entries))
+        return state
+
+    def _insert_if_absent(self, table: Table):
+        """INSERT that is a no-op (rowcount 0) if the (ns, run_id) row already exists."""
+        dialect = self.engine.dialect.name
+        if dialect == "sqlite":
+            return sqlite_dialect.insert(table).on_conflict_do_nothing(index_elements=["ns", "run_id"])
+        if dialect == "postgresql":
+            return postgresql_dialect.insert(table).on_conflict_do_nothing(index_elements=["ns", "run_id"])
+        return insert(table)
+
+    async def store_state(self, run_id: str, state: SessionState, *, ns: str = "sessions", force: bool = False):
         """
         Atomically write:
-          - Upsert latest snapshot in sessions
+          - Compare-and-swap the latest snapshot in sessions: the write only
+            applies if the stored version still equals `state.version`
+            (INSERT ... ON CONFLICT DO NOTHING for a new run, UPDATE ... WHERE
+            version = :expected otherwise), and bumps it by one
           - Append a checkpoint row
+        Raises StateConflictError if another writer got there first; `force`
+        skips the check and overwrites whatever is stored.
         No sleeps; durability is ensured by COMMIT.
         """
-        state_json = _serialize_state(state)
-        version = _infer_version_from_state(state)
+        doc, log_writes = self._split_logs(state)
+        tracker = changes_of(state)
+        if tracker is None:
+            encoded_fields = {name: state_codec.dumps(value) for name, value in doc.items()}
+        else:
+            # only dirty fields are re-encoded, and they are all the delta needs
+            encoded_fields = tracker.encode_fields(doc)
+            base_version = tracker.version
+            changed = {name: data for name, data in encoded_fields.items()
+                       if name in tracker.dirty or name not in TRACKED_FIELDS}
+        # the member offsets let readers decode single fields (get_state(lazy=True))
+        encoded, field_index = state_codec.join_indexed(encoded_fields)
         ts = datetime.utcnow()
+        sc = self.sessions.c
+
+        def _delta(existing, expected):
+            if existing is None:
+                return None
+            if tracker is not None and base_version == expected:
+                return b'{"$set":' + state_codec.join_object(changed) + b"}"
+            return diff(existing.state, state_codec.loads(encoded))
+
+        async def _write():
+            async with self._tx() as conn:
+                existing = (await conn.execute(
+                    select(sc.version, sc.state)
+                    .where((sc.ns == ns) & (sc.run_id == run_id))
+                )).fetchone()
+                stored_version = existing.version if existing else None
+                expected = self._check_version(run_id, state, stored_version, force)
+                version = expected + 1
+
+                await self._write_session(conn, ns, run_id, state, existing is None, expected, version, ts,
+                                          {"state": encoded, "field_index": field_index})
+                stored_cursors = (existing.state.get("$logs") or {}) if existing else {}
+                await self._write_logs_and_events(conn, ns, run_id, state, log_writes, stored_cursors)
+
+                # The sessions row holds the state of the latest checkpoint, so
+                # diff against it; fall back to a full snapshot periodically.
+                await self._append_checkpoint(
+                    conn, ns, run_id, state, version, ts, lambda: encoded, lambda: _delta(existing, expected),
+                )
+                return version
+
+        await self._run_write(_write, run_id, state, encoded_fields, doc["$logs"])
 
+    # ---- Write steps (shared with specialised stores) ---------------------
+
+    @staticmethod
+    def _split_logs(state: SessionState):
+        """
+        Field dict of the stored document for `state`, and the log entries
+        to write: the version lives in its own column, not in the document,
+        and log fields are written as rows with only their lengths kept
+        inline (under "$logs"). Those lengths are what the write persists:
+        pass them to `_run_write`, as entries appended while it is in flight
+        are not part of it.
+        """
+        doc = state_codec.state_fields(state)
+        doc.pop("version", None)
+        log_writes = {}
+        for name in LOG_FIELDS:
+            log = doc.pop(name)
+            if isinstance(log, AppendLog):
+                start, entries = log.persisted, log.pending()
+            else:
+                # A plain list replaces whatever is stored
+                start, entries = 0, list(log)
+            log_writes[name] = (start, [state_codec.dumps(e) for e in entries])
+        doc["$logs"] = {name: start + len(log_writes[name][1]) for name, (start, _) in log_writes.items()}
+        return doc, log_writes
+
+    @staticmethod
+    def _check_version(run_id: str, state: SessionState, stored_version: Optional[int], force: bool) -> int:
+        """The version the write is based on; raises StateConflictError if it is stale."""
+        expected = (stored_version or 0) if force else state.version
+        if (stored_version or 0) != expected:
+            raise StateConflictError(run_id, expected, stored_version)
+        return expected
+
+    @staticmethod
+    def _metadata(state: SessionState) -> Dict[str, Any]:
         # Build metadata: keep yours minimal but extendable
-        metadata = {
-            "status": state_json.get("status"),
-            "owner_agent_id": state_json.get("owner_agent_id"),
-            "pipeline": ",".join(state_json.get("pipeline", []) or []),
+        return {
+            "status": state.status,
+            "owner_agent_id": state.owner_agent_id,
+            "pipeline": ",".join(state.pipeline or []),
         }
 
-        checkpoint_id = str(uuid.uuid4())
-
-        def _write():
-            with self._tx() as conn:
-                # Upsert sessions (portable pattern)
-                existing = conn.execute(
-                    select(self.sessions.c.version)
-                    .where((self.sessions.c.ns == ns) & (self.sessions.c.run_id == run_id))
-                    .with_for_update(nowait=False, of=self.sessions)  # lock row if exists
-                ).fetchone()
-
-                if existing:
-                    conn.execute(
-                        update(self.sessions)
-                        .where((self.sessions.c.ns == ns) & (self.sessions.c.run_id == run_id))
-                        .values(
-                            version=version,
-                            updated_at=ts,
-                            state=state_json,
-                            metadata=metadata,
-                        )
-                    )
-                else:
-                    conn.execute(
-                        insert(self.sessions).values(
-                            ns=ns,
-                            run_id=run_id,
-                            version=version,
-                            updated_at=ts,
-                            state=state_json,
-                            metadata=metadata,
-                        )
+    async def _write_session(self, conn, ns: str, run_id: str, state: SessionState, is_new: bool,
+                             expected: int, version: int, ts: datetime, values: Dict[str, Any]) -> None:
+        """Insert / compare-and-swap the sessions row with `values` (e.g. {"state": ...})."""
+        sc = self.sessions.c
+        values = dict(values)
+        values.update(
+            version=version,
+            updated_at=ts,
+            status=state.status,
+            owner_agent_id=state.owner_agent_id,
+            turn_index=state.turn_index,
+            metadata=self._metadata(state),
+        )
+        if is_new:
+            result = await conn.execute(self._insert_if_absent(self.sessions).values(ns=ns, run_id=run_id, **values))
+        else:
+            result = await conn.execute(
+                update(self.sessions)
+                .where((sc.ns == ns) & (sc.run_id == run_id) & (sc.version == expected))
+                .values(**values)
+            )
+        if result.rowcount == 0:
+            raise StateConflictError(run_id, expected, None)
+
+    async def _write_logs_and_events(self, conn, ns: str, run_id: str, state: SessionState, log_writes,
+                                     stored_cursors: Dict[str, int]) -> None:
+        await self._write_logs(conn, ns, run_id, log_writes, stored_cursors)
+        if state.event_seq:
+            # folded into the state just written
+            ec = self.session_events.c
+            await conn.execute(
+                self.session_events.delete()
+                .where((ec.ns == ns) & (ec.run_id == run_id) & (ec.seq <= state.event_seq))
+            )
+
+    async def _append_checkpoint(self, conn, ns: str, run_id: str, state: SessionState, version: int,
+                                 ts: datetime, make_base, make_delta) -> None:
+        """
+        Append checkpoint `version`: a delta against the previous checkpoint
+        (`make_delta()`, None if not expressible) unless a full snapshot
+        (`make_base()`, the encoded document) is due every `snapshot_every`
+        checkpoints.
+        """
+        cp = self.checkpoints.c
+        last_seq, last_base_seq = (await conn.execute(
+            select(func.max(cp.seq), func.max(case((cp.kind == CheckpointKind.BASE, cp.seq))))
+            .where((cp.ns == ns) & (cp.run_id == run_id))
+        )).one()
+        seq = (last_seq or 0) + 1
+
+        delta = None
+        if last_seq is not None and last_base_seq is not None and seq - last_base_seq < self.snapshot_every:
+            delta = make_delta()
+
+        await conn.execute(
+            insert(self.checkpoints).values(
+                id=str(uuid.uuid4()),
+                ns=ns,
+                run_id=run_id,
+                seq=seq,
+                kind=CheckpointKind.BASE if delta is None else CheckpointKind.DELTA,
+                version=version,
+                ts=ts,
+                state=make_base() if delta is None else delta,
+                metadata=self._metadata(state),
+            )
+        )
+
+    async def _run_write(self, write, run_id: str, state: SessionState,
+                         encoded_fields: Optional[Dict[str, bytes]], log_lengths: Dict[str, int]) -> None:
+        """
+        Run a write transaction with retries, then mark the state's logs as
+        persisted up to `log_lengths` (their lengths when the write was
+        prepared, see _split_logs) and its tracked fields (written as
+        `encoded_fields`) clean.
+        """
+        tracker = changes_of(state)
+        snapshot = tracker.begin_write() if tracker is not None else None
+        try:
+            state.version = await self._retryable(write)
+        except (StateConflictError, IntegrityError) as e:
+            if tracker is not None:
+                tracker.forget()
+            if isinstance(e, IntegrityError):
+                # Another writer created the same run concurrently (non-upsert dialects)
+                raise StateConflictError(run_id, state.version, None)
+            raise
+        if tracker is not None:
+            tracker.written(snapshot, state.version, encoded_fields or {})
+        state.received_stored()
+
+        for name in LOG_FIELDS:
+            log = getattr(state, name)
+            if isinstance(log, AppendLog):
+                log.mark_persisted(log_lengths[name])
+            else:
+                setattr(state, name, AppendLog(log, persisted=log_lengths[name]))
+
+    async def _write_logs(self, conn, ns: str, run_id: str, log_writes, stored_cursors: Dict[str, int]) -> None:
+        lc = self.session_logs.c
+        for name, (start, entries) in log_writes.items():
+            if start < stored_cursors.get(name, 0) or start == 0:
+                # Rewind (restore, replaced list, legacy document): drop the stale tail
+                await conn.execute(
+                    self.session_logs.delete()
+                    .where((lc.ns == ns) & (lc.run_id == run_id) & (lc.log == name) & (lc.seq >= start))
+                )
+            if entries:
+                await conn.execute(
+                    insert(self.session_logs),
+                    [{"ns": ns, "run_id": run_id, "log": name, "seq": start + i, "entry": entry}
+                     for i, entry in enumerate(entries)],
+                )
+
+    async def append_inbox(self, run_id: str, agent_id: str, msg: Dict[str, Any], *,
+                           sender: str = "user", ns: str = "sessions") -> None:
+        """
+        Post `msg` to `agent_id`'s inbox (under `sender`) as an event row;
+        the stored state is not rewritten and its version does not move.
+        Raises ValueError if the run does not exist.
+        """
+        await self._append_event(run_id, EventKind.INBOX, {"agent_id": agent_id, "sender": sender, "msg": msg}, ns)
+
+    async def append_timeline(self, run_id: str, event: Dict[str, Any], *, ns: str = "sessions") -> None:
+        """Append a timestamped timeline entry as an event row (see append_inbox)."""
+        await self._append_event(
+            run_id, EventKind.TIMELINE, {"timestamp": datetime.now().isoformat(), **event}, ns
+        )
+
+    async def _append_event(self, run_id: str, kind: str, payload: Dict[str, Any], ns: str) -> None:
+        sc = self.sessions.c
+
+        async def _append():
+            async with self._tx() as conn:
+                # bumping the per-run counter also serializes appends to the run
+                result = await conn.execute(
+                    update(self.sessions)
+                    .where((sc.ns == ns) & (sc.run_id == run_id))
+                    .values(event_seq=sc.event_seq + 1)
+                )
+                if result.rowcount == 0:
+                    raise ValueError(f"Run {run_id} not found")
+                seq = (await conn.execute(
+                    select(sc.event_seq).where((sc.ns == ns) & (sc.run_id == run_id))
+                )).scalar_one()
+                await conn.execute(
+                    insert(self.session_events).values(
+                        ns=ns, run_id=run_id, seq=seq, kind=kind, ts=datetime.utcnow(), payload=payload,
                     )
+                )
+
+        await self._retryable(_append)
 
-                conn.execute(
-                    insert(self.checkpoints).values(
-                        id=checkpoint_id,
-                        ns=ns,
-                        run_id=run_id,
-                        version=version,
-                        ts=ts,
-                        state=state_json,
-                        metadata=metadata,
+    async def delete_state(self, run_id: str, *, ns: str = "sessions") -> bool:
+        """Delete the run with its checkpoints, log entries, pending events and lease."""
+        async def _delete():
+            async with self._tx() as conn:
+                deleted = False
+                for table in (self.sessions, self.checkpoints, self.session_logs, self.session_events,
+                              self.run_leases):
+                    result = await conn.execute(
+                        table.delete().where((table.c.ns == ns) & (table.c.run_id == run_id))
                     )
+                    deleted = deleted or (table is self.sessions and result.rowcount > 0)
+                return deleted
+
+        return await self._retryable(_delete)
+
+    # ---- Listing ------------------------------------------------------------
+
+    async def list_sessions(self, *, ns: str = "sessions", status: Optional[str] = None,
+                            owner_agent_id: Optional[str] = None, updated_since: Optional[datetime] = None,
+                            cursor: Optional[str] = None, limit: int = 50) -> SessionPage:
+        """
+        Page through sessions, most recently updated first, using only the
+        indexed columns (state documents are never read). Pagination is keyset
+        based on (updated_at, run_id): pass the returned `next_cursor` to get
+        the following page; it is None on the last page.
+        """
+        query = self._list_query(ns=ns, status=status, owner_agent_id=owner_agent_id,
+                                 updated_since=updated_since, cursor=cursor, limit=limit)
+        return await self._list_page(query, limit)
+
+    def _list_query(self, *, ns: str, status: Optional[str], owner_agent_id: Optional[str],
+                    updated_since: Optional[datetime], cursor: Optional[str], limit: int):
+        if limit < 1:
+            raise ValueError("limit must be >= 1")
+        sc = self.sessions.c
+        query = (
+            select(sc.run_id, sc.status, sc.owner_agent_id, sc.turn_index, sc.version, sc.updated_at)
+            .where(sc.ns == ns)
+            .order_by(sc.updated_at.desc(), sc.run_id.desc())
+            .limit(limit + 1)
+        )
+        if status is not None:
+            query = query.where(sc.status == status)
+        if owner_agent_id is not None:
+            query = query.where(sc.owner_agent_id == owner_agent_id)
+        if updated_since is not None:
+            query = query.where(sc.updated_at >= naive_utc(updated_since))
+        if cursor is not None:
+            after_ts, after_run = decode_list_cursor(cursor)
+            query = query.where(
+                (sc.updated_at < after_ts) | ((sc.updated_at == after_ts) & (sc.run_id < after_run))
+            )
+        return query
+
+    async def _list_page(self, query, limit: int) -> SessionPage:
+        async with self._snapshot() as conn:
+            rows = (await conn.execute(query)).fetchall()
+
+        items = [
+            SessionSummary(
+                run_id=row.run_id,
+                status=row.status,
+                owner_agent_id=row.owner_agent_id,
+                turn_index=row.turn_index or 0,
+                version=row.version,
+                updated_at=row.updated_at,
+            )
+            for row in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_list_cursor(items[-1].updated_at, items[-1].run_id)
+        return SessionPage(items=items, next_cursor=next_cursor)
+
+    # ---- History / restore ------------------------------------------------
+
+    async def _checkpoint_rows(self, conn, run_id: str, ns: str, from_seq: int, to_seq: Optional[int] = None):
+        """
+        Rows needed to rebuild checkpoints in [from_seq, to_seq]: everything
+        from the closest base snapshot at or before `from_seq`, in seq order.
+        """
+        cp = self.checkpoints.c
+        scope = (cp.ns == ns) & (cp.run_id == run_id)
+        base_seq = (await conn.execute(
+            select(func.max(cp.seq))
+            .where(scope & (cp.kind == CheckpointKind.BASE) & (cp.seq <= from_seq))
+        )).scalar()
+        if base_seq is None:
+            return []
+
+        query = (
+            select(cp.id, cp.seq, cp.kind, cp.version, cp.ts, cp.state, cp.metadata)
+            .where(scope & (cp.seq >= base_seq))
+            .order_by(cp.seq.asc())
+        )
+        if to_seq is not None:
+            query = query.where(cp.seq <= to_seq)
+        return (await conn.execute(query)).fetchall()
+
+    @staticmethod
+    def _replay(rows):
+        """Yield (row, materialized state) for rows starting at a base snapshot."""
+        state = None
+        for row in rows:
+            if row.kind == CheckpointKind.DELTA:
+                state = apply_diff(state, row.state)
+            else:
+                state = row.state
+            yield row, state
+
+    async def get_history(self, run_id: str, *, ns: str = "sessions", limit: Optional[int] = 50,
+                          before_seq: Optional[int] = None, fields: Optional[Sequence[str]] = None,
+                          page_size: int = 50) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Lazily yield checkpoints newest first (at most `limit`, None for all),
+        optionally only those with seq < `before_seq` (pass the last seen seq
+        to page on).
+        `fields` projects the state of each entry:
+          - None: the full state document rebuilt from the nearest base
+            snapshot (log fields appear as lengths under "$logs")
+          - empty: no state at all; rows stream from a server-side cursor and
+            state blobs are never read
+          - dotted paths ("status", "jobs.<id>.status"): {path: value}, None
+            for missing paths
+        States are rebuilt `page_size` checkpoints at a time, so memory stays
+        bounded by one page (plus the deltas back to its base snapshot).
+        Rebuilt states share unchanged sub-trees, so treat them as read-only.
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be >= 1")
+        await self._ensure_ready()
+        cp = self.checkpoints.c
+        scope = (cp.ns == ns) & (cp.run_id == run_id)
+
+        if fields is not None and not fields:
+            query = (
+                select(cp.id, cp.seq, cp.version, cp.ts, cp.metadata)
+                .where(scope if before_seq is None else scope & (cp.seq < before_seq))
+                .order_by(cp.seq.desc())
+                .execution_options(yield_per=page_size)
+            )
+            if limit is not None:
+                query = query.limit(limit)
+            async with self._snapshot() as conn:
+                async for row in await conn.stream(query):
+                    yield self._history_entry(row)
+            return
+
+        remaining = limit
+        upper = before_seq
+        while remaining is None or remaining > 0:
+            n = page_size if remaining is None else min(page_size, remaining)
+            async with self._snapshot() as conn:
+                seqs = (await conn.execute(
+                    select(cp.seq)
+                    .where(scope if upper is None else scope & (cp.seq < upper))
+                    .order_by(cp.seq.desc())
+                    .limit(n)
+                )).scalars().all()
+                if not seqs:
+                    return
+                rows = await self._checkpoint_rows(conn, run_id, ns, from_seq=seqs[-1], to_seq=seqs[0])
+
+            page = [
+                self._history_entry(row, state if fields is None else state_codec.project(state, fields))
+                for row, state in self._replay(rows)
+                if row.seq >= seqs[-1]
+            ]
+            for entry in reversed(page):
+                yield entry
+            if len(seqs) < n:
+                return
+            if remaining is not None:
+                remaining -= len(seqs)
+            upper = seqs[-1]
+
+    @staticmethod
+    def _history_entry(row, state: Any = _NO_STATE) -> Dict[str, Any]:
+        entry = {
+            "id": row.id,
+            "seq": row.seq,
+            "version": row.version,
+            "ts": row.ts,
+            "metadata": row.metadata,
+        }
+        if state is not _NO_STATE:
+            entry["state"] = state
+        return entry
+
+    async def get_checkpoint(self, run_id: str, seq: int, *, ns: str = "sessions") -> Optional[SessionState]:
+        """Rebuild the state as it was at checkpoint `seq`, or None if unknown."""
+        await self._ensure_ready()
+        async with self._snapshot() as conn:
+            rows = await self._checkpoint_rows(conn, run_id, ns, from_seq=seq, to_seq=seq)
+        if not rows or rows[-1].seq != seq:
+            return None
+        *_, (row, state) = self._replay(rows)
+        # Round-trip through the codec so the result shares nothing with the replay
+        return self._state_from_doc(state_codec.loads(state_codec.dumps(state)), row.version)
+
+    async def restore(self, run_id: str, seq: int, *, ns: str = "sessions") -> Optional[SessionState]:
+        """
+        Make checkpoint `seq` the current state again. The restore is itself
+        recorded as a new checkpoint, so history stays append-only; the log
+        fields are truncated back to their length at `seq`.
+        """
+        state = await self.get_checkpoint(run_id, seq, ns=ns)
+        if state is not None:
+            await self.store_state(run_id, state, ns=ns, force=True)
+        return state
+
+    async def migrate_state_encoding(self, *, batch_size: int = 500) -> int:
+        """
+        Rewrite rows whose state is legacy JSON or framed with another codec
+        using this store's codec. Safe to run online: session rows are only
+        rewritten if their version did not move in the meantime.
+        Returns the number of rewritten rows.
+        """
+        await self._ensure_ready()
+        codec_id = compression.get_codec(self.compression).codec_id
+        # bypass StateBlob processing to look at the stored bytes
+        raw_state = lambda table: type_coerce(table.c.state, LargeBinary).label("raw")
+
+        def stale(raw) -> bool:
+            return isinstance(raw, str) or not compression.is_compressed(raw) or raw[1] != codec_id
+
+        rewritten = 0
+        sc, cp = self.sessions.c, self.checkpoints.c
+        last = None
+        while True:
+            async with self.engine.connect() as conn:
+                query = (select(sc.ns, sc.run_id, sc.version, raw_state(self.sessions))
+                         .order_by(sc.ns, sc.run_id).limit(batch_size))
+                if last is not None:
+                    query = query.where(tuple_(sc.ns, sc.run_id) > tuple_(*last))
+                rows = (await conn.execute(query)).fetchall()
+            if not rows:
+                break
+            last = (rows[-1].ns, rows[-1].run_id)
+            todo = [r for r in rows if stale(r.raw)]
+
+            async def _rewrite_sessions():
+                async with self._tx() as conn:
+                    for r in todo:
+                        await conn.execute(
+                            update(self.sessions)
+                            .where((sc.ns == r.ns) & (sc.run_id == r.run_id) & (sc.version == r.version))
+                            # re-encoded: the old member offsets may not match
+                            .values(state=self._decode_raw(r.raw), field_index=None)
+                        )
+
+            await self._retryable(_rewrite_sessions)
+            rewritten += len(todo)
+
+        last = None
+        while True:
+            async with self.engine.connect() as conn:
+                query = select(cp.id, raw_state(self.checkpoints)).order_by(cp.id).limit(batch_size)
+                if last is not None:
+                    query = query.where(cp.id > last)
+                rows = (await conn.execute(query)).fetchall()
+            if not rows:
+                break
+            last = rows[-1].id
+            todo = [r for r in rows if stale(r.raw)]
+
+            async def _rewrite_checkpoints():
+                async with self._tx() as conn:
+                    for r in todo:
+                        await conn.execute(
+                            update(self.checkpoints).where(cp.id == r.id).values(state=self._decode_raw(r.raw))
+                        )
+
+            await self._retryable(_rewrite_checkpoints)
+            rewritten += len(todo)
+        return rewritten
+
+    @staticmethod
+    def _decode_raw(raw) -> Any:
+        if isinstance(raw, dict):  # native JSON column
+            return raw
+        if isinstance(raw, str):
+            return state_codec.loads(raw)
+        return state_codec.loads(compression.decompress(raw))
+
+    # ---- Run leases -----------------------------------------------------
+
+    async def acquire_lease(self, run_id: str, owner: str, ttl_seconds: float, *, ns: str = "sessions") -> bool:
+        """
+        Take (or renew) the lease on a run for `ttl_seconds`. Succeeds if the
+        run is unleased, the current lease expired, or `owner` already holds it.
+        """
+        lc = self.run_leases.c
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl_seconds)
+
+        async def _acquire():
+            async with self._tx() as conn:
+                result = await conn.execute(
+                    update(self.run_leases)
+                    .where((lc.ns == ns) & (lc.run_id == run_id) & ((lc.owner == owner) | (lc.expires_at < now)))
+                    .values(owner=owner, expires_at=expires_at)
+                )
+                if result.rowcount:
+                    return True
+                result = await conn.execute(
+                    self._insert_if_absent(self.run_leases)
+                    .values(ns=ns, run_id=run_id, owner=owner, expires_at=expires_at)
                 )
+                return result.rowcount == 1
 
-        self._retryable(_write)
-
-    # Optional: fetch specific checkpoint or history
-    def get_history(self, run_id: str, *, ns: str = "sessions", limit: int = 50):
-        with self.engine.connect() as conn:
-            rows = conn.execute(
-                select(
-                    self.checkpoints.c.id,
-                    self.checkpoints.c.version,
-                    self.checkpoints.c.ts,
-                    self.checkpoints.c.state,
-                    self.checkpoints.c.metadata,
+        try:
+            return await self._retryable(_acquire)
+        except IntegrityError:
+            return False
+
+    async def release_lease(self, run_id: str, owner: str, *, ns: str = "sessions") -> None:
+        lc = self.run_leases.c
+
+        async def _release():
+            async with self._tx() as conn:
+                await conn.execute(
+                    self.run_leases.delete()
+                    .where((lc.ns == ns) & (lc.run_id == run_id) & (lc.owner == owner))
                 )
-                .where((self.checkpoints.c.ns == ns) & (self.checkpoints.c.run_id == run_id))
-                .order_by(self.checkpoints.c.version.desc())
-                .limit(limit)
-            ).fetchall()
-            return [dict(r._mapping) for r in rows]
+
+        await self._retryable(_release)
+
+    async def dispose(self) -> None:
+        """Close pooled connections (call on application shutdown)."""
+        if self.read_engine is not self.engine:
+            await self.read_engine.dispose()
+        await self.engine.dispose()
@@ -0,0 +1,72 @@
+"""
+Named SQLite pragma profiles for SqlStateStore.
+
+Every profile runs in WAL mode; they differ in how often SQLite fsyncs and
+how much memory it may use. Pragmas are applied on every pooled connection
+(an engine "connect" event), since all of them except journal_mode are
+per-connection settings.
+
+  durable     synchronous=FULL: the WAL is fsynced on every commit, so a
+              committed turn survives a process crash, an OS crash and a
+              power loss. Slowest commits; the default.
+  balanced    synchronous=NORMAL: the WAL is only fsynced at checkpoints.
+              Survives process crashes; an OS crash or power loss can roll
+              back the last commits but never corrupts the database. Larger
+              page cache and memory-mapped reads.
+  throughput  synchronous=OFF: no fsync at all. Survives process crashes
+              only; an OS crash or power loss can lose recent commits and
+              may corrupt the database. For disposable / rebuildable data
+              (benchmarks, test fixtures, caches).
+"""
+from dataclasses import dataclass
+from typing import Dict
+
+
+@dataclass(frozen=True)
+class SqliteProfile:
+    name: str
+    synchronous: str            # FULL / NORMAL / OFF
+    cache_size_kib: int         # page cache per connection
+    mmap_size: int              # bytes of the file read through mmap (0 = off)
+    temp_store: str             # DEFAULT / FILE / MEMORY
+    busy_timeout_ms: int        # wait for locks before SQLITE_BUSY
+    wal_autocheckpoint: int     # WAL pages between automatic checkpoints
+
+
+PROFILES: Dict[str, SqliteProfile] = {
+    profile.name: profile
+    for profile in (
+        SqliteProfile("durable", synchronous="FULL", cache_size_kib=16 * 1024, mmap_size=0,
+                      temp_store="DEFAULT", busy_timeout_ms=5000, wal_autocheckpoint=1000),
+        SqliteProfile("balanced", synchronous="NORMAL", cache_size_kib=64 * 1024, mmap_size=256 * 1024 ** 2,
+                      temp_store="MEMORY", busy_timeout_ms=5000, wal_autocheckpoint=1000),
+        SqliteProfile("throughput", synchronous="OFF", cache_size_kib=128 * 1024, mmap_size=1024 ** 3,
+                      temp_store="MEMORY", busy_timeout_ms=10000, wal_autocheckpoint=10000),
+    )
+}
+
+DEFAULT_PROFILE = "durable"
+
+
+def get_profile(name: str) -> SqliteProfile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown SQLite profile {name!r}, expected one of {sorted(PROFILES)}")
+
+
+def apply_profile(dbapi_connection, profile: SqliteProfile, *, read_only: bool = False) -> None:
+    """Set the profile's pragmas on a new DBAPI connection (read-only ones skip journal_mode)."""
+    cursor = dbapi_connection.cursor()
+    if not read_only:
+        cursor.execute("PRAGMA journal_mode=WAL;")
+    cursor.execute(f"PRAGMA synchronous={profile.synchronous};")
+    cursor.execute(f"PRAGMA cache_size=-{profile.cache_size_kib};")
+    cursor.execute(f"PRAGMA mmap_size={profile.mmap_size};")
+    cursor.execute(f"PRAGMA temp_store={profile.temp_store};")
+    cursor.execute(f"PRAGMA busy_timeout={profile.busy_timeout_ms};")
+    cursor.execute(f"PRAGMA wal_autocheckpoint={profile.wal_autocheckpoint};")
+    cursor.execute("PRAGMA foreign_keys=ON;")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON;")
+    cursor.close()
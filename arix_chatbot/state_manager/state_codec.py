@@ -0,0 +1,124 @@
+"""
+Single-pass codec for SessionState.
+
+`encode_state` turns a SessionState into its stored bytes in one encoder pass
+(no intermediate json.loads(json.dumps(...)) copy); `decode_state` is the
+inverse. orjson / msgpack are used when installed, the stdlib json otherwise.
+"""
+from __future__ import annotations
+import dataclasses
+import json
+from datetime import datetime, date
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+from arix_chatbot.jobs.job import Job
+from arix_chatbot.state_manager.state_store import SessionState, SESSION_STATE_FIELDS
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional fast path
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional fast path
+    msgpack = None
+
+
+class StateFormat:
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for values the encoder does not know natively."""
+    if isinstance(obj, Job):
+        return obj.to_dict()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)}
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+if orjson is not None:
+    # Dataclasses are passed through so Job.to_dict keeps its 'job_type' tag
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTS)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+def project(doc: Dict[str, Any], paths: Sequence[str]) -> Dict[str, Any]:
+    """Pick dotted `paths` ("status", "jobs.<id>.status") out of a state document; None if missing."""
+    projected = {}
+    for path in paths:
+        value = doc
+        for key in path.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+            if value is None:
+                break
+        projected[path] = value
+    return projected
+
+
+def dumps_str(obj: Any) -> str:
+    """Text form of `dumps`, e.g. as a SQLAlchemy `json_serializer`."""
+    return dumps(obj).decode("utf-8")
+
+
+def join_object(encoded_fields: Dict[str, bytes]) -> bytes:
+    """JSON object from already-encoded member values (they are not re-encoded)."""
+    return b"{" + b",".join(dumps(name) + b":" + data for name, data in encoded_fields.items()) + b"}"
+
+
+def join_indexed(encoded_fields: Dict[str, bytes]) -> Tuple[bytes, List[int]]:
+    """`join_object`, plus the offset of every member in it (see lazy_state.LazyDocument)."""
+    members, offsets, pos = [], [], 1
+    for name, data in encoded_fields.items():
+        member = dumps(name) + b":" + data
+        offsets.append(pos)
+        members.append(member)
+        pos += len(member) + 1
+    return b"{" + b",".join(members) + b"}", offsets
+
+
+def state_fields(state: SessionState) -> Dict[str, Any]:
+    """Shallow field dict of `state` (values are not copied)."""
+    return {name: getattr(state, name) for name in SESSION_STATE_FIELDS}
+
+
+def encode_state(state: SessionState, fmt: str = StateFormat.JSON) -> bytes:
+    fields = state_fields(state)
+    if fmt == StateFormat.JSON:
+        return dumps(fields)
+    if fmt == StateFormat.MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+        return msgpack.packb(fields, default=_default, use_bin_type=True)
+    raise ValueError(f"Unknown state format {fmt!r}")
+
+
+def decode_state_dict(data: Union[bytes, str], fmt: str = StateFormat.JSON) -> Dict[str, Any]:
+    if fmt == StateFormat.JSON:
+        return loads(data)
+    if fmt == StateFormat.MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    raise ValueError(f"Unknown state format {fmt!r}")
+
+
+def decode_state(data: Union[bytes, str], fmt: str = StateFormat.JSON) -> SessionState:
+    return SessionState.fromdict(decode_state_dict(data, fmt))
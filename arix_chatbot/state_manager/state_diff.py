@@ -0,0 +1,80 @@
+"""
+Structural diffs between two JSON-like documents (dicts / lists / primitives).
+
+A delta is a dict of operations:
+  - {"$set": {key: value}}   keys added or replaced
+  - {"$del": [key, ...]}     keys removed
+  - {"$sub": {key: delta}}   nested delta applied to an existing key
+  - {"$ext": [item, ...]}    items appended to a list (append-only growth)
+
+Anything that cannot be expressed as one of the above (type change, list
+rewrite) is emitted as a "$set" of the new value on the parent key.
+"""
+from typing import Any, Dict, Optional
+
+
+def diff(old: Any, new: Any) -> Optional[Dict[str, Any]]:
+    """
+    Return the delta turning `old` into `new`, {} when they are equal,
+    or None when `new` can only be expressed as a full replacement.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        return _diff_dict(old, new)
+    if isinstance(old, list) and isinstance(new, list):
+        return _diff_list(old, new)
+    return {} if old == new else None
+
+
+def _diff_dict(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    to_set, to_sub = {}, {}
+    for key, value in new.items():
+        if key not in old:
+            to_set[key] = value
+            continue
+        if old[key] == value:
+            continue
+        sub = diff(old[key], value)
+        if sub is None:
+            to_set[key] = value
+        else:
+            to_sub[key] = sub
+    to_del = [key for key in old if key not in new]
+
+    delta: Dict[str, Any] = {}
+    if to_set:
+        delta["$set"] = to_set
+    if to_del:
+        delta["$del"] = to_del
+    if to_sub:
+        delta["$sub"] = to_sub
+    return delta
+
+
+def _diff_list(old: list, new: list) -> Optional[Dict[str, Any]]:
+    if old == new:
+        return {}
+    n = len(old)
+    if len(new) > n and new[:n] == old:
+        return {"$ext": new[n:]}
+    return None
+
+
+def apply_diff(base: Any, delta: Dict[str, Any]) -> Any:
+    """
+    Apply `delta` to `base` copy-on-write: containers along changed paths are
+    copied, untouched sub-trees are shared with `base`.
+    """
+    if not delta:
+        return base
+
+    if "$ext" in delta:
+        return list(base) + list(delta["$ext"])
+
+    out = dict(base)
+    for key in delta.get("$del", ()):
+        out.pop(key, None)
+    for key, value in delta.get("$set", {}).items():
+        out[key] = value
+    for key, sub in delta.get("$sub", {}).items():
+        out[key] = apply_diff(out[key], sub)
+    return out
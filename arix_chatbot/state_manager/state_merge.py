@@ -0,0 +1,127 @@
+"""
+Isolated SessionState views and field-level merging of their changes.
+
+Agents that may run concurrently each get an `isolated_view` of the state:
+a copy whose fields they can change freely. The append-only logs
+(chat_full_history, timeline) are shared with the state rather than copied,
+so views must only read them.
+
+A FieldMerge then folds the views' changes back, top-level field by field,
+against the encoding of the fields when the views were taken:
+
+- a field changed by one view takes that view's value;
+- views that changed a field to the same value agree;
+- lists that views only appended to (e.g. response_requests) get every
+  view's appended entries, in the order the views are folded;
+- dicts (job_status, agents_inbox, ...) merge key by key, by the same rules
+  for the keys' values (one level deep);
+- any other field changed differently by two views is a conflict
+  (MergeConflictError): nothing of that view is folded.
+"""
+from __future__ import annotations
+import copy
+from typing import Any, Dict, List
+
+from arix_chatbot.state_manager.append_log import LOG_FIELDS
+from arix_chatbot.state_manager.state_store import SessionState, SESSION_STATE_FIELDS
+from arix_chatbot.state_manager import state_codec
+
+
+# Fields a view's changes are merged for (the logs are shared, versions belong to the store)
+MERGED_FIELDS = tuple(name for name in SESSION_STATE_FIELDS if name not in LOG_FIELDS + ("version", "event_seq"))
+
+
+class MergeConflictError(RuntimeError):
+    def __init__(self, fields: List[str]):
+        super().__init__(f"Conflicting changes to {', '.join(fields)}")
+        self.fields = fields
+
+
+def isolated_view(state: SessionState) -> SessionState:
+    """Copy of `state` whose fields can be changed without affecting it (the logs are shared)."""
+    return SessionState(**{
+        name: getattr(state, name) if name in LOG_FIELDS else copy.deepcopy(getattr(state, name))
+        for name in SESSION_STATE_FIELDS
+    })
+
+
+def encode_fields(state: SessionState) -> Dict[str, bytes]:
+    return {name: state_codec.dumps(getattr(state, name)) for name in MERGED_FIELDS}
+
+
+class FieldMerge:
+    """Folds the changes of views taken from one state (see module docstring)."""
+
+    def __init__(self, state: SessionState):
+        self.base_encoded = encode_fields(state)
+        self.base = {name: getattr(state, name) for name in MERGED_FIELDS}
+        # field -> (value, encoding) after the views folded so far
+        self.merged: Dict[str, Any] = {}
+        self.merged_encoded: Dict[str, bytes] = {}
+
+    def changes(self, view: SessionState) -> Dict[str, bytes]:
+        """Encoding of every field `view` changed."""
+        changed = {}
+        for name in MERGED_FIELDS:
+            encoded = state_codec.dumps(getattr(view, name))
+            if encoded != self.base_encoded[name]:
+                changed[name] = encoded
+        return changed
+
+    def fold(self, view: SessionState) -> Dict[str, Any]:
+        """
+        Fold the changes of `view` in and return the values to assign to the
+        state for them. Raises MergeConflictError (folding nothing) when a view
+        folded earlier changed one of the same fields differently.
+        """
+        folded, conflicts = {}, []
+        for name, encoded in self.changes(view).items():
+            value = getattr(view, name)
+            if name not in self.merged:
+                folded[name] = (value, encoded)
+            elif self.merged_encoded[name] == encoded:
+                continue
+            else:
+                combined = self._combine(self.base[name], self.merged[name], value)
+                if combined is None:
+                    conflicts.append(name)
+                else:
+                    folded[name] = (combined, state_codec.dumps(combined))
+        if conflicts:
+            raise MergeConflictError(conflicts)
+        for name, (value, encoded) in folded.items():
+            self.merged[name] = value
+            self.merged_encoded[name] = encoded
+        return {name: value for name, (value, _) in folded.items()}
+
+    @staticmethod
+    def _append(base: Any, merged: Any, value: Any) -> Any:
+        """Merged list if both `merged` and `value` only appended to the `base` list, else None."""
+        if not (isinstance(base, list) and isinstance(merged, list) and isinstance(value, list)):
+            return None
+        if value[:len(base)] != base or merged[:len(base)] != base:
+            return None
+        return list(merged) + list(value[len(base):])
+
+    @classmethod
+    def _combine(cls, base: Any, merged: Any, value: Any) -> Any:
+        """`merged` and `value` (both changed from `base`) combined, or None if they conflict."""
+        if not (isinstance(base, dict) and isinstance(merged, dict) and isinstance(value, dict)):
+            return cls._append(base, merged, value)
+        combined = dict(merged)
+        for key in base.keys() | value.keys():
+            base_encoded, merged_encoded, encoded = (state_codec.dumps(d[key]) if key in d else None
+                                                     for d in (base, merged, value))
+            if encoded == base_encoded:
+                continue
+            if merged_encoded == base_encoded or merged_encoded == encoded:
+                if key in value:
+                    combined[key] = value[key]
+                else:
+                    combined.pop(key, None)
+                continue
+            appended = cls._append(base.get(key, []), merged.get(key), value.get(key))
+            if appended is None:
+                return None
+            combined[key] = appended
+        return combined
@@ -1,7 +1,11 @@
-from typing import Optional, Dict, Any, List, Protocol
-from dataclasses import dataclass, asdict, field
+from typing import Optional, Dict, Any, List, Protocol, Tuple
+from dataclasses import dataclass, asdict, field, fields
+from datetime import datetime, timezone
+import base64
+import copy
+import json
 from arix_chatbot.jobs.job import Job
-from arix_chatbot.jobs import JOB_REGISTRY
+from arix_chatbot.state_manager.job_index import JobIndex
 
 
 class MessageType:
@@ -18,6 +22,21 @@ def compose_message(msg_type: MessageType, content: Any) -> Dict[str, Any]:
     }
 
 
+class StateConflictError(RuntimeError):
+    """
+    Raised by a store when a write was based on a stale version of the state
+    (another writer committed first). Reload the state and retry the turn.
+    """
+    def __init__(self, run_id: str, expected_version: int, actual_version: Optional[int]):
+        self.run_id = run_id
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+        super().__init__(
+            f"Conflicting write for run {run_id}: expected version {expected_version}, "
+            f"store has {actual_version}"
+        )
+
+
 class SessionStatus:
     HANDOFF = "HANDOFF"
     WAIT_HUMAN = "WAIT_HUMAN"
@@ -45,12 +64,17 @@ class SessionState:
     run_id: str
     owner_agent_id: str
     status: str = SessionStatus.HANDOFF
+    version: int = 0  # store write version this state was read at (0 = never stored)
+    event_seq: int = 0  # last store event (append_inbox / append_timeline) folded into this state
     pending_handoff: List[str] = field(default_factory=list)
+    # agents of pending_handoff (and the owner) a navigator declared independent of each other;
+    # a scheduler that supports it (hop_scheduler.FanOutHopScheduler) runs them concurrently
+    fan_out: List[str] = field(default_factory=list)
 
     # JOBS INFO
     job_status: Dict[str, str] = field(default_factory=dict)
     job_types: Dict[str, str] = field(default_factory=dict)
-    jobs: Dict[str, Dict] = field(default_factory=dict)
+    jobs: Dict[str, Any] = field(default_factory=dict)  # Job objects, or their dicts as stored
 
     # CHAT HISTORY
     turn_index: int = 0
@@ -92,47 +116,61 @@ class SessionState:
     artifacts: Dict[str, Any] = field(default_factory=dict)
     error: Optional[str] = None
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        # opt-in change tracking (see change_tracking.track_changes)
+        tracker = self.__dict__.get("_changes")
+        if tracker is not None:
+            value = tracker.assign(name, value)
+        object.__setattr__(self, name, value)
+
     def report_action(self, action: Action) -> None:
         self.chat_action_stack.append(action.todict())
 
+    def job_index(self) -> JobIndex:
+        """Index of the job fields, (re)built when one of them was replaced."""
+        index = self.__dict__.get("_job_index")
+        if index is None or not index.covers(self.jobs, self.job_status, self.job_types):
+            index = JobIndex(self.jobs, self.job_status, self.job_types)
+            self.__dict__["_job_index"] = index
+        return index
+
     def add_job(self, job: Job) -> None:
+        """
+        Add (or replace) a job. A copy of the Job is kept in `jobs` and only
+        converted to a dict when the state is encoded; get_job / get_open_jobs
+        hand out copies too, so a job only changes through add_job (or
+        update_job / set_job_status), which keeps job_status and the index in
+        sync with it.
+        """
+        index = self.job_index()
         job_id = str(job.job_id)
         job_status = job.status
+        job = copy.copy(job)
         self.job_types[job_id] = job.job_type
-        self.jobs[job_id] = job.to_dict()
+        self.jobs[job_id] = job
         self.job_status[job_id] = job_status
+        index.put(job_id, job, job_status)
 
     def get_job(self, job_id: str) -> Any:
-        if job_id not in self.jobs:
+        job = self.job_index().get(str(job_id))
+        if job is None or job.turn_index != self.turn_index:
             return None
-
-        cls = JOB_REGISTRY.get(self.job_types.get(str(job_id)))
-        job = cls.from_dict(self.jobs.get(job_id)) if job_id in self.jobs else None
-        if job.turn_index != self.turn_index:
-            return None
-        return job
+        return copy.copy(job)
 
     def clear_old_jobs(self) -> None:
-        current_index = self.turn_index
-        jobs_to_remove = []
-        for job_id, job_data in self.jobs.items():
-            job_turn_index = job_data.get('turn_index', -1)
-            if job_turn_index != current_index:
-                jobs_to_remove.append(job_id)
-        for job_id in jobs_to_remove:
+        index = self.job_index()
+        for job_id in index.not_in_turn(self.turn_index):
             del self.jobs[job_id]
             del self.job_status[job_id]
+            index.discard(job_id)
 
-    def get_open_jobs(self) -> List[Job]:
+    def get_open_jobs(self, *, worker_id: str = None, report_to: str = None) -> List[Job]:
+        """Jobs of the current turn not completed / in error, optionally of one worker or manager."""
         self.clear_old_jobs()
-
-        open_jobs = []
-        for job_id, status in self.job_status.items():
-            if status not in [SessionStatus.COMPLETED, SessionStatus.ERROR]:
-                job = self.get_job(job_id)
-                if job:
-                    open_jobs.append(job)
-        return open_jobs
+        index = self.job_index()
+        job_ids = index.select(worker_id=worker_id, report_to=report_to,
+                               exclude_status=(SessionStatus.COMPLETED, SessionStatus.ERROR))
+        return [copy.copy(index.get(job_id)) for job_id in job_ids]
 
     def set_job_status(self, job_id: str, status: str) -> None:
         job = self.get_job(job_id)
@@ -154,26 +192,126 @@ class SessionState:
     def get_status(self) -> str:
         return self.status
 
+    def receive(self, agent_id: str, sender: str, msg: Dict[str, Any]) -> None:
+        """
+        Deliver `msg`, posted between turns (e.g. a store event of
+        append_inbox), to `agent_id`'s inbox: unlike the messages of a turn,
+        it survives the clear_before_turn of the next one.
+        """
+        self.agents_inbox.setdefault(agent_id, {}).setdefault(sender, []).append(msg)
+        self.__dict__.setdefault("_received", []).append((agent_id, sender, msg))
+
+    def received_stored(self) -> None:
+        """The received messages were stored with the state: nothing is kept from clear_before_turn anymore."""
+        self.__dict__.pop("_received", None)
+
     def clear_before_turn(self) -> None:
+        received = self.__dict__.pop("_received", ())
         self.agents_inbox = {}
         self.agents_context = {}
         self.user_outbox = []
         self.chat_action_stack = []
+        self.fan_out = []
         self.jobs = {}
         self.job_status = {}
         self.job_types = {}
+        for agent_id, sender, msg in received:
+            self.agents_inbox.setdefault(agent_id, {}).setdefault(sender, []).append(msg)
 
     def todict(self) -> Dict[str, Any]:
-        return asdict(self)
+        data = asdict(self)
+        # asdict would drop the job_type of typed jobs
+        data["jobs"] = {job_id: job.to_dict() if isinstance(job, Job) else data["jobs"][job_id]
+                        for job_id, job in self.jobs.items()}
+        return data
 
     @staticmethod
     def fromdict(data: Dict[str, Any]) -> 'SessionState':
-        return SessionState(**data)
+        # Ignore keys written by other versions of the schema
+        return SessionState(**{k: v for k, v in data.items() if k in _SESSION_STATE_FIELD_SET})
+
+
+SESSION_STATE_FIELDS = tuple(f.name for f in fields(SessionState))
+_SESSION_STATE_FIELD_SET = frozenset(SESSION_STATE_FIELDS)
+
+
+@dataclass
+class SessionSummary:
+    """Listing row of a stored session (indexed columns only, no state document)."""
+    run_id: str
+    status: Optional[str]
+    owner_agent_id: Optional[str]
+    turn_index: int
+    version: int
+    updated_at: datetime
+
+    def todict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "status": self.status,
+            "owner_agent_id": self.owner_agent_id,
+            "turn_index": self.turn_index,
+            "version": self.version,
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+@dataclass
+class SessionPage:
+    """One page of `list_sessions`, newest first; pass `next_cursor` back for the next page."""
+    items: List[SessionSummary]
+    next_cursor: Optional[str] = None
+
+    def todict(self) -> Dict[str, Any]:
+        return {
+            "items": [item.todict() for item in self.items],
+            "next_cursor": self.next_cursor,
+        }
+
+
+def naive_utc(ts: datetime) -> datetime:
+    """`ts` as a naive UTC datetime, like the stored updated_at (a naive `ts` is taken as UTC)."""
+    if ts.tzinfo is None:
+        return ts
+    return ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def encode_list_cursor(updated_at: datetime, run_id: str) -> str:
+    """Opaque keyset cursor: the (updated_at, run_id) of the last row of a page."""
+    raw = json.dumps([updated_at.isoformat(), run_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_list_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        updated_at, run_id = json.loads(raw)
+        return datetime.fromisoformat(updated_at), str(run_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid session list cursor: {cursor!r}") from e
+
+
+class EventKind:
+    INBOX = "inbox"          # message appended to an agent's inbox
+    TIMELINE = "timeline"    # entry appended to the timeline
+
+
+def fold_events(state: SessionState, events) -> None:
+    """
+    Apply pending store events (append_inbox / append_timeline, anything
+    with seq, kind and payload), in seq order, on top of a stored state.
+    """
+    for event in events:
+        if event.kind == EventKind.INBOX:
+            state.receive(event.payload["agent_id"], event.payload["sender"], event.payload["msg"])
+        elif event.kind == EventKind.TIMELINE:
+            state.timeline.append(event.payload)
+        state.event_seq = event.seq
 
 
 class StateStore(Protocol):
-    def get_state(self, run_id: str) -> Optional[SessionState]: ...
-    def store_state(self, run_id: str, state: SessionState) -> None: ...
-    def append_inbox(self, run_id: str, agent_id: str, msg: Dict[str, Any]) -> None: ...
-    def append_timeline(self, run_id: str, event: Dict[str, Any]) -> None: ...
-    def delete_state(self, run_id: str) -> bool: ...
+    async def get_state(self, run_id: str) -> Optional[SessionState]: ...
+    async def store_state(self, run_id: str, state: SessionState, *, force: bool = False) -> None: ...
+    async def append_inbox(self, run_id: str, agent_id: str, msg: Dict[str, Any]) -> None: ...
+    async def append_timeline(self, run_id: str, event: Dict[str, Any]) -> None: ...
+    async def delete_state(self, run_id: str) -> bool: ...
@@ -0,0 +1,115 @@
+"""
+Turn latency of a planned workflow of independent state-editor jobs:
+sequential hops vs fanned out (MainChatOrchestrator(parallel_editors=True)
+with FanOutHopScheduler).
+
+The orchestrator is the real one; the editors are stand-ins whose LLM call is
+a blocking sleep of `--latency` seconds run in a thread, like
+edit_section_query. Each writes its own section and appends a response
+request. Both modes must end the turn with the same state.
+
+The threads come from the event loop's default executor (min(32, cpus + 4)
+workers), which bounds how many LLM calls overlap.
+
+Usage: python -m benchmarks.bench_fan_out --editors 7 --latency 0.2
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Tuple
+
+from arix_chatbot.agents.agent_ids import AgentID as aid
+from arix_chatbot.agents.base.worker import Worker, WorkerStatus
+from arix_chatbot.agents.main_chat_orchestrator.main_agent import MainChatOrchestrator
+from arix_chatbot.agents.utils.checklist import Checklist
+from arix_chatbot.app.agent_registry import AgentRegistry
+from arix_chatbot.app.hop_scheduler import HopScheduler, FanOutHopScheduler
+from arix_chatbot.jobs.job import JobStatus
+from arix_chatbot.jobs.user_interactions import PlanWorkflowJob
+from arix_chatbot.state_manager.state_store import SessionState, SessionStatus
+from benchmarks.synthetic import text
+
+
+class SleepingEditor(Worker):
+    def __init__(self, agent_id: str, work_name: str, section: str, latency: float):
+        super().__init__(aid.MAIN)
+        self.agent_id = agent_id
+        self.work_name = work_name
+        self.section = section
+        self.latency = latency
+
+    async def process_task(self, state: SessionState) -> Tuple[SessionState, WorkerStatus]:
+        job = self.get_last_pending_job(state)
+        await asyncio.to_thread(time.sleep, self.latency)
+        setattr(state, self.section, f"{self.section}: {job.content}")
+        state.response_requests.append(f"{self.agent_id} updated {self.section}")
+        return state, WorkerStatus.COMPLETED
+
+
+class NoopWorker(Worker):
+    def __init__(self, agent_id: str):
+        super().__init__(aid.MAIN)
+        self.agent_id = agent_id
+
+    async def process_task(self, state: SessionState) -> Tuple[SessionState, WorkerStatus]:
+        return state, WorkerStatus.COMPLETED
+
+
+def make_registry(parallel: bool, editors, latency: float) -> AgentRegistry:
+    orchestrator = MainChatOrchestrator(managed_agents=[aid.OUTPUT_HANDLER, aid.HISTORY_MANAGER]
+                                        + [components["agent_id"] for _, components in editors],
+                                        parallel_editors=parallel)
+    agents = [orchestrator, NoopWorker(aid.OUTPUT_HANDLER), NoopWorker(aid.HISTORY_MANAGER)]
+    agents += [SleepingEditor(components["agent_id"], work_name, components["writes"][0], latency)
+               for work_name, components in editors]
+    return AgentRegistry(agents)
+
+
+def make_state(editors, seed: int = 0) -> SessionState:
+    """State of a turn whose workflow was just planned: MAIN launches it next."""
+    rng = random.Random(seed)
+    state = SessionState(run_id="bench", owner_agent_id=aid.MAIN, turn_index=1)
+    state.last_user_message = {"type": "chat", "msg": text(rng, 30)}
+    checklist = Checklist(tasks=["plan_workflow", "launch_workflow", "update_history"])
+    checklist.set_done("plan_workflow")
+    state.agents_context[aid.MAIN] = {"flow_planner_job_id": "plan", "checklist": checklist.todict()}
+    state.add_job(PlanWorkflowJob(
+        job_id="plan", report_to=aid.MAIN, worker_id=aid.PLANNER, status=JobStatus.SUCCESS, turn_index=1,
+        workflow=[{"agent_id": work_name, "content": text(rng, 20), "related_context": []}
+                  for work_name, _ in editors],
+    ))
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--editors", type=int, default=7)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    work_mapper = MainChatOrchestrator()._work_mapper
+    editors = [(name, components) for name, components in work_mapper.items() if "writes" in components]
+    editors = editors[:args.editors]
+
+    results = {}
+    print(f"{len(editors)} editors, {args.latency * 1000:.0f} ms per LLM call")
+    print(f"{'mode':<12} {'turn ms':>9} {'hops':>5}")
+    for mode, parallel, scheduler_cls in (("sequential", False, HopScheduler),
+                                          ("fan-out", True, FanOutHopScheduler)):
+        registry = make_registry(parallel, editors, args.latency)
+        scheduler = scheduler_cls(registry)
+        state = make_state(editors)
+        t0 = time.perf_counter()
+        state = asyncio.run(scheduler.run("bench", state, aid.MAIN))
+        turn_ms = (time.perf_counter() - t0) * 1000
+        assert state.status == SessionStatus.WAIT_HUMAN, state.error
+        hops = sum(1 for event in state.timeline if "hop" in event)
+        print(f"{mode:<12} {turn_ms:>9.1f} {hops:>5}")
+        results[mode] = {name: getattr(state, components["writes"][0]) for name, components in editors}
+        results[mode]["response_requests"] = list(state.response_requests)
+    assert results["sequential"] == results["fan-out"]
+
+
+if __name__ == "__main__":
+    main()
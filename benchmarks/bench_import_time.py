@@ -0,0 +1,73 @@
+"""
+Cold-start import time of a module (default: arix_chatbot.app.api).
+
+Each run imports the module in a fresh interpreter under `python -X importtime`
+and parses its report. Prints, as the median over `--repeat` runs:
+- the interpreter's wall time and the module's cumulative import time;
+- the cumulative time of the packages given with `--watch`
+  (default: arix_chatbot.jobs, whose job classes are now resolved lazily);
+- the `--top` modules with the largest self time.
+
+Usage: python -m benchmarks.bench_import_time --repeat 10
+       python -m benchmarks.bench_import_time --module arix_chatbot.app.ai_factory_pipeline
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+
+def import_once(module: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """Wall time (ms) and {module: (self_us, cumulative_us)} of one cold import."""
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        error = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"import {module} failed: {error[-1] if error else proc.returncode}")
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return wall_ms, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="arix_chatbot.app.api")
+    parser.add_argument("--watch", nargs="*", default=["arix_chatbot.jobs"])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    walls: List[float] = []
+    self_us: Dict[str, List[int]] = defaultdict(list)
+    cumulative_us: Dict[str, List[int]] = defaultdict(list)
+    for _ in range(args.repeat):
+        wall_ms, times = import_once(args.module)
+        walls.append(wall_ms)
+        for name, (own, total) in times.items():
+            self_us[name].append(own)
+            cumulative_us[name].append(total)
+
+    def median_ms(samples: Dict[str, List[int]], name: str) -> float:
+        return statistics.median(samples[name]) / 1000 if name in samples else 0.0
+
+    print(f"python -X importtime -c 'import {args.module}'  (median of {args.repeat} runs)")
+    print(f"  interpreter wall         {statistics.median(walls):9.1f} ms")
+    print(f"  {args.module:<24} {median_ms(cumulative_us, args.module):9.1f} ms cumulative")
+    for name in args.watch:
+        print(f"  {name:<24} {median_ms(cumulative_us, name):9.1f} ms cumulative")
+    print(f"top {args.top} by self time:")
+    for name in sorted(self_us, key=lambda n: median_ms(self_us, n), reverse=True)[:args.top]:
+        print(f"  {name:<48} {median_ms(self_us, name):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
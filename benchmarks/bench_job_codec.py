@@ -0,0 +1,92 @@
+"""
+Job encode / decode throughput: compiled per-class codecs vs reflection.
+
+  reflective   previous Job.to_dict / from_dict: walk dataclasses.fields()
+               and rebuild the set of field names on every call
+  compiled     codecs generated when the class is registered
+               (arix_chatbot.jobs.JOB_CODECS), used by Job.to_dict / from_dict
+
+Also prints the size of one job instance (job classes use __slots__).
+
+Usage: python -m benchmarks.bench_job_codec --jobs 10000
+"""
+import argparse
+import random
+import sys
+import time
+from dataclasses import fields
+
+from arix_chatbot.agents.agent_ids import AgentID as aid
+from arix_chatbot.jobs import JOB_REGISTRY
+from arix_chatbot.jobs.job import Job, JobStatus
+from arix_chatbot.jobs.llm_task_editors import TaskEditorJob
+from arix_chatbot.jobs.user_interactions import PlanWorkflowJob
+from benchmarks.synthetic import EDITORS, text
+
+
+def reflective_to_dict(job: Job) -> dict:
+    out = {}
+    for f in fields(job):
+        out[f.name] = getattr(job, f.name)
+    out["job_type"] = job.job_type
+    return out
+
+
+def reflective_from_dict(data: dict) -> Job:
+    cls = JOB_REGISTRY[data["job_type"]]
+    field_names = {f.name for f in fields(cls)}
+    return cls(**{key: value for key, value in data.items() if key in field_names})
+
+
+def make_jobs(n_jobs: int, seed: int = 0):
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(n_jobs):
+        common = dict(job_id=f"job-{i}", report_to=aid.MAIN, status=JobStatus.ASSIGNED_TO_AGENT, turn_index=i // 8)
+        if i % 8 == 0:
+            jobs.append(PlanWorkflowJob(worker_id=aid.PLANNER, user_intention=text(rng, 10),
+                                        workflow=[{"agent_id": rng.choice(EDITORS), "content": text(rng, 20)}],
+                                        **common))
+        else:
+            jobs.append(TaskEditorJob(worker_id=rng.choice(EDITORS), content=text(rng, 30),
+                                      required_context=["task_goal", "input_data_schema"], **common))
+    return jobs
+
+
+def rate(fn, items, repeat: int) -> float:
+    """Best-of-`repeat` items per second."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - t0)
+    return len(items) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    jobs = make_jobs(args.jobs)
+    dicts = [job.to_dict() for job in jobs]
+    assert dicts == [reflective_to_dict(job) for job in jobs]
+    assert [Job.from_dict(d) for d in dicts] == [reflective_from_dict(d) for d in dicts]
+
+    job = jobs[1]
+    size = sys.getsizeof(job) + (sys.getsizeof(job.__dict__) if hasattr(job, "__dict__") else 0)
+    print(f"{type(job).__name__} instance: {size} bytes ({'__dict__' if hasattr(job, '__dict__') else '__slots__'})")
+    print(f"{'op':<8} {'path':<11} {'jobs/s':>12} {'speedup':>8}")
+    for op, paths, items in (("encode", (("reflective", reflective_to_dict), ("compiled", Job.to_dict)), jobs),
+                             ("decode", (("reflective", reflective_from_dict), ("compiled", Job.from_dict)), dicts)):
+        baseline = None
+        for name, fn in paths:
+            per_sec = rate(fn, items, args.repeat)
+            baseline = baseline or per_sec
+            print(f"{op:<8} {name:<11} {per_sec:>12,.0f} {per_sec / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Job bookkeeping cost of one turn: indexed SessionState vs the dict-only path.
+
+A turn with `--jobs` editor jobs is replayed the way the agents drive it:
+the main agent adds the jobs, every editor handoff looks up its last pending
+job (BaseAgent.get_last_pending_job) and marks it done, the main agent reads
+the jobs it manages, and the state's job fields are encoded once at the end.
+
+  dicts     previous path: jobs kept as dicts, every lookup scans all jobs
+            and rebuilds each match with from_dict, every update re-serializes
+  indexed   SessionState.job_index: typed jobs looked up by worker / manager /
+            status, serialized only by the final encode
+
+Usage: python -m benchmarks.bench_job_index --jobs 8 64 256
+"""
+import argparse
+import random
+
+from arix_chatbot.agents.agent_ids import AgentID as aid
+from arix_chatbot.jobs import JOB_REGISTRY
+from arix_chatbot.jobs.job import Job, JobStatus
+from arix_chatbot.state_manager import state_codec
+from arix_chatbot.state_manager.state_store import SessionState, SessionStatus
+from benchmarks.bench_state_codec import timeit
+from benchmarks.synthetic import EDITORS, text
+
+DONE = (JobStatus.SUCCESS, JobStatus.FAILED)
+
+
+# ---- previous dict-only implementation ---------------------------------------
+
+def dict_add_job(state: SessionState, job: Job) -> None:
+    job_id = str(job.job_id)
+    state.job_types[job_id] = job.job_type
+    state.jobs[job_id] = job.to_dict()
+    state.job_status[job_id] = job.status
+
+
+def dict_get_job(state: SessionState, job_id: str):
+    if job_id not in state.jobs:
+        return None
+    job = JOB_REGISTRY.get(state.job_types.get(job_id)).from_dict(state.jobs[job_id])
+    return job if job.turn_index == state.turn_index else None
+
+
+def dict_open_jobs(state: SessionState):
+    stale = [job_id for job_id, data in state.jobs.items() if data.get("turn_index", -1) != state.turn_index]
+    for job_id in stale:
+        del state.jobs[job_id]
+        del state.job_status[job_id]
+    return [job for job_id, status in state.job_status.items()
+            if status not in [SessionStatus.COMPLETED, SessionStatus.ERROR]
+            for job in [dict_get_job(state, job_id)] if job]
+
+
+def dict_set_job_status(state: SessionState, job_id: str, status: str) -> None:
+    job = dict_get_job(state, job_id)
+    if job:
+        job.status = status
+        dict_add_job(state, job)
+
+
+def dict_turn(state: SessionState, jobs) -> bytes:
+    for job in jobs:
+        dict_add_job(state, job)
+    for job in jobs:
+        todo = [j for j in dict_open_jobs(state) if j.worker_id == job.worker_id and j.status not in DONE]
+        dict_set_job_status(state, todo[-1].job_id, JobStatus.SUCCESS)
+    [j for j in dict_open_jobs(state) if j.report_to == aid.MAIN]
+    return state_codec.dumps([state.jobs, state.job_status])
+
+
+# ---- indexed SessionState ----------------------------------------------------
+
+def indexed_turn(state: SessionState, jobs) -> bytes:
+    for job in jobs:
+        state.add_job(job)
+    for job in jobs:
+        todo = [j for j in state.get_open_jobs(worker_id=job.worker_id) if j.status not in DONE]
+        state.set_job_status(todo[-1].job_id, JobStatus.SUCCESS)
+    state.get_open_jobs(report_to=aid.MAIN)
+    return state_codec.dumps([state.jobs, state.job_status])
+
+
+def make_jobs(n_jobs: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [dict(job_id=f"job-{i}", report_to=aid.MAIN, worker_id=EDITORS[i % len(EDITORS)],
+                 status=JobStatus.ASSIGNED_TO_AGENT, turn_index=1, content=text(rng, 30),
+                 required_context=["task_goal", "input_data_schema"]) for i in range(n_jobs)]
+
+
+def run(turn, specs):
+    def once(_):
+        state = SessionState(run_id="bench", owner_agent_id=aid.MAIN, turn_index=1)
+        turn(state, [Job(**spec) for spec in specs])
+    return once
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[8, 64, 256])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'jobs':>6} {'path':<8} {'ms/turn':>9} {'speedup':>8}")
+    for n_jobs in args.jobs:
+        specs = make_jobs(n_jobs)
+        a = dict_turn(SessionState(run_id="bench", owner_agent_id=aid.MAIN, turn_index=1), [Job(**s) for s in specs])
+        b = indexed_turn(SessionState(run_id="bench", owner_agent_id=aid.MAIN, turn_index=1), [Job(**s) for s in specs])
+        assert state_codec.loads(a) == state_codec.loads(b), "paths disagree"
+        baseline = None
+        for name, turn in (("dicts", dict_turn), ("indexed", indexed_turn)):
+            ms = timeit(run(turn, specs), None, args.repeat)
+            baseline = baseline or ms
+            print(f"{n_jobs:>6} {name:<8} {ms:>9.3f} {baseline / ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Per-turn state decode time: eager SessionState vs LazySessionState.
+
+For sessions of `--turns` turns, decodes the stored document the way a
+turn's read does and then reads the fields a typical agent looks at
+(turn_index, last_user_message, input_data_schema):
+
+  inline   document with the histories inline (InMemoryStateStore layout)
+  sql      SqlStateStore sessions row (compressed, histories in log rows)
+
+`eager` decodes the whole document into a SessionState; `lazy` builds a
+LazySessionState and decodes only the fields read; `lazy+write` also
+assigns a field, which materializes the rest (the fallback cost).
+
+Usage: python -m benchmarks.bench_lazy_state --turns 100 200 500
+"""
+import argparse
+
+from arix_chatbot.state_manager import state_codec, compression
+from arix_chatbot.state_manager.lazy_state import LazyDocument, LazySessionState
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+from arix_chatbot.state_manager.state_store import SessionState
+from benchmarks.bench_state_codec import timeit
+from benchmarks.synthetic import make_session
+
+READ_FIELDS = ("turn_index", "last_user_message", "input_data_schema")
+
+
+def read_fields(state: SessionState) -> None:
+    for name in READ_FIELDS:
+        getattr(state, name)
+
+
+def inline_layout(state: SessionState):
+    fields = state_codec.state_fields(state)
+    fields.pop("version")
+    return state_codec.join_indexed({name: state_codec.dumps(value) for name, value in fields.items()})
+
+
+def sql_layout(state: SessionState):
+    doc, _ = SqlStateStore._split_logs(state)
+    raw, offsets = state_codec.join_indexed({name: state_codec.dumps(value) for name, value in doc.items()})
+    return compression.compress(raw, "zlib", min_size=256), offsets
+
+
+def paths(layout: str, blob: bytes, offsets):
+    if layout == "inline":
+        def eager(_):
+            read_fields(SessionState.fromdict(state_codec.loads(blob)))
+
+        def lazy(_):
+            return LazySessionState(LazyDocument(blob, offsets), {"version": 1})
+    else:
+        def eager(_):
+            read_fields(SqlStateStore._state_from_doc(SqlStateStore._decode_raw(blob), 1))
+
+        def lazy(_):
+            return SqlStateStore._state_from_doc(SqlStateStore._lazy_document(blob, offsets), 1)
+
+    def lazy_read(_):
+        read_fields(lazy(None))
+
+    def lazy_write(_):
+        state = lazy(None)
+        read_fields(state)
+        state.status = "WAIT_HUMAN"
+
+    return [("eager", eager), ("lazy", lazy_read), ("lazy+write", lazy_write)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[100, 200, 500])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"reads: {', '.join(READ_FIELDS)}")
+    print(f"{'turns':>6} {'layout':<7} {'bytes':>9} {'path':<11} {'ms/turn':>9} {'speedup':>8}")
+    for turns in args.turns:
+        state = make_session(turns)
+        for layout, build in (("inline", inline_layout), ("sql", sql_layout)):
+            blob, offsets = build(state)
+            baseline = None
+            for name, fn in paths(layout, blob, offsets):
+                ms = timeit(fn, None, args.repeat)
+                baseline = baseline or ms
+                print(f"{turns:>6} {layout:<7} {len(blob):>9} {name:<11} {ms:>9.3f} {baseline / ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
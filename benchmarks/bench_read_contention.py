@@ -0,0 +1,80 @@
+"""
+Read throughput of SqlStateStore under concurrent writes.
+
+`--writers` tasks keep running turns (get_state -> mutate -> store_state) on
+their own runs while `--readers` tasks call get_state on random runs, for
+`--seconds`, against a temporary SQLite database. Compares reads through the
+query-only snapshot pool (default) with reads through the writer transaction
+(`read_pool_size=0`, BEGIN IMMEDIATE), which queue behind every write.
+
+Usage: python -m benchmarks.bench_read_contention --writers 4 --readers 8 --seconds 5
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+from benchmarks.synthetic import make_session, add_turn
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def contention(db: Path, read_pool_size: int, args):
+    store = SqlStateStore(f"sqlite:///{db}", read_pool_size=read_pool_size)
+    run_ids = []
+    for i in range(args.writers * 2):
+        state = make_session(args.history, seed=i)
+        await store.store_state(state.run_id, state)
+        run_ids.append(state.run_id)
+
+    deadline = time.perf_counter() + args.seconds
+    read_latencies, writes = [], [0]
+
+    async def writer(worker: int):
+        rng = random.Random(worker)
+        own = run_ids[worker::args.writers]
+        while time.perf_counter() < deadline:
+            for run_id in own:
+                state = await store.get_state(run_id)
+                add_turn(state, rng)
+                await store.store_state(run_id, state)
+                writes[0] += 1
+
+    async def reader(worker: int):
+        rng = random.Random(1000 + worker)
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            await store.get_state(rng.choice(run_ids))
+            read_latencies.append((time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(writer(w) for w in range(args.writers)), *(reader(r) for r in range(args.readers)))
+    await store.dispose()
+    return len(read_latencies) / args.seconds, writes[0] / args.seconds, read_latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--history", type=int, default=20, help="turns already in each session")
+    parser.add_argument("--read-pool-size", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'reads via':<16} {'reads/s':>9} {'writes/s':>9} {'read p50 ms':>12} {'read p99 ms':>12}")
+    for label, pool_size in (("writer lock", 0), ("snapshot pool", args.read_pool_size)):
+        with tempfile.TemporaryDirectory() as tmp:
+            reads, writes, latencies = asyncio.run(contention(Path(tmp) / "bench.db", pool_size, args))
+        print(f"{label:<16} {reads:>9.1f} {writes:>9.1f} {statistics.median(latencies):>12.3f} "
+              f"{percentile(latencies, 99):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
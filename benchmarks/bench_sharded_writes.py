@@ -0,0 +1,88 @@
+"""
+Multi-process write throughput of ShardedSqlStateStore by shard count.
+
+Starts `--workers` processes (standing in for uvicorn workers), each running
+get_state -> turn -> store_state on its own runs against the same store
+directory, and reports aggregate turns/s for every `--shards` value. With one
+shard all workers share a single SQLite write lock; with about one shard per
+worker their writes mostly land in different files.
+
+Usage: python -m benchmarks.bench_sharded_writes --workers 4 --shards 1 2 4 --runs 8 --turns 20
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import tempfile
+import time
+
+from arix_chatbot.state_manager.sharded_state_store import ShardedSqlStateStore
+from benchmarks.synthetic import make_session, add_turn
+
+
+async def worker_turns(directory: str, shards: int, worker: int, runs: int, turns: int, barrier) -> float:
+    store = ShardedSqlStateStore(directory, shards=shards)
+    run_ids = []
+    for i in range(runs):
+        state = make_session(10, seed=worker * 1000 + i)
+        await store.store_state(state.run_id, state)
+        run_ids.append(state.run_id)
+
+    rng = random.Random(worker)
+    barrier.wait()
+    t0 = time.perf_counter()
+    for _ in range(turns):
+        for run_id in run_ids:
+            state = await store.get_state(run_id)
+            add_turn(state, rng)
+            await store.store_state(run_id, state)
+    elapsed = time.perf_counter() - t0
+    await store.dispose()
+    return elapsed
+
+
+async def create_schema(directory: str, shards: int) -> None:
+    store = ShardedSqlStateStore(directory, shards=shards)
+    await store.list_sessions()
+    await store.dispose()
+
+
+def worker_main(directory, shards, worker, runs, turns, barrier, results):
+    results.put(asyncio.run(worker_turns(directory, shards, worker, runs, turns, barrier)))
+
+
+def bench(shards: int, args) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        # create the shard schemas once, so workers do not race on DDL
+        asyncio.run(create_schema(tmp, shards))
+        barrier = multiprocessing.Barrier(args.workers)
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=worker_main,
+                                    args=(tmp, shards, w, args.runs, args.turns, barrier, results))
+            for w in range(args.workers)
+        ]
+        for p in procs:
+            p.start()
+        elapsed = max(results.get() for _ in procs)
+        for p in procs:
+            p.join()
+    return args.workers * args.runs * args.turns / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--runs", type=int, default=8, help="runs per worker")
+    parser.add_argument("--turns", type=int, default=20, help="turns per run")
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers x {args.runs} runs x {args.turns} turns")
+    print(f"{'shards':>6} {'turns/s':>9}")
+    for shards in args.shards:
+        print(f"{shards:>6} {bench(shards, args):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
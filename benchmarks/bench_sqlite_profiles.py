@@ -0,0 +1,48 @@
+"""
+Commit latency and turn throughput of SqlStateStore per SQLite profile.
+
+For each profile replays `--turns` turns on `--runs` synthetic sessions
+(get_state -> mutate -> store_state) against a fresh database in `--dir`
+(use a directory on the disk you deploy to: fsync cost is the difference
+between the profiles) and reports turns/s and store_state (one commit)
+latency percentiles.
+
+Usage: python -m benchmarks.bench_sqlite_profiles --runs 20 --turns 30 [--profiles durable balanced]
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+from pathlib import Path
+
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+from arix_chatbot.state_manager.sqlite_profiles import PROFILES
+from benchmarks.bench_state_store import throughput, percentile
+
+
+async def bench(profile: str, db: Path, args):
+    store = SqlStateStore(f"sqlite:///{db}", sqlite_profile=profile)
+    try:
+        return await throughput(store, args.runs, args.turns, args.history)
+    finally:
+        await store.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--history", type=int, default=20, help="turns already in each session")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--dir", default=None, help="where to create the databases (default: a temp dir)")
+    args = parser.parse_args()
+
+    print(f"{'profile':<11} {'turns/s':>9} {'commit p50 ms':>14} {'commit p99 ms':>14}")
+    for profile in args.profiles:
+        with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+            rate, latencies = asyncio.run(bench(profile, Path(tmp) / f"{profile}.db", args))
+        print(f"{profile:<11} {rate:>9.1f} {statistics.median(latencies):>14.3f} {percentile(latencies, 99):>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
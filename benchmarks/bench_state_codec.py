@@ -0,0 +1,70 @@
+"""
+Round-trip benchmark: legacy SessionState persistence path vs the state codec.
+
+Legacy:  json.loads(json.dumps(<state fields>, default=str)) -> json.dumps (JSON column)
+         json.loads -> SessionState(**data)
+Codec:   state_codec.encode_state / decode_state (orjson when installed, plus
+         msgpack when installed)
+
+Usage: python -m benchmarks.bench_state_codec --turns 50 200 500
+"""
+import argparse
+import json
+import time
+
+from arix_chatbot.state_manager import state_codec
+from arix_chatbot.state_manager.state_codec import StateFormat
+from arix_chatbot.state_manager.state_store import SessionState
+from benchmarks.synthetic import make_session
+
+
+def legacy_encode(state: SessionState) -> bytes:
+    # the legacy path used vars(state); the fields only, as the state now also
+    # carries private caches (job index, received messages) in its __dict__
+    doc = json.loads(json.dumps(state_codec.state_fields(state), default=str))
+    return json.dumps(doc).encode("utf-8")
+
+
+def legacy_decode(data: bytes) -> SessionState:
+    return SessionState(**json.loads(data))
+
+
+def timeit(fn, arg, repeat: int) -> float:
+    """Best-of-`repeat` wall time in ms."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = [("legacy", legacy_encode, legacy_decode),
+             ("codec-json", state_codec.encode_state, state_codec.decode_state)]
+    if state_codec.msgpack is not None:
+        paths.append(("codec-msgpack",
+                      lambda s: state_codec.encode_state(s, StateFormat.MSGPACK),
+                      lambda b: state_codec.decode_state(b, StateFormat.MSGPACK)))
+    print(f"orjson: {state_codec.orjson is not None}, msgpack: {state_codec.msgpack is not None}")
+    print(f"{'turns':>6} {'path':<14} {'bytes':>10} {'encode ms':>10} {'decode ms':>10} {'speedup':>8}")
+
+    for turns in args.turns:
+        state = make_session(turns)
+        baseline = None
+        for name, encode, decode in paths:
+            data = encode(state)
+            assert decode(data).turn_index == state.turn_index
+            enc = timeit(encode, state, args.repeat)
+            dec = timeit(decode, data, args.repeat)
+            baseline = baseline or enc + dec
+            print(f"{turns:>6} {name:<14} {len(data):>10} {enc:>10.2f} {dec:>10.2f} {baseline / (enc + dec):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
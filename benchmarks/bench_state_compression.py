@@ -0,0 +1,80 @@
+"""
+Per-codec comparison for compressed state columns.
+
+For each available codec reports the stored size of a synthetic session,
+encode / decode CPU time (codec only, on top of the JSON encoding) and the
+latency distribution of SqlStateStore.get_state against a temporary SQLite
+database.
+
+Usage: python -m benchmarks.bench_state_compression --turns 200 --runs 50 --reads 500
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from arix_chatbot.state_manager import compression, state_codec
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+from benchmarks.synthetic import make_session
+
+
+def cpu_ms(fn, arg, repeat: int) -> float:
+    """Mean process CPU time in ms."""
+    t0 = time.process_time()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.process_time() - t0) / repeat * 1000
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def read_latencies(codec: str, turns: int, runs: int, reads: int, tmp: Path):
+    store = SqlStateStore(f"sqlite:///{tmp / f'{codec}.db'}", compression=codec)
+    run_ids = []
+    for i in range(runs):
+        state = make_session(turns, seed=i)
+        await store.store_state(state.run_id, state)
+        run_ids.append(state.run_id)
+
+    rng = random.Random(0)
+    latencies = []
+    for _ in range(reads):
+        t0 = time.perf_counter()
+        await store.get_state(rng.choice(run_ids))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    await store.dispose()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    raw = state_codec.encode_state(make_session(args.turns))
+    print(f"session: {args.turns} turns, {len(raw)} bytes of JSON")
+    print(f"{'codec':<6} {'bytes':>10} {'ratio':>6} {'enc cpu ms':>11} {'dec cpu ms':>11} "
+          f"{'read p50 ms':>12} {'read p99 ms':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in compression.CODECS:
+            blob = compression.compress(raw, name)
+            assert compression.decompress(blob) == raw
+            enc = cpu_ms(lambda data: compression.compress(data, name), raw, args.repeat)
+            dec = cpu_ms(compression.decompress, blob, args.repeat)
+            latencies = asyncio.run(read_latencies(name, args.turns, args.runs, args.reads, Path(tmp)))
+            print(f"{name:<6} {len(blob):>10} {len(raw) / len(blob):>6.1f} {enc:>11.3f} {dec:>11.3f} "
+                  f"{statistics.median(latencies):>12.3f} {percentile(latencies, 99):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Protocol smoke checks and turn throughput for the StateStore implementations.
+
+Each store first goes through the same checks of the core StateStore
+protocol (exact round trip of a synthetic session, version bumps, conflict
+detection, forced writes, unknown runs) -- not of the history / checkpoint /
+listing API, which LangGraphStore does not implement -- then replays `--turns` turns on `--runs` sessions the way the
+pipeline does (get_state -> mutate -> store_state) against a temporary
+database, reporting turns/s and store_state latency percentiles.
+`memory` (InMemoryStateStore) is the zero-I/O baseline. `postgres` runs
+against the database in $ARIX_BENCH_PG_URL (tables are created there) and is
+skipped when it is not set.
+
+Usage: python -m benchmarks.bench_state_store --runs 20 --turns 30 [--stores memory sql sharded langgraph postgres]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from arix_chatbot.state_manager import state_codec
+from arix_chatbot.state_manager.append_log import LOG_FIELDS
+from arix_chatbot.state_manager.memory_state_store import InMemoryStateStore
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+from arix_chatbot.state_manager.sharded_state_store import ShardedSqlStateStore
+from arix_chatbot.state_manager.state_store import StateConflictError
+from benchmarks.synthetic import make_session, add_turn
+
+
+def make_memory(tmp: Path):
+    return InMemoryStateStore()
+
+
+def make_sql(tmp: Path):
+    return SqlStateStore(f"sqlite:///{tmp / 'sql.db'}")
+
+
+def make_sharded(tmp: Path):
+    return ShardedSqlStateStore(str(tmp / "shards"), shards=4)
+
+
+def make_langgraph(tmp: Path):
+    # langgraph-checkpoint-sqlite is only needed for this store
+    from arix_chatbot.state_manager.lang_graph_store import LangGraphStore
+    return LangGraphStore(f"sqlite:///{tmp / 'langgraph.db'}")
+
+
+def make_postgres(tmp: Path):
+    url = os.environ.get("ARIX_BENCH_PG_URL")
+    if not url:
+        raise ImportError("set ARIX_BENCH_PG_URL to a postgresql URL")
+    from arix_chatbot.state_manager.postgres_state_store import PostgresStateStore
+    return PostgresStateStore(url)
+
+
+STORES = {
+    "memory": make_memory,
+    "sql": make_sql,
+    "sharded": make_sharded,
+    "langgraph": make_langgraph,
+    "postgres": make_postgres,
+}
+
+
+def comparable(state):
+    # decoded again, so stores that reorder keys (JSONB) still compare equal
+    doc = state_codec.state_fields(state)
+    doc.pop("version")
+    for name in LOG_FIELDS:
+        doc[name] = list(doc[name])
+    return state_codec.loads(state_codec.dumps(doc))
+
+
+async def check_protocol(store) -> None:
+    state = make_session(20, seed=1)
+    assert state.version == 0
+    # run ids are seeded: drop what a previous benchmark left in a persistent database
+    await store.delete_state(state.run_id)
+    await store.store_state(state.run_id, state)
+    assert state.version == 1, state.version
+
+    loaded = await store.get_state(state.run_id, materialize_logs=True)
+    assert loaded is not None and loaded.version == 1
+    assert comparable(loaded) == comparable(state), "state does not round-trip"
+
+    add_turn(loaded, random.Random(2))
+    await store.store_state(loaded.run_id, loaded)
+    assert loaded.version == 2
+
+    try:
+        await store.store_state(state.run_id, state)  # still at version 1
+        raise AssertionError("stale write was accepted")
+    except StateConflictError:
+        pass
+    await store.store_state(state.run_id, state, force=True)
+    assert state.version == 3
+    assert comparable(await store.get_state(state.run_id, materialize_logs=True)) == comparable(state)
+
+    assert await store.get_state("no-such-run") is None
+
+
+async def throughput(store, runs: int, turns: int, history: int):
+    latencies = []
+    run_ids = []
+    for i in range(runs):
+        state = make_session(history, seed=100 + i)
+        await store.delete_state(state.run_id)
+        await store.store_state(state.run_id, state)
+        run_ids.append(state.run_id)
+
+    rng = random.Random(0)
+    t0 = time.perf_counter()
+    for _ in range(turns):
+        for run_id in run_ids:
+            state = await store.get_state(run_id)
+            add_turn(state, rng)
+            w0 = time.perf_counter()
+            await store.store_state(run_id, state)
+            latencies.append((time.perf_counter() - w0) * 1000)
+    elapsed = time.perf_counter() - t0
+    return runs * turns / elapsed, latencies
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def bench(name: str, args, tmp: Path):
+    store = STORES[name](tmp)
+    try:
+        await check_protocol(store)
+        return await throughput(store, args.runs, args.turns, args.history)
+    finally:
+        await store.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--history", type=int, default=20, help="turns already in each session")
+    parser.add_argument("--stores", nargs="+", default=list(STORES), choices=list(STORES))
+    args = parser.parse_args()
+
+    print(f"{'store':<10} {'turns/s':>9} {'write p50 ms':>13} {'write p99 ms':>13}")
+    for name in args.stores:
+        with tempfile.TemporaryDirectory() as tmp:
+            try:
+                rate, latencies = asyncio.run(bench(name, args, Path(tmp)))
+            except ImportError as e:
+                print(f"{name:<10} skipped: {e}")
+                continue
+        print(f"{name:<10} {rate:>9.1f} {statistics.median(latencies):>13.3f} {percentile(latencies, 99):>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
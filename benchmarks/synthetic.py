@@ -0,0 +1,64 @@
+"""Synthetic SessionState generators shared by the benchmarks."""
+from datetime import datetime, timedelta
+import random
+import uuid
+
+from arix_chatbot.agents.agent_ids import AgentID as aid
+from arix_chatbot.jobs.job import Job, JobStatus
+from arix_chatbot.state_manager.state_store import SessionState, SessionStatus
+
+WORDS = ("label", "sentiment", "review", "customer", "schema", "class", "input", "output",
+         "guideline", "example", "positive", "negative", "neutral", "ticket", "billing", "support")
+
+EDITORS = (aid.TASK_GOAL_EDITOR, aid.TASK_GLOBAL_GUIDELINES_EDITOR, aid.TASK_DETAILED_INSTRUCTIONS_EDITOR,
+           aid.TASK_AUTHOR_NOTES_EDITOR, aid.INPUT_SCHEMA_EDITOR, aid.OUTPUT_SCHEMA_EDITOR, aid.INPUT_DATA_EDITOR)
+
+
+def text(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+
+def schema(rng: random.Random, n_fields: int = 30) -> dict:
+    return {
+        f"field_{i}": {"type": rng.choice(["string", "int", "float"]), "description": text(rng, 12)}
+        for i in range(n_fields)
+    }
+
+
+def add_turn(state: SessionState, rng: random.Random, n_jobs: int = 8) -> SessionState:
+    """Mutate `state` the way one chat turn roughly does."""
+    state.turn_index += 1
+    state.clear_before_turn()
+    ts = datetime(2025, 1, 1) + timedelta(minutes=state.turn_index)
+    state.last_user_message = {"type": "chat", "msg": text(rng, 60)}
+    state.next_response = {"type": "CHAT", "msg": text(rng, 120), "from": aid.MAIN}
+    state.chat_full_history.extend([state.last_user_message, state.next_response])
+    state.chat_summary = text(rng, 200)
+    for agent_id in (aid.PLANNER, aid.OUTPUT_HANDLER, aid.HISTORY_MANAGER):
+        state.timeline.append({"timestamp": ts.isoformat(), "event": "handoff",
+                               "from_agent": aid.MAIN, "to_agent": agent_id})
+    state.timeline.append({"timestamp": ts.isoformat(), "event": "ask_human", "agent_id": aid.MAIN})
+    for _ in range(n_jobs):
+        state.add_job(Job(job_id=str(uuid.UUID(int=rng.getrandbits(128))), report_to=aid.MAIN,
+                          worker_id=rng.choice(EDITORS), status=JobStatus.ASSIGNED_TO_AGENT,
+                          turn_index=state.turn_index, content=text(rng, 30),
+                          required_context=["task_goal", "input_data_schema"]))
+    state.agents_context[aid.MAIN] = {"checklist": {"plan_workflow": "COMPLETED", "launch_workflow": "COMPLETED"}}
+    state.chat_action_stack = [{"agent_id": aid.PLANNER, "action": text(rng, 20)}]
+    state.task_detailed_instructions = {"text": text(rng, 300)}
+    state.status = SessionStatus.WAIT_HUMAN
+    return state
+
+
+def make_session(turns: int = 100, seed: int = 0, run_id: str = None) -> SessionState:
+    rng = random.Random(seed)
+    state = SessionState(run_id=run_id or str(uuid.UUID(int=rng.getrandbits(128))), owner_agent_id=aid.MAIN)
+    state.task_goal = {"text": text(rng, 150)}
+    state.task_global_guidelines = {"text": text(rng, 300)}
+    state.task_author_notes = text(rng, 100)
+    state.input_data_description = text(rng, 80)
+    state.input_data_schema = schema(rng)
+    state.output_data_schema = schema(rng)
+    for _ in range(turns):
+        add_turn(state, rng)
+    return state
@@ -0,0 +1,162 @@
+import asyncio
+from typing import Tuple
+
+import pytest
+
+from arix_chatbot.agents.base.worker import Worker, WorkerStatus
+from arix_chatbot.app.agent_registry import AgentRegistry
+from arix_chatbot.app.ai_factory_pipeline import AiFactoryPipeline, build_state_store
+from arix_chatbot.state_manager.lang_graph_store import LangGraphStore
+from arix_chatbot.state_manager.memory_state_store import InMemoryStateStore
+from arix_chatbot.state_manager.run_lease import RunLease
+from arix_chatbot.state_manager.session_cache import CachedStateStore
+from arix_chatbot.state_manager.sharded_state_store import ShardedSqlStateStore
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+from arix_chatbot.state_manager.state_store import SessionState, SessionStatus, StateConflictError
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'sessions.db'}"
+
+
+class EchoWorker(Worker):
+    """Adds the user's message to the chat summary and waits for the next one."""
+
+    agent_id = "echo"
+
+    def __init__(self):
+        super().__init__("echo")
+
+    async def process_task(self, state: SessionState) -> Tuple[SessionState, WorkerStatus]:
+        for msg in state.agents_inbox.get(self.agent_id, {}).get("user", []):
+            state.chat_summary = f"{state.chat_summary or ''} {msg['msg']}".strip()
+        return state, WorkerStatus.WAIT_HUMAN
+
+
+def new_pipeline(db_url: str, **kwargs) -> AiFactoryPipeline:
+    return AiFactoryPipeline(AgentRegistry([EchoWorker()]), CachedStateStore(SqlStateStore(db_url)),
+                             root_agent="echo", **kwargs)
+
+
+def test_turn_is_replayed_after_conflict(db_url):
+    async def scenario():
+        first, second = new_pipeline(db_url), new_pipeline(db_url)
+        state = await first.start_run("hi")
+        run_id = state.run_id
+        # the other process writes the run: the copy cached by `first` is stale now
+        await second.inject_human_input(run_id, "b")
+
+        state = await first.inject_human_input(run_id, "a")
+        assert state.status == SessionStatus.WAIT_HUMAN
+        assert state.chat_summary == "hi b a"
+        assert first.state_store.stats.conflicts == 1
+
+        stored = await second.state_store.backend.get_state(run_id)
+        assert stored.chat_summary == "hi b a"
+        assert stored.version == 3
+        await first.close()
+        await second.close()
+
+    run(scenario())
+
+
+def test_conflict_is_raised_after_retries(db_url):
+    async def scenario():
+        first, second = new_pipeline(db_url, conflict_retries=0), new_pipeline(db_url)
+        run_id = (await first.start_run("hi")).run_id
+        await second.inject_human_input(run_id, "b")
+
+        with pytest.raises(StateConflictError):
+            await first.inject_human_input(run_id, "a")
+        assert (await second.state_store.backend.get_state(run_id)).chat_summary == "hi b"
+        await first.close()
+        await second.close()
+
+    run(scenario())
+
+
+def leased_pipeline(db_url: str) -> AiFactoryPipeline:
+    store = CachedStateStore(SqlStateStore(db_url))
+    return AiFactoryPipeline(AgentRegistry([EchoWorker()]), store, root_agent="echo",
+                             run_lease=RunLease(store, poll_seconds=0.01))
+
+
+def test_turns_under_lease_see_other_processes(db_url):
+    async def scenario():
+        first, second = leased_pipeline(db_url), leased_pipeline(db_url)
+        run_id = (await first.start_run("hi")).run_id
+        # durable as soon as the turn (and its lease) is over
+        assert (await second.state_store.backend.get_state(run_id)).chat_summary == "hi"
+
+        await second.inject_human_input(run_id, "b")
+        assert (await first.state_store.backend.get_state(run_id)).chat_summary == "hi b"
+
+        # the run was cached by `first`, but its turn starts from the store
+        state = await first.inject_human_input(run_id, "a")
+        assert state.chat_summary == "hi b a"
+        assert first.state_store.stats.conflicts == 0
+        await first.close()
+        await second.close()
+
+    run(scenario())
+
+
+STORES = {
+    "sql": lambda tmp_path: CachedStateStore(SqlStateStore(f"sqlite:///{tmp_path / 'sessions.db'}")),
+    "memory": lambda tmp_path: InMemoryStateStore(),
+    "langgraph": lambda tmp_path: LangGraphStore(f"sqlite:///{tmp_path / 'langgraph.db'}"),
+}
+
+
+@pytest.mark.parametrize("store", sorted(STORES))
+def test_messages_posted_between_turns_reach_the_next_turn(store, tmp_path):
+    async def scenario():
+        pipeline = AiFactoryPipeline(AgentRegistry([EchoWorker()]), STORES[store](tmp_path), root_agent="echo")
+        run_id = (await pipeline.start_run("hi")).run_id
+        await pipeline.state_store.append_inbox(run_id, "echo", {"type": "chat", "msg": "posted"})
+
+        state = await pipeline.inject_human_input(run_id, "a")
+        assert state.chat_summary == "hi posted a"
+        # delivered once: stored with the turn, not replayed by the next one
+        state = await pipeline.inject_human_input(run_id, "b")
+        assert state.chat_summary == "hi posted a b"
+        await pipeline.close()
+
+    run(scenario())
+
+
+@pytest.mark.parametrize("store", sorted(STORES))
+def test_message_posted_during_a_turn_does_not_conflict(store, tmp_path):
+    async def scenario():
+        state_store = STORES[store](tmp_path)
+        pipeline = AiFactoryPipeline(AgentRegistry([EchoWorker()]), state_store, root_agent="echo")
+        run_id = (await pipeline.start_run("hi")).run_id
+
+        state = await state_store.get_state(run_id)
+        await state_store.append_inbox(run_id, "echo", {"type": "chat", "msg": "posted"})
+        state.chat_summary = "turn"
+        await pipeline._persist(run_id, state)
+        assert (await state_store.get_state(run_id)).agents_inbox["echo"]["user"][-1]["msg"] == "posted"
+        await pipeline.close()
+
+    run(scenario())
+
+
+def test_build_state_store(tmp_path):
+    store = build_state_store("sharded", shards_dir=str(tmp_path / "shards"), shards=2)
+    assert isinstance(store, CachedStateStore)
+    assert isinstance(store.backend, ShardedSqlStateStore)
+    assert len(store.backend.shards) == 2
+    run(store.dispose())
+
+    store = build_state_store("sql", db_url=f"sqlite:///{tmp_path / 'sessions.db'}", cache=False)
+    assert isinstance(store, SqlStateStore)
+    run(store.dispose())
+
+    with pytest.raises(ValueError):
+        build_state_store("redis")
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from arix_chatbot.state_manager.change_tracking import UNATTRIBUTED, changes_of, track_changes
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore, CheckpointKind
+from arix_chatbot.state_manager.state_store import SessionState
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def new_state() -> SessionState:
+    return SessionState(run_id="run-1", owner_agent_id="main",
+                        global_context={"settings": {"labels": ["a"]}}, agents_context={"main": {}})
+
+
+def test_nested_mutations_mark_the_top_level_field():
+    state = new_state()
+    tracker = track_changes(state)
+    assert tracker.dirty == {}
+
+    state.global_context["settings"]["labels"].append("b")
+    assert set(tracker.dirty) == {"global_context"}
+    state.agents_context["main"].setdefault("checklist", {})["plan"] = "DONE"
+    state.pending_handoff += ["planner"]
+    assert set(tracker.dirty) == {"global_context", "agents_context", "pending_handoff"}
+
+
+def test_values_put_into_the_state_are_tracked_too():
+    state = new_state()
+    tracker = track_changes(state)
+    state.artifacts = {"files": []}
+    state.global_context["new"] = {"items": []}
+    tracker.written(tracker.begin_write(), 1, {})
+    assert tracker.dirty == {}
+
+    state.artifacts["files"].append("a.csv")
+    state.global_context["new"]["items"].append(1)
+    assert set(tracker.dirty) == {"artifacts", "global_context"}
+
+
+def test_changes_are_attributed_to_agents():
+    state = new_state()
+    tracker = track_changes(state)
+    with tracker.agent("planner"):
+        state.pending_handoff.append("editor")
+    with tracker.agent("editor"):
+        state.global_context["settings"]["labels"].clear()
+    state.status = "WAIT_HUMAN"
+    assert tracker.report() == {"planner": ["pending_handoff"], "editor": ["global_context"],
+                                UNATTRIBUTED: ["status"]}
+
+
+def test_change_after_begin_write_stays_dirty():
+    state = new_state()
+    tracker = track_changes(state)
+    state.chat_summary = "one"
+    snapshot = tracker.begin_write()
+    state.chat_summary = "two"
+    tracker.written(snapshot, 1, {})
+    assert set(tracker.dirty) == {"chat_summary"}
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'sessions.db'}"
+
+
+def test_delta_sets_only_dirty_fields(db_url):
+    async def scenario():
+        store = SqlStateStore(db_url)
+        state = new_state()
+        tracker = track_changes(state)
+        await store.store_state("run-1", state)
+        assert tracker.dirty == {} and tracker.version == 1
+
+        state.global_context["settings"]["labels"].append("b")
+        state.chat_summary = "summary"
+        await store.store_state("run-1", state)
+        assert changes_of(state).dirty == {}
+
+        cp = store.checkpoints.c
+        async with store.engine.connect() as conn:
+            rows = (await conn.execute(select(cp.kind, cp.state).order_by(cp.seq))).fetchall()
+        assert [row.kind for row in rows] == [CheckpointKind.BASE, CheckpointKind.DELTA]
+        delta = rows[1].state["$set"]
+        assert delta["global_context"] == {"settings": {"labels": ["a", "b"]}}
+        assert delta["chat_summary"] == "summary"
+        assert "agents_context" not in delta and "pending_handoff" not in delta
+
+        loaded = await store.get_state("run-1")
+        assert loaded.global_context == {"settings": {"labels": ["a", "b"]}}
+        checkpoint = await store.get_checkpoint("run-1", 2)
+        assert (checkpoint.chat_summary, checkpoint.agents_context) == ("summary", {"main": {}})
+        await store.dispose()
+
+    run(scenario())
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from arix_chatbot.state_manager.checkpoint_retention import CheckpointCompactor, RetentionPolicy
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore, CheckpointKind
+from arix_chatbot.state_manager.state_store import SessionState, SessionStatus
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'sessions.db'}"
+
+
+NOW = datetime(2026, 6, 30, 12, 0)
+
+
+def test_select_keep_keeps_the_newest():
+    policy = RetentionPolicy(keep_last=3, keep_daily=False)
+    stamps = [(seq, NOW - timedelta(minutes=10 - seq)) for seq in range(1, 11)]
+    assert policy.select_keep(stamps, NOW) == {8, 9, 10}
+
+
+def test_select_keep_thins_older_checkpoints_to_one_per_day():
+    policy = RetentionPolicy(keep_last=2)
+    # three checkpoints a day over four days, seq 1..12
+    stamps = [(day * 3 + i + 1, NOW - timedelta(days=3 - day, hours=3 - i)) for day in range(4) for i in range(3)]
+    # 11 and 12 are the newest; 10 shares their day; 9, 6 and 3 close the older days
+    assert policy.select_keep(stamps, NOW) == {3, 6, 9, 11, 12}
+
+
+def test_select_keep_drops_daily_checkpoints_past_max_age():
+    policy = RetentionPolicy(keep_last=1, daily_max_age_days=2)
+    stamps = [(seq, NOW - timedelta(days=5 - seq)) for seq in range(1, 6)]
+    assert policy.select_keep(stamps, NOW) == {3, 4, 5}
+
+
+def snapshot(state: SessionState):
+    # log fields of a checkpoint are not loaded, their length is what it records
+    return state.version, state.chat_summary, len(state.timeline)
+
+
+def test_compaction_rebases_kept_deltas(db_url):
+    async def scenario():
+        store = SqlStateStore(db_url, snapshot_every=20)
+        state = SessionState(run_id="run-1", owner_agent_id="main")
+        for turn in range(10):
+            state.chat_summary = f"turn {turn}"
+            state.timeline.append({"event": f"turn {turn}"})
+            await store.store_state("run-1", state)
+        expected = {seq: snapshot(await store.get_checkpoint("run-1", seq)) for seq in (8, 9, 10)}
+
+        policy = RetentionPolicy(keep_last=3, keep_daily=False, completed_ttl_days=None)
+        report = await CheckpointCompactor(store, policy).run_once()
+        assert (report.checkpoints_deleted, report.checkpoints_rebased) == (7, 1)
+
+        cp = store.checkpoints.c
+        async with store.engine.connect() as conn:
+            kinds = dict((await conn.execute(select(cp.seq, cp.kind).order_by(cp.seq))).fetchall())
+        assert kinds == {8: CheckpointKind.BASE, 9: CheckpointKind.DELTA, 10: CheckpointKind.DELTA}
+        # seq 8 lost its predecessors but still replays, and so do the deltas on top of it
+        for seq, values in expected.items():
+            assert snapshot(await store.get_checkpoint("run-1", seq)) == values
+        assert await store.get_checkpoint("run-1", 7) is None
+
+        # nothing left to drop: the second pass reads no blobs and changes nothing
+        report = await CheckpointCompactor(store, policy).run_once()
+        assert (report.checkpoints_deleted, report.checkpoints_rebased) == (0, 0)
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_completed_runs_past_ttl_are_dropped(db_url):
+    async def scenario():
+        store = SqlStateStore(db_url)
+        for run_id, status in (("done", SessionStatus.COMPLETED), ("waiting", SessionStatus.WAIT_HUMAN)):
+            state = SessionState(run_id=run_id, owner_agent_id="main", status=status,
+                                 timeline=[{"event": "started"}])
+            await store.store_state(run_id, state)
+            await store.append_inbox(run_id, "main", {"msg": "posted"})
+
+        compactor = CheckpointCompactor(store, RetentionPolicy(completed_ttl_days=30))
+        # not idle long enough yet
+        report = await compactor.run_once(now=datetime.utcnow() + timedelta(days=29))
+        assert report.runs_dropped == 0
+
+        later = datetime.utcnow() + timedelta(days=31)
+        # a run written after the expiry scan is not dropped by a stale cutoff
+        assert await compactor._drop_run("sessions", "done", datetime.utcnow() - timedelta(days=1)) is None
+
+        report = await compactor.run_once(now=later)
+        assert (report.runs_dropped, report.checkpoints_deleted) == (1, 1)
+        assert await store.get_state("done") is None
+        assert (await store.get_state("waiting")).status == SessionStatus.WAIT_HUMAN
+        async with store.engine.connect() as conn:
+            for table in (store.checkpoints, store.session_logs, store.session_events):
+                left = (await conn.execute(
+                    select(func.count()).select_from(table).where(table.c.run_id == "done")
+                )).scalar()
+                assert left == 0, table.name
+        await store.dispose()
+
+    run(scenario())
@@ -0,0 +1,82 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from arix_chatbot.state_manager import compression
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+from arix_chatbot.state_manager.state_store import SessionState
+
+DOC = b'{"chat_summary":"' + b"label the reviews " * 200 + b'"}'
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.mark.parametrize("name", sorted(compression.CODECS))
+def test_codec_header_and_round_trip(name):
+    codec = compression.get_codec(name)
+    blob = compression.compress(DOC, name)
+    assert blob[:compression.HEADER_SIZE] == bytes((compression.HEADER_MAGIC, codec.codec_id))
+    assert compression.is_compressed(blob)
+    assert compression.decompress(blob) == DOC
+    if name != "none":
+        assert len(blob) < len(DOC)
+
+
+def test_legacy_json_is_returned_unchanged():
+    assert not compression.is_compressed(DOC)
+    assert compression.decompress(DOC) == DOC
+
+
+def test_small_payloads_are_stored_as_is():
+    blob = compression.compress(b"{}", "zlib", min_size=64)
+    assert blob == bytes((compression.HEADER_MAGIC, compression.CODECS["none"].codec_id)) + b"{}"
+
+
+def test_unknown_codecs_are_rejected():
+    with pytest.raises(ValueError):
+        compression.get_codec("brotli")
+    with pytest.raises(ValueError):
+        compression.decompress(bytes((compression.HEADER_MAGIC, 250)) + b"{}")
+
+
+def raw_states(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [state for (state,) in conn.execute("SELECT state FROM sessions UNION ALL SELECT state FROM checkpoints")]
+    finally:
+        conn.close()
+
+
+def test_migrate_state_encoding_rewrites_legacy_and_other_codec_rows(tmp_path):
+    path = tmp_path / "sessions.db"
+
+    async def write():
+        store = SqlStateStore(f"sqlite:///{path}", compression="none")
+        for run_id in ("run-1", "run-2"):
+            await store.store_state(run_id, SessionState(run_id=run_id, owner_agent_id="main", chat_summary=run_id))
+        await store.dispose()
+
+    run(write())
+    # run-2 as a legacy row: plain JSON text from before the blob column
+    conn = sqlite3.connect(path)
+    legacy = compression.decompress(conn.execute("SELECT state FROM sessions WHERE run_id = 'run-2'").fetchone()[0])
+    conn.execute("UPDATE sessions SET state = ? WHERE run_id = 'run-2'", (legacy.decode("utf-8"),))
+    conn.commit()
+    conn.close()
+
+    async def migrate():
+        store = SqlStateStore(f"sqlite:///{path}", compression="zlib")
+        # legacy and "none" rows decode before the migration
+        assert [(await store.get_state(r)).chat_summary for r in ("run-1", "run-2")] == ["run-1", "run-2"]
+        assert await store.migrate_state_encoding(batch_size=1) == 4
+        assert [(await store.get_state(r)).chat_summary for r in ("run-1", "run-2")] == ["run-1", "run-2"]
+        # nothing left to rewrite
+        assert await store.migrate_state_encoding() == 0
+        await store.dispose()
+
+    run(migrate())
+    zlib_id = compression.CODECS["zlib"].codec_id
+    assert all(bytes(state[:2]) == bytes((compression.HEADER_MAGIC, zlib_id)) for state in raw_states(path))
@@ -0,0 +1,183 @@
+import asyncio
+from typing import Callable, List, Tuple
+
+from arix_chatbot.agents.base.worker import Worker, WorkerStatus
+from arix_chatbot.app.agent_registry import AgentRegistry
+from arix_chatbot.app.hop_scheduler import HopScheduler, FanOutHopScheduler
+from arix_chatbot.state_manager.state_store import SessionState, SessionStatus
+
+
+class Editor(Worker):
+    """Applies `edit` to the state after a short wait, counting how many editors run at once."""
+
+    running = 0
+    max_running = 0
+
+    def __init__(self, agent_id: str, edit: Callable[[SessionState], str]):
+        super().__init__("main")
+        self.agent_id = agent_id
+        self.edit = edit
+
+    async def process_task(self, state: SessionState) -> Tuple[SessionState, WorkerStatus]:
+        Editor.running += 1
+        Editor.max_running = max(Editor.max_running, Editor.running)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            Editor.running -= 1
+        return state, self.edit(state)
+
+
+class End(Worker):
+    """Last handoff: ends the turn."""
+
+    agent_id = "end"
+
+    def __init__(self):
+        super().__init__("main")
+
+    async def handle(self, state: SessionState) -> SessionState:
+        state.status = SessionStatus.WAIT_HUMAN
+        return state
+
+
+def writes(field: str, value: str):
+    """Appends `value` to a text field (conflicting with other writers) and to response_requests."""
+    def edit(state: SessionState) -> str:
+        setattr(state, field, (getattr(state, field) or "") + value)
+        state.job_status[value] = "done"
+        state.response_requests.append(value)
+        return WorkerStatus.COMPLETED
+    return edit
+
+
+def fails(state: SessionState) -> str:
+    return WorkerStatus.ERROR
+
+
+def waits(state: SessionState) -> str:
+    state.chat_summary = "question"
+    return WorkerStatus.WAIT_HUMAN
+
+
+def run_turn(scheduler_cls, agents: List[Editor]) -> SessionState:
+    registry = AgentRegistry(agents + [End()])
+    order = [agent.agent_id for agent in agents]
+    state = SessionState(run_id="run-1", owner_agent_id=order[0], pending_handoff=["end"] + order[:0:-1],
+                         fan_out=list(order), status=SessionStatus.HANDOFF)
+    Editor.max_running = 0
+    return asyncio.run(scheduler_cls(registry).run("run-1", state, "main"))
+
+
+def outcome(state: SessionState):
+    # fan_out is only consumed by FanOutHopScheduler; the timeline records the hops
+    return (state.status, state.owner_agent_id, state.pending_handoff, state.task_author_notes, state.chat_summary,
+            state.input_data_description, state.response_requests, state.job_status)
+
+
+def merge_conflicts(state: SessionState) -> List[str]:
+    return [event["agent_id"] for event in state.timeline if event.get("event") == "merge_conflict"]
+
+
+def test_independent_agents_run_concurrently():
+    agents = [Editor("a", writes("task_author_notes", "a")), Editor("b", writes("chat_summary", "b"))]
+    state = run_turn(FanOutHopScheduler, agents)
+    assert Editor.max_running == 2
+    assert state.status == SessionStatus.WAIT_HUMAN
+    assert (state.task_author_notes, state.chat_summary) == ("a", "b")
+    assert state.response_requests == ["a", "b"]
+    assert merge_conflicts(state) == []
+
+
+def test_conflicting_agents_run_again_in_order():
+    agents = [Editor(name, writes("task_author_notes", name)) for name in "abc"]
+    state = run_turn(FanOutHopScheduler, agents)
+    assert state.task_author_notes == "abc"
+    assert state.response_requests == ["a", "b", "c"]
+    assert merge_conflicts(state) == ["b", "c"]
+
+
+def test_changes_after_turn_ending_agent_are_dropped():
+    agents = [Editor("a", writes("task_author_notes", "a")), Editor("b", fails), Editor("c", writes("chat_summary", "c"))]
+    state = run_turn(FanOutHopScheduler, agents)
+    assert state.status == SessionStatus.ERROR
+    # c stays next in line, as after b in sequence
+    assert (state.owner_agent_id, state.pending_handoff) == ("c", ["end"])
+    assert state.task_author_notes == "a"
+    assert state.chat_summary is None
+    assert state.response_requests == ["a"]
+    assert "c" not in state.job_status
+
+
+def test_same_outcome_as_sequential_hops():
+    cases = [
+        [Editor("a", writes("task_author_notes", "a")), Editor("b", writes("chat_summary", "b"))],
+        [Editor(name, writes("task_author_notes", name)) for name in "abc"],
+        [Editor("a", writes("task_author_notes", "a")), Editor("b", writes("chat_summary", "b")),
+         Editor("c", writes("task_author_notes", "c"))],
+        [Editor("a", writes("task_author_notes", "a")), Editor("b", fails), Editor("c", writes("chat_summary", "c"))],
+        [Editor("a", writes("task_author_notes", "a")), Editor("b", waits), Editor("c", writes("task_author_notes", "c"))],
+        [Editor("a", writes("task_author_notes", "a")), Editor("b", writes("task_author_notes", "b")), Editor("c", waits),
+         Editor("d", writes("input_data_description", "d"))],
+    ]
+    for agents in cases:
+        assert outcome(run_turn(FanOutHopScheduler, agents)) == outcome(run_turn(HopScheduler, agents))
+
+
+class Hopper(Worker):
+    """Hands off to `to`, counting its hops in agents_context if `count`."""
+
+    def __init__(self, agent_id: str, to: str, count: bool):
+        super().__init__("main")
+        self.agent_id, self.to, self.count = agent_id, to, count
+
+    async def handle(self, state: SessionState) -> SessionState:
+        if self.count:
+            state.agents_context[self.agent_id] = state.agents_context.get(self.agent_id, 0) + 1
+        state.status = SessionStatus.HANDOFF
+        state.owner_agent_id = self.to
+        return state
+
+
+def ping_pong(count: bool, **kwargs) -> SessionState:
+    registry = AgentRegistry([Hopper("ping", "pong", count), Hopper("pong", "ping", count)])
+    state = SessionState(run_id="run-1", owner_agent_id="ping", status=SessionStatus.HANDOFF)
+    return asyncio.run(HopScheduler(registry, **kwargs).run("run-1", state, "main"))
+
+
+def test_max_hops_ends_the_turn():
+    state = ping_pong(count=True, max_hops=5)
+    assert state.status == SessionStatus.ERROR
+    assert "exceeded 5 agent hops" in state.error
+    hops = [event for event in state.timeline if event["event"] == "handoff"]
+    assert [event["hop"] for event in hops] == [1, 2, 3, 4, 5]
+    assert all(event["wall_ms"] >= 0 and event["cpu_ms"] >= 0 for event in hops)
+    assert state.timeline[-1]["event"] == "error"
+
+
+def test_handoff_loop_is_detected():
+    state = ping_pong(count=False)
+    assert state.status == SessionStatus.ERROR
+    assert "Handoff loop detected" in state.error and "ping -> pong" in state.error
+    assert [event["event"] for event in state.timeline] == ["handoff", "handoff", "error"]
+
+    # without loop detection only max_hops stops it
+    state = ping_pong(count=False, detect_loops=False, max_hops=7)
+    assert "exceeded 7 agent hops" in state.error
+
+
+class GroupedHopScheduler(HopScheduler):
+    """Plans fan-out groups but runs them with the base class' run_hop."""
+    plan = FanOutHopScheduler.plan
+
+
+def test_base_run_hop_runs_planned_agents_in_sequence():
+    cases = [
+        [Editor("a", writes("task_author_notes", "a")), Editor("b", writes("task_author_notes", "b"))],
+        [Editor("a", writes("task_author_notes", "a")), Editor("b", waits), Editor("c", writes("chat_summary", "c"))],
+    ]
+    for agents in cases:
+        state = run_turn(GroupedHopScheduler, agents)
+        assert state.timeline[0]["agents"] == [agent.agent_id for agent in agents]
+        assert Editor.max_running == 1
+        assert outcome(state) == outcome(run_turn(HopScheduler, agents))
@@ -0,0 +1,57 @@
+from dataclasses import dataclass, field, fields
+from typing import ClassVar, List
+
+import pytest
+
+from arix_chatbot.jobs import JOB_REGISTRY, job_codec
+from arix_chatbot.jobs.job import Job, JobStatus
+from arix_chatbot.jobs.job_codec import compile_codec
+from arix_chatbot.jobs.job_manifest import JOB_MANIFEST
+from arix_chatbot.jobs.user_interactions import PlanWorkflowJob
+
+BASE_FIELDS = dict(job_id="job-1", report_to="main", worker_id="planner",
+                   status=JobStatus.PENDING, turn_index=4)
+
+
+@dataclass(slots=True)
+class TaggedJob(Job):
+    job_type: ClassVar[str] = "TEST_TAGGED"
+    tags: List[str] = field(default_factory=list)
+
+
+@pytest.mark.parametrize("job_type", sorted(JOB_MANIFEST))
+def test_round_trip_of_every_job_class(job_type):
+    cls = JOB_REGISTRY[job_type]
+    job = cls(**BASE_FIELDS, content="text")
+    data = job.to_dict()
+    assert data == {**{f.name: getattr(job, f.name) for f in fields(cls)}, "job_type": job_type}
+    decoded = Job.from_dict(data)
+    assert type(decoded) is cls and decoded == job
+    # slots classes: no per-instance __dict__
+    assert not hasattr(decoded, "__dict__")
+
+
+def test_decode_fills_defaults_and_ignores_unknown_keys():
+    job = PlanWorkflowJob.from_dict({**BASE_FIELDS, "job_type": PlanWorkflowJob.job_type,
+                                     "workflow": ["a"], "from_a_newer_version": 1})
+    assert (job.workflow, job.user_intention, job.content) == (["a"], None, None)
+
+
+def test_default_factories_are_not_shared():
+    codec = compile_codec(TaggedJob)
+    first, second = codec.decode(BASE_FIELDS), codec.decode(BASE_FIELDS)
+    first.tags.append("x")
+    assert second.tags == []
+    assert codec.encode(first)["tags"] == ["x"] and codec.encode(first)["job_type"] == "TEST_TAGGED"
+
+
+def test_missing_required_fields_are_reported():
+    data = {key: value for key, value in BASE_FIELDS.items() if key != "worker_id"}
+    with pytest.raises(ValueError, match="worker_id"):
+        job_codec(PlanWorkflowJob).decode(data)
+    with pytest.raises(ValueError, match="job_type"):
+        Job.from_dict(BASE_FIELDS)
+
+
+def test_codec_is_compiled_once_per_class():
+    assert job_codec(PlanWorkflowJob) is job_codec(PlanWorkflowJob)
@@ -0,0 +1,53 @@
+import ast
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from arix_chatbot.jobs.generate_manifest import scan_job_classes
+from arix_chatbot.jobs.job_manifest import JOB_MANIFEST
+from arix_chatbot.jobs.registry import JobRegistry
+from arix_chatbot.jobs.user_interactions import CreateResponseJob, PlanWorkflowJob
+
+
+def new_registry(manifest=JOB_MANIFEST) -> JobRegistry:
+    return JobRegistry(manifest, entry_point_group=None)
+
+
+def test_job_types_resolve_from_the_manifest_on_first_lookup():
+    registry = new_registry()
+    assert repr(registry).startswith("JobRegistry(loaded=[]")
+    assert registry["PLAN_A_WORKFLOW"] is PlanWorkflowJob
+    assert registry.get("CREATE_RESPONSE") is CreateResponseJob
+    # resolved classes are registered with a compiled codec
+    assert set(registry.codecs) == {PlanWorkflowJob, CreateResponseJob}
+    assert "TASK_EDITOR" in registry and len(registry) == len(JOB_MANIFEST)
+    assert sorted(registry) == sorted(JOB_MANIFEST)
+
+
+def test_unknown_job_types():
+    registry = new_registry()
+    assert registry.get("NO_SUCH_JOB") is None and registry.get(None) is None
+    with pytest.raises(KeyError):
+        registry["NO_SUCH_JOB"]
+
+
+def test_manifest_entry_with_another_job_type_is_rejected():
+    registry = new_registry({"CREATE_RESPONSE": "arix_chatbot.jobs.user_interactions:PlanWorkflowJob"})
+    with pytest.raises(TypeError, match="regenerate the job manifest"):
+        registry["CREATE_RESPONSE"]
+
+
+def test_manifest_is_up_to_date():
+    assert scan_job_classes() == JOB_MANIFEST
+
+
+def test_importing_the_package_imports_no_job_module():
+    code = ("import sys, arix_chatbot.jobs; "
+            "print(sorted(m for m in sys.modules if m.startswith('arix_chatbot.jobs.')))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=Path(__file__).resolve().parents[1]).stdout
+    loaded = ast.literal_eval(out)
+    assert "arix_chatbot.jobs.user_interactions" not in loaded
+    assert "arix_chatbot.jobs.llm_task_editors" not in loaded
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from arix_chatbot.state_manager.lang_graph_store import LangGraphStore
+from arix_chatbot.state_manager.state_store import SessionState, StateConflictError
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'langgraph.db'}"
+
+
+def test_round_trip_and_version_checks(db_url):
+    async def scenario():
+        store = LangGraphStore(db_url)
+        state = SessionState(run_id="run-1", owner_agent_id="main", chat_summary="hello")
+        await store.store_state("run-1", state)
+        assert state.version == 1
+
+        loaded = await store.get_state("run-1")
+        assert loaded.chat_summary == "hello" and loaded.version == 1
+        loaded.chat_summary = "again"
+        await store.store_state("run-1", loaded)
+        with pytest.raises(StateConflictError):
+            await store.store_state("run-1", state)
+        await store.store_state("run-1", state, force=True)
+        assert state.version == 3
+        assert await store.get_state("no-such-run") is None
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_appends_are_pending_events(db_url):
+    async def scenario():
+        store = LangGraphStore(db_url)
+        state = SessionState(run_id="run-1", owner_agent_id="main")
+        await store.store_state("run-1", state)
+
+        await store.append_inbox("run-1", "main", {"msg": "posted"})
+        await store.append_timeline("run-1", {"event": "noted"})
+        loaded = await store.get_state("run-1")
+        assert loaded.version == 1
+        assert loaded.agents_inbox == {"main": {"user": [{"msg": "posted"}]}}
+        assert [e["event"] for e in loaded.timeline] == ["noted"]
+
+        # the turn started before the appends still writes, and keeps them pending
+        state.chat_summary = "turn"
+        await store.store_state("run-1", state)
+        loaded = await store.get_state("run-1")
+        loaded.clear_before_turn()
+        assert loaded.chat_summary == "turn"
+        assert loaded.agents_inbox == {"main": {"user": [{"msg": "posted"}]}}
+
+        # once stored by a state that saw them, they are delivered and dropped
+        await store.store_state("run-1", loaded)
+        again = await store.get_state("run-1")
+        again.clear_before_turn()
+        assert again.agents_inbox == {}
+        assert [e["event"] for e in again.timeline] == ["noted"]
+
+        with pytest.raises(ValueError):
+            await store.append_inbox("no-such-run", "main", {"msg": "lost"})
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_delete_drops_pending_events(db_url):
+    async def scenario():
+        store = LangGraphStore(db_url)
+        await store.store_state("run-1", SessionState(run_id="run-1", owner_agent_id="main"))
+        await store.append_inbox("run-1", "main", {"msg": "posted"})
+        assert await store.delete_state("run-1")
+        assert not await store.delete_state("run-1")
+
+        await store.store_state("run-1", SessionState(run_id="run-1", owner_agent_id="main"))
+        assert (await store.get_state("run-1")).agents_inbox == {}
+        await store.dispose()
+
+    run(scenario())
@@ -0,0 +1,70 @@
+import asyncio
+
+from arix_chatbot.state_manager import state_codec
+from arix_chatbot.state_manager.lazy_state import LazyDocument, LazySessionState
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+from arix_chatbot.state_manager.state_store import SessionState
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def new_state() -> SessionState:
+    return SessionState(run_id="run-1", owner_agent_id="main", turn_index=3, chat_summary="so far",
+                        input_data_schema={"text": {"type": "string"}}, global_context={"k": [1, 2]})
+
+
+def lazy(state: SessionState, drop=()) -> LazySessionState:
+    fields = {name: state_codec.dumps(value) for name, value in state_codec.state_fields(state).items()
+              if name not in drop}
+    raw, offsets = state_codec.join_indexed(fields)
+    return LazySessionState(LazyDocument(raw, offsets))
+
+
+def test_fields_are_decoded_on_first_access():
+    state = lazy(new_state())
+    assert state.decoded_fields() == []
+    assert state.turn_index == 3
+    assert state.input_data_schema == {"text": {"type": "string"}}
+    assert state.decoded_fields() == ["turn_index", "input_data_schema"]
+    # decoded once: later reads return the same object
+    assert state.input_data_schema is state.input_data_schema
+    assert not state.materialized
+
+
+def test_missing_fields_take_their_default():
+    state = lazy(new_state(), drop=("fan_out", "chat_summary"))
+    assert state.fan_out == [] and state.chat_summary is None
+
+
+def test_assignment_materializes_every_field():
+    state = lazy(new_state())
+    state.global_context["k"].append(3)  # in-place change of a decoded field is kept
+    state.chat_summary = "changed"
+    assert state.materialized
+    assert set(state.decoded_fields()) == set(state_codec.state_fields(state))
+    expected = new_state()
+    expected.global_context["k"].append(3)
+    expected.chat_summary = "changed"
+    assert state == expected
+
+
+def test_store_hands_out_lazy_states(tmp_path):
+    async def scenario():
+        store = SqlStateStore(f"sqlite:///{tmp_path / 'sessions.db'}")
+        await store.store_state("run-1", new_state())
+
+        state = await store.get_state("run-1", lazy=True)
+        assert isinstance(state, LazySessionState)
+        assert (state.version, state.turn_index) == (1, 3)
+        assert "input_data_schema" not in state.decoded_fields()
+
+        state.chat_summary = "changed"
+        await store.store_state("run-1", state)
+        loaded = await store.get_state("run-1")
+        assert (loaded.version, loaded.chat_summary, loaded.input_data_schema) == \
+            (2, "changed", {"text": {"type": "string"}})
+        await store.dispose()
+
+    run(scenario())
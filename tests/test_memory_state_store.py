@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from arix_chatbot.state_manager.memory_state_store import InMemoryStateStore
+from arix_chatbot.state_manager.state_store import SessionState
+
+
+def test_list_sessions_accepts_aware_updated_since():
+    async def scenario():
+        store = InMemoryStateStore()
+        before = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await store.store_state("run-1", SessionState(run_id="run-1", owner_agent_id="main"))
+        since = before.astimezone(timezone(timedelta(hours=-7)))
+        assert [item.run_id for item in (await store.list_sessions(updated_since=since)).items] == ["run-1"]
+        assert (await store.list_sessions(updated_since=since + timedelta(hours=1))).items == []
+
+    asyncio.run(scenario())
+
+
+def test_appends_are_pending_events(tmp_path):
+    async def scenario():
+        store = InMemoryStateStore(snapshot_path=str(tmp_path / "snapshot.json"))
+        state = SessionState(run_id="run-1", owner_agent_id="main", timeline=[{"event": "started"}])
+        await store.store_state("run-1", state)
+        await store.append_inbox("run-1", "main", {"msg": "posted"})
+        await store.append_timeline("run-1", {"event": "noted"})
+
+        # the version does not move: a turn working on `state` still writes
+        assert (await store.get_state("run-1")).version == 1
+        loaded = await store.get_state("run-1")
+        assert loaded.agents_inbox == {"main": {"user": [{"msg": "posted"}]}}
+        assert [e["event"] for e in loaded.timeline] == ["started", "noted"]
+        assert loaded.event_seq == 2
+
+        store.save_snapshot()
+        restored = InMemoryStateStore(snapshot_path=str(tmp_path / "snapshot.json"))
+        assert (await restored.get_state("run-1")).agents_inbox == loaded.agents_inbox
+
+        await store.store_state("run-1", loaded)
+        again = await store.get_state("run-1")
+        again.clear_before_turn()
+        # stored with the state: no longer pending, cleared like any message
+        assert again.agents_inbox == {}
+        assert [e["event"] for e in again.timeline] == ["started", "noted"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,193 @@
+"""
+PostgresStateStore against a real server: $ARIX_TEST_PG_URL (a database the
+tests may create databases on), else a throwaway cluster started with
+pgserver; skipped when neither is available.
+"""
+import asyncio
+import os
+import tempfile
+import uuid
+
+import pytest
+from sqlalchemy import make_url, select, text
+
+from arix_chatbot.state_manager.sql_state_store import CheckpointKind
+from arix_chatbot.state_manager.state_store import SessionState, StateConflictError
+
+psycopg = pytest.importorskip("psycopg")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(scope="module")
+def pg_server_url():
+    url = os.environ.get("ARIX_TEST_PG_URL")
+    if url:
+        yield url
+        return
+    pgserver = pytest.importorskip("pgserver")
+    with tempfile.TemporaryDirectory() as data_dir:
+        try:
+            server = pgserver.get_server(data_dir, cleanup_mode="stop")
+        except Exception as e:
+            pytest.skip(f"cannot start a postgres server: {e}")
+        yield server.get_uri()
+        server.cleanup()
+
+
+@pytest.fixture
+def db_url(pg_server_url):
+    """A fresh database per test."""
+    name = f"arix_test_{uuid.uuid4().hex[:12]}"
+    server = make_url(pg_server_url)
+    admin = server.set(drivername="postgresql").render_as_string(hide_password=False)
+    with psycopg.connect(admin, autocommit=True) as conn:
+        conn.execute(f'CREATE DATABASE "{name}"')
+    yield server.set(database=name).render_as_string(hide_password=False)
+    with psycopg.connect(admin, autocommit=True) as conn:
+        conn.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+
+
+def new_store(db_url):
+    from arix_chatbot.state_manager.postgres_state_store import PostgresStateStore
+    return PostgresStateStore(db_url, pool_size=2, max_overflow=0)
+
+
+def new_state() -> SessionState:
+    return SessionState(run_id="run-1", owner_agent_id="main", chat_summary="start",
+                        timeline=[{"event": "started"}], global_context={"k": 1})
+
+
+async def checkpoint_rows(store, run_id="run-1"):
+    cp = store.checkpoints.c
+    async with store.engine.connect() as conn:
+        return (await conn.execute(
+            select(cp.seq, cp.kind, cp.state).where(cp.run_id == run_id).order_by(cp.seq)
+        )).fetchall()
+
+
+def test_stale_write_conflicts(db_url):
+    async def scenario():
+        store = new_store(db_url)
+        state = new_state()
+        await store.store_state("run-1", state)
+        loaded = await store.get_state("run-1")
+        loaded.chat_summary = "first"
+        await store.store_state("run-1", loaded)
+
+        state.chat_summary = "stale"
+        with pytest.raises(StateConflictError):
+            await store.store_state("run-1", state)
+        await store.store_state("run-1", state, force=True)
+        assert (await store.get_state("run-1")).chat_summary == "stale"
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_second_write_sends_only_changed_fields(db_url):
+    async def scenario():
+        store = new_store(db_url)
+        state = new_state()
+        await store.store_state("run-1", state)
+        state.chat_summary = "changed"
+        await store.store_state("run-1", state)
+
+        rows = await checkpoint_rows(store)
+        assert [row.kind for row in rows] == [CheckpointKind.BASE, CheckpointKind.DELTA]
+        # the delta is the `state || patch` of the write: only the changed field
+        assert rows[1].state == {"$set": {"chat_summary": "changed"}}
+        loaded = await store.get_state("run-1", materialize_logs=True)
+        assert (loaded.chat_summary, loaded.global_context, list(loaded.timeline)) == \
+            ("changed", {"k": 1}, [{"event": "started"}])
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_delta_checkpoints_replay(db_url):
+    async def scenario():
+        store = new_store(db_url)
+        state = new_state()
+        for turn in range(5):
+            state.chat_summary = f"turn {turn}"
+            state.global_context = {"k": turn}
+            await store.store_state("run-1", state)
+        for seq in range(1, 6):
+            checkpoint = await store.get_checkpoint("run-1", seq)
+            assert (checkpoint.chat_summary, checkpoint.global_context) == (f"turn {seq - 1}", {"k": seq - 1})
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_write_after_another_worker_sends_the_full_document(db_url):
+    async def scenario():
+        worker_a, worker_b = new_store(db_url), new_store(db_url)
+        await worker_a.store_state("run-1", new_state())
+
+        other = await worker_b.get_state("run-1")
+        other.global_context = {"k": 2}
+        await worker_b.store_state("run-1", other)
+
+        # worker A's last known document is stale: no patch against it
+        state = await worker_a.get_state("run-1")
+        state.chat_summary = "from a"
+        await worker_a.store_state("run-1", state)
+        assert (await checkpoint_rows(worker_a))[-1].kind == CheckpointKind.BASE
+        loaded = await worker_b.get_state("run-1")
+        assert (loaded.chat_summary, loaded.global_context, loaded.version) == ("from a", {"k": 2}, 3)
+        await worker_a.dispose()
+        await worker_b.dispose()
+
+    run(scenario())
+
+
+def test_list_sessions_by_metadata(db_url):
+    async def scenario():
+        store = new_store(db_url)
+        for run_id, owner in (("run-1", "main"), ("run-2", "other"), ("run-3", "main")):
+            await store.store_state(run_id, SessionState(run_id=run_id, owner_agent_id=owner))
+        page = await store.list_sessions(metadata_contains={"owner_agent_id": "main"})
+        assert sorted(item.run_id for item in page.items) == ["run-1", "run-3"]
+        page = await store.list_sessions(metadata_contains={"owner_agent_id": "main"}, limit=1)
+        assert len(page.items) == 1 and page.next_cursor is not None
+        page = await store.list_sessions(metadata_contains={"owner_agent_id": "main"}, cursor=page.next_cursor)
+        assert len(page.items) == 1 and page.next_cursor is None
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_json_columns_are_migrated_to_jsonb(db_url):
+    async def scenario():
+        store = new_store(db_url)
+        await store.store_state("run-1", new_state())
+        async with store.engine.begin() as conn:
+            # a schema from before the JSONB columns (no GIN indexes on json)
+            await conn.execute(text("DROP INDEX ix_sessions_metadata_gin, ix_checkpoints_metadata_gin"))
+            for table, column in (("sessions", "state"), ("sessions", "metadata"),
+                                  ("checkpoints", "state"), ("checkpoints", "metadata")):
+                await conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE json"))
+        await store.dispose()
+
+        store = new_store(db_url)
+        loaded = await store.get_state("run-1")
+        assert loaded.chat_summary == "start"
+        async with store.engine.connect() as conn:
+            types = set((await conn.execute(text(
+                "SELECT data_type FROM information_schema.columns "
+                "WHERE table_name IN ('sessions', 'checkpoints') AND column_name IN ('state', 'metadata')"
+            ))).scalars())
+            indexes = set((await conn.execute(text(
+                "SELECT indexname FROM pg_indexes WHERE indexname LIKE '%metadata_gin'"
+            ))).scalars())
+        assert types == {"jsonb"}
+        assert indexes == {"ix_sessions_metadata_gin", "ix_checkpoints_metadata_gin"}
+        page = await store.list_sessions(metadata_contains={"owner_agent_id": "main"})
+        assert [item.run_id for item in page.items] == ["run-1"]
+        await store.dispose()
+
+    run(scenario())
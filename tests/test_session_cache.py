@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from arix_chatbot.state_manager.change_tracking import changes_of, track_changes
+from arix_chatbot.state_manager.session_cache import CachedStateStore
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+from arix_chatbot.state_manager.state_store import SessionState
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'sessions.db'}"
+
+
+def new_state(run_id: str = "run-1") -> SessionState:
+    return SessionState(run_id=run_id, owner_agent_id="main", agents_inbox={"main": {"user": ["hi"]}},
+                        timeline=[{"event": "started"}])
+
+
+def test_hit_returns_private_copy(db_url):
+    async def scenario():
+        cache = CachedStateStore(SqlStateStore(db_url))
+        await cache.store_state("run-1", new_state())
+        await cache.flush()
+
+        first = await cache.get_state("run-1")
+        # a turn that fails halfway: changed, never stored
+        first.turn_index += 1
+        first.agents_inbox = {}
+        first.timeline.append({"event": "half a turn"})
+
+        second = await cache.get_state("run-1")
+        assert second is not first
+        assert second.turn_index == 0
+        assert second.agents_inbox == {"main": {"user": ["hi"]}}
+        assert len(second.timeline) == 1
+        assert cache.stats.hits == 2
+        await cache.dispose()
+
+    run(scenario())
+
+
+def test_flusher_only_writes_stored_states(db_url):
+    async def scenario():
+        backend = SqlStateStore(db_url)
+        cache = CachedStateStore(backend, flush_interval_seconds=0.01)
+        await cache.store_state("run-1", new_state())
+        await cache.flush()
+
+        state = await cache.get_state("run-1")
+        state.turn_index = 5
+        await asyncio.sleep(0.05)  # flusher runs while the turn is in progress
+        assert (await backend.get_state("run-1")).turn_index == 0
+
+        await cache.store_state("run-1", state)
+        await cache.flush("run-1")
+        assert (await backend.get_state("run-1")).turn_index == 5
+        await cache.dispose()
+
+    run(scenario())
+
+
+def test_logs_appended_during_flush_are_written(db_url):
+    async def scenario():
+        backend = SqlStateStore(db_url)
+        cache = CachedStateStore(backend)
+        await cache.store_state("run-1", new_state())
+        flush = asyncio.create_task(cache.flush())
+        state = await cache.get_state("run-1")
+        state.timeline.append({"event": "next turn"})
+        await flush
+        await cache.store_state("run-1", state)
+        await cache.flush()
+
+        loaded = await backend.get_state("run-1", materialize_logs=True)
+        assert [e["event"] for e in loaded.timeline] == ["started", "next turn"]
+        await cache.dispose()
+
+    run(scenario())
+
+
+def test_copy_keeps_change_tracking(db_url):
+    async def scenario():
+        cache = CachedStateStore(SqlStateStore(db_url))
+        state = new_state()
+        track_changes(state)
+        await cache.store_state("run-1", state)
+        await cache.flush()
+
+        copy = await cache.get_state("run-1")
+        tracker = changes_of(copy)
+        assert tracker is not None and tracker.version == 1 and not tracker.dirty
+        copy.chat_summary = "summary"
+        assert set(tracker.dirty) == {"chat_summary"}
+        await cache.store_state("run-1", copy)
+        await cache.flush()
+        assert (await cache.backend.get_state("run-1")).chat_summary == "summary"
+        await cache.dispose()
+
+    run(scenario())
+
+
+def test_event_appended_during_turn_is_not_hidden(db_url):
+    async def scenario():
+        cache = CachedStateStore(SqlStateStore(db_url))
+        await cache.store_state("run-1", new_state())
+        await cache.flush()
+
+        state = await cache.get_state("run-1")
+        await cache.append_inbox("run-1", "main", {"msg": "posted during the turn"})
+        state.turn_index += 1
+        await cache.store_state("run-1", state)
+        await cache.flush()
+
+        state = await cache.get_state("run-1")
+        assert state.turn_index == 1
+        assert state.agents_inbox["main"]["user"] == ["hi", {"msg": "posted during the turn"}]
+        await cache.dispose()
+
+    run(scenario())
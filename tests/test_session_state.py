@@ -0,0 +1,48 @@
+from arix_chatbot.jobs.job import JobStatus
+from arix_chatbot.jobs.user_interactions import PlanWorkflowJob
+from arix_chatbot.state_manager.state_store import SessionState
+
+
+def new_state() -> SessionState:
+    state = SessionState(run_id="run-1", owner_agent_id="main", turn_index=1)
+    state.add_job(PlanWorkflowJob(job_id="plan", report_to="main", worker_id="planner",
+                                  status=JobStatus.PENDING, turn_index=1, workflow=[]))
+    return state
+
+
+def test_job_changed_in_place_does_not_leak():
+    state = new_state()
+    job = state.get_job("plan")
+    job.status = JobStatus.SUCCESS
+    job.worker_id = "someone else"
+
+    assert state.get_job("plan").status == JobStatus.PENDING
+    assert state.job_status["plan"] == JobStatus.PENDING
+    assert [j.job_id for j in state.get_open_jobs(worker_id="planner")] == ["plan"]
+    assert state.get_open_jobs(worker_id="someone else") == []
+
+    open_job = state.get_open_jobs(report_to="main")[0]
+    open_job.status = JobStatus.SUCCESS
+    assert state.job_status["plan"] == JobStatus.PENDING
+
+
+def test_added_job_is_not_the_callers_object():
+    state = SessionState(run_id="run-1", owner_agent_id="main", turn_index=1)
+    job = PlanWorkflowJob(job_id="plan", report_to="main", worker_id="planner",
+                          status=JobStatus.PENDING, turn_index=1, workflow=[])
+    state.add_job(job)
+    job.status = JobStatus.FAILED
+    assert state.get_job("plan").status == JobStatus.PENDING
+
+
+def test_job_changes_go_through_the_state():
+    state = new_state()
+    state.set_job_status("plan", JobStatus.SUCCESS)
+    assert state.job_status["plan"] == JobStatus.SUCCESS
+    assert state.get_job("plan").status == JobStatus.SUCCESS
+
+    job = state.get_job("plan")
+    job.worker_id = "editor"
+    state.add_job(job)
+    assert [j.job_id for j in state.get_open_jobs(worker_id="editor")] == ["plan"]
+    assert state.get_open_jobs(worker_id="planner") == []
@@ -0,0 +1,264 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from arix_chatbot.state_manager.append_log import AppendLog
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+from arix_chatbot.state_manager.state_store import SessionState, StateConflictError
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'sessions.db'}"
+
+
+def new_state(run_id: str = "run-1") -> SessionState:
+    return SessionState(run_id=run_id, owner_agent_id="main",
+                        timeline=[{"event": "started"}], chat_full_history=[{"msg": "hi"}])
+
+
+def test_async_round_trip(db_url):
+    async def scenario():
+        store = SqlStateStore(db_url)
+        state = new_state()
+        state.global_context = {"lang": "en", "nested": {"n": [1, 2]}}
+        await store.store_state("run-1", state)
+        assert state.version == 1
+
+        loaded = await store.get_state("run-1", materialize_logs=True)
+        assert loaded.version == 1
+        assert loaded.global_context == {"lang": "en", "nested": {"n": [1, 2]}}
+        assert list(loaded.timeline) == [{"event": "started"}]
+        assert list(loaded.chat_full_history) == [{"msg": "hi"}]
+
+        loaded.chat_summary = "second"
+        await store.store_state("run-1", loaded)
+        with pytest.raises(StateConflictError):
+            await store.store_state("run-1", state)
+        assert (await store.get_state("run-1")).chat_summary == "second"
+
+        assert await store.delete_state("run-1")
+        assert await store.get_state("run-1") is None
+        assert not await store.delete_state("run-1")
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_concurrent_writes_do_not_block_the_loop(db_url):
+    async def scenario():
+        store = SqlStateStore(db_url)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        async def turns(run_id):
+            await store.store_state(run_id, new_state(run_id))
+            for turn in range(5):
+                state = await store.get_state(run_id)
+                state.turn_index = turn + 1
+                await store.store_state(run_id, state)
+
+        task = asyncio.create_task(ticker())
+        await asyncio.gather(*(turns(f"run-{i}") for i in range(4)))
+        task.cancel()
+        # the loop kept running other tasks while the store waited on SQLite
+        assert ticks > 24
+        assert [(await store.get_state(f"run-{i}")).version for i in range(4)] == [6] * 4
+        await store.dispose()
+
+    run(scenario())
+
+
+class AppendingStore(SqlStateStore):
+    """Appends to the state's timeline while its write is in flight."""
+
+    async def _write_logs_and_events(self, conn, ns, run_id, state, log_writes, stored_cursors):
+        state.timeline.append({"event": "appended during write"})
+        await super()._write_logs_and_events(conn, ns, run_id, state, log_writes, stored_cursors)
+
+
+def test_append_during_write_stays_pending(db_url):
+    async def scenario():
+        store = AppendingStore(db_url)
+        state = new_state()
+        await store.store_state("run-1", state)
+        assert isinstance(state.timeline, AppendLog)
+        assert state.timeline.persisted == 1
+        assert len(state.timeline) == 2
+
+        # a plain SqlStateStore writes the entry the first write did not
+        plain = SqlStateStore(db_url)
+        await plain.store_state("run-1", state)
+        loaded = await plain.get_state("run-1", materialize_logs=True)
+        assert list(loaded.timeline) == [{"event": "started"}, {"event": "appended during write"}]
+        await store.dispose()
+        await plain.dispose()
+
+    run(scenario())
+
+
+def test_log_cursor_matches_rows(db_url):
+    async def scenario():
+        store = SqlStateStore(db_url)
+        await store.store_state("run-1", new_state())
+        state = await store.get_state("run-1")
+        state.timeline.append({"event": "second"})
+        await store.store_state("run-1", state)
+        state.timeline.append({"event": "third"})
+        await store.store_state("run-1", state)
+        loaded = await store.get_state("run-1", materialize_logs=True)
+        assert [e["event"] for e in loaded.timeline] == ["started", "second", "third"]
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_list_sessions_accepts_aware_updated_since(db_url):
+    async def scenario():
+        store = SqlStateStore(db_url)
+        before = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await store.store_state("run-1", new_state())
+        # same instant in another zone
+        since = before.astimezone(timezone(timedelta(hours=5)))
+        page = await store.list_sessions(updated_since=since)
+        assert [item.run_id for item in page.items] == ["run-1"]
+        page = await store.list_sessions(updated_since=since + timedelta(hours=1))
+        assert page.items == []
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_migration_indexes_checkpoint_seq(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sessions (ns VARCHAR(64) NOT NULL, run_id VARCHAR(128) NOT NULL, "
+                 "version INTEGER NOT NULL, updated_at DATETIME NOT NULL, state JSON NOT NULL, "
+                 "metadata JSON NOT NULL, CONSTRAINT uq_sessions_ns_run UNIQUE (ns, run_id))")
+    conn.execute("CREATE TABLE checkpoints (id VARCHAR(64) PRIMARY KEY, ns VARCHAR(64) NOT NULL, "
+                 "run_id VARCHAR(128) NOT NULL, version INTEGER NOT NULL, ts DATETIME NOT NULL, "
+                 "state JSON NOT NULL, metadata JSON NOT NULL)")
+    conn.execute("INSERT INTO checkpoints VALUES ('c1', 'sessions', 'run-0', 1, '2024-01-01 00:00:00', '{}', '{}')")
+    conn.commit()
+    conn.close()
+
+    async def scenario():
+        store = SqlStateStore(f"sqlite:///{path}")
+        await store.store_state("run-1", new_state())
+        await store.dispose()
+
+    run(scenario())
+    conn = sqlite3.connect(path)
+    indexes = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"ix_checkpoints_seq", "ix_checkpoints_ns_run_seq"} <= indexes
+    assert conn.execute("SELECT seq, kind FROM checkpoints WHERE id = 'c1'").fetchone() == (1, "base")
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT max(seq) FROM checkpoints "
+                        "WHERE ns = 'sessions' AND run_id = 'run-1'").fetchall()
+    assert "ix_checkpoints_ns_run_seq" in str(plan)
+    conn.close()
+
+
+async def history(store, **kwargs):
+    return [entry async for entry in store.get_history("run-1", **kwargs)]
+
+
+def test_history_projection(db_url):
+    async def scenario():
+        store = SqlStateStore(db_url, snapshot_every=3)
+        state = new_state()
+        for turn in range(7):
+            state.chat_summary = f"turn {turn}"
+            state.global_context = {"turn": turn}
+            await store.store_state("run-1", state)
+
+        entries = await history(store, fields=(), limit=3)
+        assert [e["seq"] for e in entries] == [7, 6, 5]
+        assert [e["version"] for e in entries] == [7, 6, 5]
+        assert all("state" not in e for e in entries)
+
+        entries = await history(store, fields=["chat_summary", "global_context.turn", "no.such.path"], limit=2)
+        assert [e["state"] for e in entries] == [
+            {"chat_summary": "turn 6", "global_context.turn": 6, "no.such.path": None},
+            {"chat_summary": "turn 5", "global_context.turn": 5, "no.such.path": None},
+        ]
+
+        full = (await history(store, limit=1))[0]["state"]
+        assert full["chat_summary"] == "turn 6" and "$logs" in full
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_history_pages_with_before_seq(db_url):
+    async def scenario():
+        store = SqlStateStore(db_url, snapshot_every=3)
+        state = new_state()
+        for turn in range(7):
+            state.chat_summary = f"turn {turn}"
+            await store.store_state("run-1", state)
+
+        # small pages cross the base / delta boundaries
+        entries = await history(store, fields=["chat_summary"], limit=None, page_size=2)
+        assert [e["state"]["chat_summary"] for e in entries] == [f"turn {t}" for t in range(6, -1, -1)]
+
+        for fields in ((), ["chat_summary"]):
+            seen, before = [], None
+            while True:
+                page = await history(store, fields=fields, limit=3, before_seq=before)
+                if not page:
+                    break
+                seen.extend(e["seq"] for e in page)
+                before = page[-1]["seq"]
+            assert seen == [7, 6, 5, 4, 3, 2, 1]
+        assert await history(store, before_seq=1) == []
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_read_pool_is_query_only(db_url):
+    async def scenario():
+        store = SqlStateStore(db_url)
+        await store.store_state("run-1", new_state())
+        assert store.read_engine is not store.engine
+        async with store._snapshot() as conn:
+            assert (await conn.exec_driver_sql("PRAGMA query_only")).scalar() == 1
+            with pytest.raises(Exception, match="readonly"):
+                await conn.exec_driver_sql("DELETE FROM sessions")
+        assert await store.get_state("run-1") is not None
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_reads_see_commits_and_skip_the_writer_lock(db_url):
+    async def scenario():
+        store = SqlStateStore(db_url)
+        state = new_state()
+        await store.store_state("run-1", state)
+        # warm the read pool: its connections stay open across reads
+        assert (await store.get_state("run-1")).version == 1
+        state.chat_summary = "second"
+        await store.store_state("run-1", state)
+        assert (await store.get_state("run-1")).chat_summary == "second"
+
+        async with store._tx() as writer:
+            # the writer lock is held (BEGIN IMMEDIATE): reads go on, from the last commit
+            await writer.exec_driver_sql("UPDATE sessions SET version = 99")
+            loaded = await asyncio.wait_for(store.get_state("run-1"), timeout=2)
+            assert loaded.version == 2
+        assert (await store.get_state("run-1")).version == 99
+        await store.dispose()
+
+    run(scenario())
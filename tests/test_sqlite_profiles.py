@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from arix_chatbot.state_manager import sqlite_profiles
+from arix_chatbot.state_manager.sql_state_store import SqlStateStore
+from arix_chatbot.state_manager.state_store import SessionState
+
+SYNCHRONOUS = {"OFF": 0, "NORMAL": 1, "FULL": 2}
+TEMP_STORE = {"DEFAULT": 0, "FILE": 1, "MEMORY": 2}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def pragmas(conn):
+    names = ("journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "busy_timeout",
+             "wal_autocheckpoint", "query_only")
+    return {name: (await conn.exec_driver_sql(f"PRAGMA {name}")).scalar() for name in names}
+
+
+def expected(profile, **extra):
+    return {
+        "journal_mode": "wal",
+        "synchronous": SYNCHRONOUS[profile.synchronous],
+        "cache_size": -profile.cache_size_kib,
+        "mmap_size": profile.mmap_size,
+        "temp_store": TEMP_STORE[profile.temp_store],
+        "busy_timeout": profile.busy_timeout_ms,
+        "wal_autocheckpoint": profile.wal_autocheckpoint,
+        **extra,
+    }
+
+
+@pytest.mark.parametrize("name", sorted(sqlite_profiles.PROFILES))
+def test_profile_is_applied_on_every_pooled_connection(name, tmp_path):
+    profile = sqlite_profiles.get_profile(name)
+
+    async def scenario():
+        store = SqlStateStore(f"sqlite:///{tmp_path / 'sessions.db'}", sqlite_profile=name, read_pool_size=2)
+        await store.store_state("run-1", SessionState(run_id="run-1", owner_agent_id="main"))
+
+        # hold two connections of each pool at once: both are fresh pooled connections
+        async with store.engine.connect() as first, store.engine.connect() as second:
+            for conn in (first, second):
+                assert await pragmas(conn) == expected(profile, query_only=0)
+        async with store.read_engine.connect() as first, store.read_engine.connect() as second:
+            for conn in (first, second):
+                assert await pragmas(conn) == expected(profile, query_only=1)
+        await store.dispose()
+
+    run(scenario())
+
+
+def test_unknown_profile_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Unknown SQLite profile"):
+        SqlStateStore(f"sqlite:///{tmp_path / 'sessions.db'}", sqlite_profile="fast")
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+
+from arix_chatbot.jobs.job import JobStatus
+from arix_chatbot.jobs.user_interactions import CreateResponseJob, PlanWorkflowJob
+from arix_chatbot.state_manager import state_codec
+from arix_chatbot.state_manager.state_codec import StateFormat
+from arix_chatbot.state_manager.state_store import SessionState
+
+FORMATS = [StateFormat.JSON] + ([StateFormat.MSGPACK] if state_codec.msgpack is not None else [])
+
+
+def new_state() -> SessionState:
+    state = SessionState(run_id="run-1", owner_agent_id="main", turn_index=2, chat_summary="so far",
+                         global_context={"nested": {"values": [1, 2.5, None, True]}, "text": "héllo"},
+                         timeline=[{"event": "started"}])
+    state.add_job(PlanWorkflowJob(job_id="job-1", report_to="main", worker_id="planner",
+                                  status=JobStatus.PENDING, turn_index=2,
+                                  user_intention="label reviews", workflow=["a", "b"]))
+    state.add_job(CreateResponseJob(job_id="job-2", report_to="main", worker_id="output",
+                                    status=JobStatus.SUCCESS, turn_index=2, response_to_user="done"))
+    return state
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_round_trip(fmt):
+    state = new_state()
+    decoded = state_codec.decode_state(state_codec.encode_state(state, fmt), fmt)
+    assert decoded == SessionState.fromdict(state.todict())
+    assert decoded.global_context == {"nested": {"values": [1, 2.5, None, True]}, "text": "héllo"}
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_typed_jobs_round_trip(fmt):
+    decoded = state_codec.decode_state(state_codec.encode_state(new_state(), fmt), fmt)
+    # jobs are stored with their job_type and come back as their class
+    plan = decoded.get_job("job-1")
+    assert isinstance(plan, PlanWorkflowJob)
+    assert (plan.user_intention, plan.workflow, plan.status) == ("label reviews", ["a", "b"], JobStatus.PENDING)
+    response = decoded.get_job("job-2")
+    assert isinstance(response, CreateResponseJob) and response.response_to_user == "done"
+    assert decoded.job_status == {"job-1": JobStatus.PENDING, "job-2": JobStatus.SUCCESS}
+
+
+def test_encoding_is_single_pass_json():
+    state = new_state()
+    data = state_codec.encode_state(state)
+    assert isinstance(data, bytes)
+    doc = state_codec.loads(data)
+    assert set(doc) == set(state_codec.state_fields(state))
+    assert doc["jobs"]["job-1"]["job_type"] == PlanWorkflowJob.job_type
+
+
+def test_unknown_values_fall_back():
+    doc = state_codec.loads(state_codec.dumps({"at": datetime(2025, 1, 2, 3, 4, 5), "tags": {"a"}}))
+    assert doc == {"at": "2025-01-02T03:04:05", "tags": ["a"]}
+
+
+def test_unknown_keys_are_ignored():
+    doc = state_codec.loads(state_codec.encode_state(new_state()))
+    doc["field_from_a_newer_schema"] = 1
+    assert state_codec.decode_state(state_codec.dumps(doc)).chat_summary == "so far"
@@ -0,0 +1,79 @@
+import pytest
+
+from arix_chatbot.state_manager.state_merge import FieldMerge, MergeConflictError, isolated_view
+from arix_chatbot.state_manager.state_store import SessionState
+
+
+def new_state() -> SessionState:
+    return SessionState(run_id="run-1", owner_agent_id="main", agents_inbox={"a": {"k": 1}},
+                        response_requests=["base"], timeline=[{"event": "started"}])
+
+
+def test_view_is_isolated_but_shares_logs():
+    state = new_state()
+    view = isolated_view(state)
+    view.agents_inbox["a"]["k"] = 2
+    view.response_requests.append("view")
+    assert state.agents_inbox == {"a": {"k": 1}}
+    assert state.response_requests == ["base"]
+    assert view.timeline is state.timeline
+
+
+def test_fold_takes_changes_of_each_view():
+    state = new_state()
+    merge = FieldMerge(state)
+    first, second = isolated_view(state), isolated_view(state)
+    first.task_goal = "goal"
+    second.chat_summary = "summary"
+    assert merge.fold(first) == {"task_goal": "goal"}
+    assert merge.fold(second) == {"chat_summary": "summary"}
+
+
+def test_same_change_agrees():
+    state = new_state()
+    merge = FieldMerge(state)
+    first, second = isolated_view(state), isolated_view(state)
+    first.task_goal = second.task_goal = "goal"
+    assert merge.fold(first) == {"task_goal": "goal"}
+    assert merge.fold(second) == {}
+
+
+def test_appends_are_combined_in_fold_order():
+    state = new_state()
+    merge = FieldMerge(state)
+    first, second = isolated_view(state), isolated_view(state)
+    first.response_requests.append("first")
+    second.response_requests.append("second")
+    merge.fold(first)
+    assert merge.fold(second) == {"response_requests": ["base", "first", "second"]}
+
+
+def test_dicts_merge_key_by_key():
+    state = new_state()
+    merge = FieldMerge(state)
+    first, second, third = isolated_view(state), isolated_view(state), isolated_view(state)
+    first.agents_inbox["a"]["k"] = 2
+    second.agents_inbox["b"] = {"z": 1}
+    third.agents_inbox["a"] = {"k": 3}
+    assert merge.fold(first) == {"agents_inbox": {"a": {"k": 2}}}
+    assert merge.fold(second) == {"agents_inbox": {"a": {"k": 2}, "b": {"z": 1}}}
+    with pytest.raises(MergeConflictError) as e:
+        merge.fold(third)
+    assert e.value.fields == ["agents_inbox"]
+
+
+def test_conflict_folds_nothing_of_the_view():
+    state = new_state()
+    merge = FieldMerge(state)
+    first, second = isolated_view(state), isolated_view(state)
+    first.task_goal = "first"
+    second.task_goal = "second"
+    second.chat_summary = "summary"
+    merge.fold(first)
+    with pytest.raises(MergeConflictError) as e:
+        merge.fold(second)
+    assert e.value.fields == ["task_goal"]
+    third = isolated_view(state)
+    third.chat_summary = "other"
+    # the conflicting view's chat_summary was not folded
+    assert merge.fold(third) == {"chat_summary": "other"}